@@ -0,0 +1,3 @@
+from SnakeMaker.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""
+Cohort performance report of the generated workflows.
+
+Collects the Snakemake benchmark files (OUTPUT_DIR_PATH/benchmarks/<rule>/<sample>.tsv, see the benchmark_rules option)
+into one table and summarizes wall time, memory, IO and CPU efficiency per rule.
+"""
+
+import os
+
+import SnakeMaker.utils as ut
+from SnakeMaker.rule_maker import resource_estimator as res
+
+summary_columns = ["s", "max_rss", "io_in", "io_out", "cpu_usage"]
+summary_statistics = {"p50": 0.5, "p95": 0.95}
+
+
+def collect_benchmarks(directory: str = None, threads: dict = None):
+    """
+    Aggregates all benchmark files into one table.
+
+    Args:
+        directory (str, optional): The benchmarks directory. Defaults to OUTPUT_DIR_PATH/benchmarks.
+        threads (dict, optional): Threads of the rules {rule_name: threads}, to compute the CPU efficiency. Defaults to None.
+
+    Returns:
+        pd.DataFrame: One row per measurement with rule, sample, s, max_rss, io_in, io_out, cpu_time,
+                      cpu_usage (cpu_time / s) and cpu_efficiency (cpu_usage / threads) columns.
+    """
+    import pandas as pd
+
+    frames = []
+    for rule_name, files in res.find_benchmarks(directory or res.get_benchmarks_path()).items():
+        frame = res.load_benchmarks(files)
+        frame.insert(0, "rule", rule_name)
+        frames.append(frame)
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["rule", "sample"] + res.numeric_columns)
+    data["cpu_usage"] = data["cpu_time"] / data["s"].where(data["s"] > 0)
+    data["cpu_efficiency"] = data["cpu_usage"] / data["rule"].map(threads or {}).fillna(1).clip(lower=1)
+    return data[["rule", "sample"] + res.numeric_columns + ["cpu_usage", "cpu_efficiency"]]
+
+
+def summarize(data):
+    """
+    Summarizes the measurements per rule - count, p50, p95 and max of wall time, RSS, IO and CPU usage,
+    and the mean CPU efficiency. Rules are sorted by the p95 wall time, slowest first.
+
+    Args:
+        data (pd.DataFrame): The table from collect_benchmarks.
+
+    Returns:
+        pd.DataFrame: The summary indexed by rule.
+    """
+    import pandas as pd
+
+    grouped = data.groupby("rule")
+    columns = {"count": grouped["s"].count()}
+    for column in summary_columns:
+        for name, quantile in summary_statistics.items():
+            columns[f"{column}_{name}"] = grouped[column].quantile(quantile)
+        columns[f"{column}_max"] = grouped[column].max()
+    columns["cpu_efficiency_mean"] = grouped["cpu_efficiency"].mean()
+    return pd.DataFrame(columns).sort_values("s_p95", ascending=False)
+
+
+def slowest_samples(data, top: int = 10):
+    """
+    Returns the slowest samples by their total wall time across all rules, with the rule taking the longest.
+
+    Args:
+        data (pd.DataFrame): The table from collect_benchmarks.
+        top (int, optional): The number of samples. Defaults to 10.
+
+    Returns:
+        pd.DataFrame: Samples with total_s, rules and slowest_rule columns.
+    """
+    import pandas as pd
+
+    per_sample = data[data["sample"] != ""].dropna(subset=["s"])
+    if per_sample.empty:
+        return pd.DataFrame(columns=["sample", "total_s", "rules", "slowest_rule"])
+    grouped = per_sample.groupby("sample")
+    output = grouped["s"].agg(total_s="sum", rules="count")
+    output["slowest_rule"] = per_sample.loc[grouped["s"].idxmax(), ["sample", "rule"]].set_index("sample")["rule"]
+    return output.sort_values("total_s", ascending=False).head(top).reset_index()
+
+
+def outliers(data, summary):
+    """
+    Returns the measurements with wall time above the p95 of their rule.
+    """
+    limits = data["rule"].map(summary["s_p95"])
+    return data[data["s"] > limits].sort_values("s", ascending=False)[["rule", "sample", "s", "max_rss"]]
+
+
+def format_report(data, summary, top: int = 10) -> str:
+    """
+    Formats the report as text - the per-rule summary, the slowest rules and samples and the outlier measurements.
+    """
+    lines = [f"Benchmarks: {len(data)} measurements of {data['rule'].nunique()} rules, {data['sample'].nunique()} samples", ""]
+    if data.empty:
+        return "\n".join(lines)
+    lines += ["Per-rule summary (s - wall time in seconds, max_rss - MB, io - MB, cpu_usage - cores):", summary.round(2).to_string(), ""]
+    slowest = summary.head(top)
+    lines += [f"Slowest rules (p95 wall time): {', '.join(f'{rule} ({value:.1f} s)' for rule, value in slowest['s_p95'].items())}", ""]
+    lines += ["Slowest samples (total wall time):", slowest_samples(data, top).round(2).to_string(index=False), ""]
+    inefficient = summary[summary["cpu_efficiency_mean"] < 0.5]
+    if not inefficient.empty:
+        lines += [f"Low CPU efficiency (< 50% of threads used): {', '.join(inefficient.index)}", ""]
+    outlying = outliers(data, summary).head(top)
+    if not outlying.empty:
+        lines += ["Measurements above the p95 of their rule:", outlying.round(2).to_string(index=False), ""]
+    return "\n".join(lines)
+
+
+def create_report(directory: str = None, output_path: str = None, threads: dict = None, top: int = 10) -> str:
+    """
+    Creates the cohort performance report.
+
+    Args:
+        directory (str, optional): The benchmarks directory. Defaults to OUTPUT_DIR_PATH/benchmarks.
+        output_path (str, optional): If given, the report is written there and the summary table next to it (.tsv). Defaults to None.
+        threads (dict, optional): Threads of the rules {rule_name: threads}. Defaults to None.
+        top (int, optional): The number of the slowest rules and samples. Defaults to 10.
+
+    Returns:
+        str: The report text.
+    """
+    data = collect_benchmarks(directory, threads)
+    summary = summarize(data) if not data.empty else None
+    report = format_report(data, summary, top)
+    if output_path:
+        ut.write_atomic(output_path, report)
+        if summary is not None:
+            summary.to_csv(f"{os.path.splitext(output_path)[0]}.tsv", sep="\t")
+    return report
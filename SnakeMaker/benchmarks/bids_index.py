@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import SnakeMaker.bids_index as bi
+
+# Files created for every synthetic session (datatype, filename without the sub/ses prefix)
+session_files = [
+    ("anat", "T1w.nii.gz"),
+    ("anat", "T1w.json"),
+    ("dwi", "acq-b0_dir-PA_dwi.nii.gz"),
+    ("dwi", "acq-b0_dir-PA_dwi.json"),
+    ("dwi", "acq-b0_dir-PA_dwi.bval"),
+    ("dwi", "acq-b0_dir-PA_dwi.bvec"),
+    ("dwi", "acq-b1000_dir-AP_dwi.nii.gz"),
+    ("dwi", "acq-b1000_dir-AP_dwi.json"),
+    ("dwi", "acq-b1000_dir-AP_dwi.bval"),
+    ("dwi", "acq-b1000_dir-AP_dwi.bvec"),
+]
+
+
+def create_synthetic_tree(root: str, subjects: int, sessions: int = 1) -> int:
+    """
+    Creates a synthetic BIDS tree with empty files.
+
+    Args:
+        root (str): The root path of the dataset.
+        subjects (int): The number of subjects.
+        sessions (int, optional): The number of sessions per subject. Defaults to 1.
+
+    Returns:
+        int: The number of created files.
+    """
+    with open(os.path.join(root, "dataset_description.json"), "w") as f:
+        json.dump({"Name": "synthetic", "BIDSVersion": "1.8.0"}, f)
+    count = 0
+    for sub in range(subjects):
+        for ses in range(1, sessions + 1):
+            prefix = f"sub-S{sub:05d}_ses-{ses}"
+            for datatype, filename in session_files:
+                directory = os.path.join(root, f"sub-S{sub:05d}", f"ses-{ses}", datatype)
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, f"{prefix}_{filename}"), "w") as f:
+                    f.write("{}" if filename.endswith(".json") else "")
+                count += 1
+    return count
+
+
+def run(subjects: int = 5000, sessions: int = 1, pybids: bool = True) -> dict:
+    """
+    Compares the native BIDS indexer with pybids BIDSLayout on a synthetic tree.
+
+    Args:
+        subjects (int, optional): The number of subjects. Defaults to 5000.
+        sessions (int, optional): The number of sessions per subject. Defaults to 1.
+        pybids (bool, optional): If the pybids layout should be measured as well. Defaults to True.
+
+    Returns:
+        dict: Measured times in seconds and number of indexed files.
+    """
+    results = dict()
+    with tempfile.TemporaryDirectory() as root:
+        results["files"] = create_synthetic_tree(root, subjects, sessions)
+        start = time.perf_counter()
+        table = bi.scan_bids(root)
+        bi.to_dataframe(table)
+        results["native_s"] = time.perf_counter() - start
+        results["native_files"] = len(table["path"])
+        if pybids:
+            import bids
+
+            start = time.perf_counter()
+            layout_df = bids.BIDSLayout(root).to_df()
+            results["pybids_s"] = time.perf_counter() - start
+            results["pybids_files"] = int(layout_df["subject"].notna().sum())
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="snakemaker bench bids_index", description="Benchmark of the native BIDS indexer against pybids.")
+    parser.add_argument("--subjects", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--skip-pybids", action="store_true")
+    args = parser.parse_args(argv)
+    for key, value in run(args.subjects, args.sessions, not args.skip_pybids).items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
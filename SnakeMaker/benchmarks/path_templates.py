@@ -0,0 +1,67 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+from SnakeMaker.rule_maker import path_template as pt
+
+root = "/data/input_data"
+files = ["b0.nii.gz", "b1000.nii.gz", "b0.json", "b1000.bvec", "b1000.bval"]
+
+
+def legacy_path(folder: str, filename: str, shortened: bool) -> tuple:
+    """
+    The original path construction with the regex wildcard search of construct_function_output, kept as the reference.
+    """
+    path = str(Path(root) / Path(folder) / Path("{sample}") / Path(filename)) if not shortened else f"{{output_path}}/{folder}/{{sample}}/{filename}"
+    return path, bool(re.search(r"{.+}", path)), "{sample}" in path
+
+
+def template_path(folder: str, filename: str, shortened: bool) -> tuple:
+    template = pt.intern_template(root, (folder, "{sample}", filename))
+    wildcards = template.get_wildcards(shortened)
+    return template.render(shortened), bool(wildcards), "sample" in wildcards
+
+
+def run(rules: int = 20000, folders: int = 20) -> dict:
+    """
+    Builds the input paths of templated rule variants - every rule references the same dataset files - with the original
+    construction and with the interned templates, in the full and the shortened form.
+
+    Args:
+        rules (int, optional): The number of rules. Defaults to 20000.
+        folders (int, optional): The number of distinct input folders. Defaults to 20.
+
+    Returns:
+        dict: Measured times in seconds and if the paths and wildcards are identical.
+    """
+    results = dict()
+    references = [(f"folder_{index % folders}", filename) for index in range(rules) for filename in files]
+    for shortened in (False, True):
+        form = "short" if shortened else "full"
+        start = time.perf_counter()
+        legacy = [legacy_path(folder, filename, shortened) for folder, filename in references]
+        results[f"legacy_{form}_s"] = time.perf_counter() - start
+        pt.templates.clear()
+        start = time.perf_counter()
+        templated = [template_path(folder, filename, shortened) for folder, filename in references]
+        results[f"template_{form}_s"] = time.perf_counter() - start
+        results[f"identical_{form}"] = legacy == templated
+    results["paths"] = len(references)
+    results["templates"] = len(pt.templates)
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="snakemaker bench path_templates", description="Benchmark of the interned rule path templates.")
+    parser.add_argument("--rules", type=int, default=20000)
+    parser.add_argument("--folders", type=int, default=20)
+    args = parser.parse_args(argv)
+    results = run(args.rules, args.folders)
+    for key, value in results.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    return 0 if results["identical_full"] and results["identical_short"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import SnakeMaker.utils as ut
+from SnakeMaker.rule_maker import rule_renderer as rr
+from SnakeMaker.rule_maker.rule import Rule
+
+
+def create_rule(index: int) -> Rule:
+    """
+    Creates a templated per-parameter rule variant with inputs, params (path, lambda, function, value), outputs,
+    resources and shell.
+    """
+    rule = Rule()
+    rule.name = f"eddy_variant_{index}"
+    rule.description = f"Eddy correction variant {index}." if index % 2 else ""
+    rule.inputs = [
+        {"b0": "{output_path}/topup/{sample}/b0.nii.gz"},
+        {"bvec": "{output_path}//topup/{sample}/b0.bvec"},
+        {"mask": {"function": "lambda wildcards: get_mask(wildcards.sample)"}},
+    ]
+    rule.params = [
+        {"acqp": f"/opt/params/acqp_{index % 100}.txt"},
+        {"readout": "lambda wildcards: get_readout(wildcards.sample)"},
+        {"index": {"function": "get_index(input.b0)"}},
+        {"repol": index % 7},
+    ]
+    rule.outputs = [{"eddy": f"{{output_path}}/eddy_{index}/{{sample}}/eddy.nii.gz"}, {"rotated": f"{{output_path}}/eddy_{index}/{{sample}}/eddy.bvec"}]
+    rule.resources = [{"mem_mb": 4000}, {"runtime": 60}]
+    rule.shell = ["eddy --imain={input.b0} --bvecs={input.bvec} --mask={input.mask}", "--acqp={params.acqp} --out={output.eddy}"]
+    return rule
+
+
+def legacy_render(rule: Rule) -> str:
+    """
+    The original string concatenation rendering of Rule.construct_plane_rule, kept as the reference.
+    """
+    inputs = ""
+    i = 0
+    for input in rule.inputs:
+        for key, value in input.items():
+            if isinstance(value, dict) and "function" in value.keys():
+                inputs += f"\n\t\t{key}={value.get('function')}," if i > 0 else f"{key}={value.get('function')},"
+            else:
+                inputs += f"\n\t\t{key}={f'"{Path(value)}"'}," if i > 0 else f"{key}={f'"{Path(value)}"'},"
+            i += 1
+    params = ""
+    for param in rule.params:
+        for key, value in param.items():
+            if isinstance(value, dict):
+                params += f"\n\t\t{key}={value.get('function')},"
+            elif isinstance(value, str) and value.startswith("/"):
+                params += f"\n\t\t{key}={f'"{Path(value)}"'},"
+            elif isinstance(value, str) and value.startswith("lambda"):
+                params += f"\n\t\t{key}={value},"
+            else:
+                params += f"\n\t\t{key}={f'"{value}"'},"
+    outputs = "\n\t\t".join(
+        [f'{key}="{Path(value) if isinstance(value, str) else value}",' for outputs_dict in rule.outputs for key, value in outputs_dict.items()]
+    )
+    resources = "\n\t\t".join([f"{key}={value}," for resources_dict in rule.resources for key, value in resources_dict.items()]) if rule.resources else ""
+    shell = '"""\n\t\t\t' + "\n\t\t\t".join([f"{cmd}" for cmd in rule.shell]) + '\n\t\t"""' if rule.shell else ""
+    run = ""
+    for r in rule.run:
+        for key, val in r.items():
+            run += f"{key}={val}"
+    rule_str = f"# Description: {rule.description}" if rule.description else "# Description missing"
+    rule_str += f"""\nrule {rule.name}:"""
+    if not ut.is_none_or_empty(inputs):
+        rule_str += f"""\n\tinput:\n\t\t{inputs}"""
+    if not ut.is_none_or_empty(params):
+        rule_str += f"""\n\tparams:\t\t{params}"""
+    if not ut.is_none_or_empty(outputs):
+        rule_str += f"""\n\toutput:\n\t\t{outputs}"""
+    if not ut.is_none_or_empty(resources):
+        rule_str += f"""\n\tresources:\n\t\t{resources}"""
+    if not ut.is_none_or_empty(shell):
+        rule_str += f"""\n\tshell:\n\t\t{shell}"""
+    if not ut.is_none_or_empty(run):
+        rule_str += f"""\n\trun:\n\t\t{run}"""
+    return rule_str + "\n"
+
+
+def run(rules: int = 50000) -> dict:
+    """
+    Renders the rules with the original concatenation, the rendering engine and streams them into a file.
+
+    Args:
+        rules (int, optional): The number of rules. Defaults to 50000.
+
+    Returns:
+        dict: Measured times in seconds, rendered size and if the outputs are byte-identical.
+    """
+    results = dict()
+    rule_list = [create_rule(index) for index in range(rules)]
+    start = time.perf_counter()
+    legacy = "".join(legacy_render(rule) for rule in rule_list)
+    results["legacy_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    rendered = "".join(rr.render_rules(rule_list))
+    results["renderer_s"] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rules.smk")
+        start = time.perf_counter()
+        with open(path, "w") as f:
+            f.writelines(rr.render_rules(rule_list))
+        results["stream_s"] = time.perf_counter() - start
+        with open(path, "r") as f:
+            streamed = f.read()
+    results["rules"] = rules
+    results["bytes"] = len(rendered)
+    results["identical"] = legacy == rendered == streamed
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="snakemaker bench rule_rendering", description="Benchmark of the rule rendering engine.")
+    parser.add_argument("--rules", type=int, default=50000)
+    args = parser.parse_args(argv)
+    results = run(args.rules)
+    for key, value in results.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    return 0 if results["identical"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup budget of `snakemaker --help`
+target_ms = 150.0
+heavy_modules = ["pandas", "numpy", "yaml", "dynaconf", "bids"]
+
+
+def measure(command: list, repeat: int = 10) -> list:
+    """
+    Measures the wall time of the command in milliseconds.
+
+    Args:
+        command (list): The command to run.
+        repeat (int, optional): The number of runs. Defaults to 10.
+
+    Returns:
+        list: Wall times in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def imported_heavy_modules() -> list:
+    """
+    Returns the heavy modules imported by the CLI when parsing --help.
+    """
+    code = (
+        "import contextlib, io, sys\n"
+        "from SnakeMaker import cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n    cli.main(['--help'])\n"
+        f"print(','.join(m for m in {heavy_modules!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return [module for module in output.strip().split(",") if module]
+
+
+def run(repeat: int = 10) -> dict:
+    """
+    Measures the startup time of `python -m SnakeMaker.cli --help` against the bare interpreter.
+
+    Args:
+        repeat (int, optional): The number of runs. Defaults to 10.
+
+    Returns:
+        dict: Median times in milliseconds and the heavy modules loaded by --help.
+    """
+    return {
+        "interpreter_ms": statistics.median(measure([sys.executable, "-c", "pass"], repeat)),
+        "help_ms": statistics.median(measure([sys.executable, "-m", "SnakeMaker.cli", "--help"], repeat)),
+        "heavy_modules": imported_heavy_modules(),
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="snakemaker bench startup", description="Startup time guard of the snakemaker CLI.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=target_ms)
+    args = parser.parse_args(argv)
+    results = run(args.repeat)
+    for key, value in results.items():
+        print(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}")
+    if results["help_ms"] > args.target_ms or results["heavy_modules"]:
+        print(f"FAILED: --help took {results['help_ms']:.1f} ms (target {args.target_ms:.0f} ms), heavy modules: {results['heavy_modules']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+import argparse
+import random
+import re
+import time
+
+import SnakeMaker.smkfile_maker.wildcard_constraints as wc
+
+root = "/data/output_data/data"
+steps = ["preproc", "denoise", "degibbs", "topup", "eddy"]  # Rules with the output {output_path}/<step>/{sample}/b1000.nii.gz
+sites = ["BIOPD", "CTRL", "PDMCI", "HC"]
+
+
+def create_samples(size: int, seed: int = 0) -> list:
+    """
+    Creates BIDS-like sample IDs sub-<site><number>/ses-<session> with one to three sessions per subject.
+    """
+    generator = random.Random(seed)
+    output = []
+    subject = 0
+    while len(output) < size:
+        subject += 1
+        for session in range(1, generator.randint(1, 3) + 1):
+            output.append(f"sub-{generator.choice(sites)}{subject:04d}/ses-{session}")
+    return output[:size]
+
+
+def output_regex(step: str, constraint: str) -> re.Pattern:
+    """
+    The output pattern of a rule, built as Snakemake builds it from the output file and the wildcard constraint.
+    """
+    return re.compile(re.escape(f"{root}/{step}/") + f"(?P<sample>{constraint})" + re.escape("/b1000.nii.gz") + "$")
+
+
+def build_dag(samples: list, constraint: str) -> tuple:
+    """
+    Matches the targets of rule all and their inputs against the outputs of all rules - the wildcard inference
+    of the DAG build - and returns the matched (rule, sample) pairs and the measured time in seconds.
+    """
+    start = time.perf_counter()
+    patterns = [(step, output_regex(step, constraint)) for step in steps]
+    targets = [f"{root}/{step}/{sample}/b1000.nii.gz" for sample in samples for step in steps]
+    matched = []
+    for target in targets:
+        for step, pattern in patterns:
+            match = pattern.match(target)
+            if match:
+                matched.append((step, match.group("sample")))
+    return matched, time.perf_counter() - start
+
+
+def run(sizes: list = None) -> dict:
+    """
+    Builds the wildcard inference of a five rule chain for growing cohorts with the alternation of all samples,
+    the exact trie-factored and the shape constraint.
+
+    Args:
+        sizes (list, optional): The cohort sizes. Defaults to [100, 1000, 5000].
+
+    Returns:
+        dict: Measured times in seconds, the constraint lengths and if the matches are identical.
+    """
+    results = dict()
+    for size in sizes or [100, 1000, 5000]:
+        samples = create_samples(size)
+        constraints = {"alternation": "|".join(re.escape(sample) for sample in samples)}
+        for mode in wc.modes:
+            start = time.perf_counter()
+            constraints[mode] = wc.create_constraint(samples, mode)[0]
+            results[f"{size}_{mode}_generate_s"] = time.perf_counter() - start
+        reference = None
+        for name, constraint in constraints.items():
+            matched, seconds = build_dag(samples, constraint)
+            results[f"{size}_{name}_dag_s"] = seconds
+            results[f"{size}_{name}_length"] = len(constraint)
+            reference = matched if reference is None else reference
+            results[f"{size}_{name}_identical"] = matched == reference
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="snakemaker bench wildcard_constraints", description="Benchmark of the DAG wildcard matching against the cohort size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args(argv)
+    results = run(args.sizes)
+    for key, value in results.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    return 0 if all(value for key, value in results.items() if key.endswith("_identical")) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
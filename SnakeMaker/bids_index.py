@@ -0,0 +1,378 @@
+import os
+import pickle
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import SnakeMaker.utils as ut
+
+# Precompiled patterns for BIDS folders and filenames
+SUBJECT_DIR_PATTERN = re.compile(r"^sub-(?P<label>[a-zA-Z0-9]+)$")
+SESSION_DIR_PATTERN = re.compile(r"^ses-(?P<label>[a-zA-Z0-9]+)$")
+FILENAME_PATTERN = re.compile(r"^(?P<entities>(?:[a-zA-Z]+-[a-zA-Z0-9]+_)+)(?P<suffix>[a-zA-Z0-9]+)(?P<extension>\.[^/\\]+)?$")
+ENTITY_PATTERN = re.compile(r"([a-zA-Z]+)-([a-zA-Z0-9]+)_")
+
+# Short BIDS entity keys and their full (pybids) names
+entity_names = {
+    "sub": "subject",
+    "ses": "session",
+    "acq": "acquisition",
+    "dir": "direction",
+    "task": "task",
+    "run": "run",
+    "rec": "reconstruction",
+    "ce": "ceagent",
+    "echo": "echo",
+}
+# Version of the on-disk index cache, bump when the row format changes
+cache_version = 2
+# Columns which are always present in the index, ordered as in pybids BIDSLayout.to_df()
+base_columns = ["path", "acquisition", "datatype", "direction", "extension", "session", "subject", "suffix"]
+
+
+def parse_filename(filename: str) -> dict | None:
+    """
+    Parses BIDS entities from the given filename.
+
+    Args:
+        filename (str): The name of the file (without directories).
+
+    Returns:
+        dict | None: A dictionary with entities, suffix and extension, or None if the filename is not BIDS-like.
+
+    Example:
+    >>> parse_filename("sub-01_ses-1_acq-b0_dir-PA_dwi.nii.gz")
+    {'subject': '01', 'session': '1', 'acquisition': 'b0', 'direction': 'PA', 'suffix': 'dwi', 'extension': '.nii.gz'}
+    """
+    match = FILENAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    entities = {entity_names.get(key, key): value for key, value in ENTITY_PATTERN.findall(match.group("entities"))}
+    entities["suffix"] = match.group("suffix")
+    entities["extension"] = match.group("extension") or ""
+    return entities
+
+
+def scan_datatype(directory: str, subject: str, session: str | None, datatype: str | None) -> list:
+    """
+    Scans one directory of a BIDS dataset and returns parsed file rows.
+
+    Args:
+        directory (str): The directory to scan.
+        subject (str): The subject label of the directory.
+        session (str | None): The session label of the directory, None for sessionless datasets.
+        datatype (str | None): The datatype of the directory (anat, dwi, ...), None for files directly in subject/session folder.
+
+    Returns:
+        list: A list of dictionaries, one per file.
+    """
+    rows = []
+    with os.scandir(directory) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):  # Sorted for deterministic row order
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            entities = parse_filename(entry.name)
+            if entities is None or entities.get("subject") != subject:
+                continue
+            if session is not None and entities.get("session") != session:
+                continue
+            entities["path"] = entry.path
+            entities["datatype"] = datatype
+            rows.append(entities)
+    return rows
+
+
+def scan_session(session_path: str, subject: str, session: str | None) -> list:
+    """
+    Scans a single session folder (or a sessionless subject folder).
+
+    Args:
+        session_path (str): The path to the session folder.
+        subject (str): The subject label.
+        session (str | None): The session label, None for sessionless subjects.
+
+    Returns:
+        list: A list of file rows of the session.
+    """
+    rows = scan_datatype(session_path, subject, session, None)
+    with os.scandir(session_path) as entries:
+        datatype_dirs = sorted((entry.name, entry.path) for entry in entries if entry.is_dir() and not entry.name.startswith("."))
+    for datatype, datatype_path in datatype_dirs:
+        rows.extend(scan_datatype(datatype_path, subject, session, datatype))
+    return rows
+
+
+def scan_subject(subject_path: str, subject: str) -> list:
+    """
+    Scans a single subject folder with all of its sessions.
+
+    Args:
+        subject_path (str): The path to the subject folder.
+        subject (str): The subject label.
+
+    Returns:
+        list: A list of file rows of the subject.
+    """
+    session_dirs = list_labeled_dirs(subject_path, SESSION_DIR_PATTERN)
+    if not session_dirs:  # Sessionless dataset
+        return scan_session(subject_path, subject, None)
+    rows = scan_datatype(subject_path, subject, None, None)
+    for session, session_path in session_dirs:
+        rows.extend(scan_session(session_path, subject, session))
+    return rows
+
+
+def list_labeled_dirs(directory: str, pattern: re.Pattern) -> list:
+    """
+    Lists the directories matching the given pattern.
+
+    Args:
+        directory (str): The directory to list.
+        pattern (re.Pattern): The compiled pattern with a 'label' group.
+
+    Returns:
+        list: A sorted list of (label, path) tuples.
+    """
+    output = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            match = pattern.match(entry.name)
+            if match and entry.is_dir():
+                output.append((match.group("label"), entry.path))
+    return sorted(output)
+
+
+def scan_bids(root: str, cache_path: str = None, workers: int = 1, failed_subjects: dict = None) -> dict:
+    """
+    Walks the BIDS dataset with os.scandir and builds a columnar index of all subject files.
+
+    When `cache_path` is provided, the index is loaded from the on-disk cache and only subjects/sessions
+    with changed directory mtimes are rescanned. The merged index is written back to the cache.
+    Subject folders are scanned by a thread pool of `workers` threads, rows keep the order of the subjects.
+    A subject which could not be scanned is reported in the error log and left out of the index, the others are kept.
+
+    Args:
+        root (str): The root path of the BIDS dataset.
+        cache_path (str, optional): The path to the index cache file. Defaults to None (no cache).
+        workers (int, optional): The number of scanning threads, 1 for a serial scan. Defaults to 1.
+        failed_subjects (dict, optional): Filled with {subject: error message} of the subjects which could not be scanned. Defaults to None.
+
+    Returns:
+        dict: A columnar table (column name -> list of values) with the same columns as pybids BIDSLayout.to_df().
+
+    Raises:
+        FileNotFoundError: If the root directory does not exist.
+    """
+    if not ut.directory_exists(root):
+        msg = f"BIDS directory {root} does not exist."
+        ut.get_logger("error_logger").error(msg)
+        raise FileNotFoundError(msg)
+    root = os.path.abspath(root)
+    cache = load_index_cache(cache_path, root) if cache_path else dict()
+    subjects = dict()
+    rows = []
+    subject_dirs = list_labeled_dirs(root, SUBJECT_DIR_PATTERN)
+    if workers > 1 and len(subject_dirs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:  # os.scandir and os.stat release the GIL
+            futures = [executor.submit(try_scan_subject, path, subject, cache.get(subject)) for subject, path in subject_dirs]
+            entries = [future.result() for future in futures]
+    else:
+        entries = [try_scan_subject(path, subject, cache.get(subject)) for subject, path in subject_dirs]
+    for (subject, _), (entry, error) in zip(subject_dirs, entries):
+        if error:
+            if failed_subjects is not None:
+                failed_subjects[subject] = error
+            msg = f"Subject {subject} could not be scanned: {error}"
+            ut.get_logger("error_logger").error(msg)
+            continue
+        subjects[subject] = entry
+        rows.extend(subjects[subject]["rows"])
+        for session_entry in subjects[subject]["sessions"].values():
+            rows.extend(session_entry["rows"])
+    if cache_path:
+        rescanned = sum(session_entry.get("rescanned", False) for entry in subjects.values() for session_entry in entry["sessions"].values())
+        msg = f"BIDS index cache {cache_path}: rescanned {rescanned} of {sum(len(entry['sessions']) for entry in subjects.values())} sessions."
+        ut.get_logger("info_logger").info(msg)
+        if rescanned or subjects.keys() != cache.keys() or any(entry["mtime"] != cache[subject]["mtime"] for subject, entry in subjects.items()):
+            save_index_cache(cache_path, root, subjects)
+    return rows_to_columns(rows)
+
+
+def directory_stamp(directory: str) -> tuple:
+    """
+    Creates a stamp of the directory from its mtime and the mtimes of its direct subdirectories.
+
+    Args:
+        directory (str): The path to the directory.
+
+    Returns:
+        tuple: The stamp which changes when a file is added, removed or renamed in the directory or its subdirectories.
+    """
+    with os.scandir(directory) as entries:
+        subdirs = sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir())
+    return (os.stat(directory).st_mtime_ns, tuple(subdirs))
+
+
+def scan_session_cached(session_path: str, subject: str, session: str | None, cached: dict = None) -> dict:
+    """
+    Scans a session folder unless the cached entry has the same directory stamp.
+
+    Args:
+        session_path (str): The path to the session folder.
+        subject (str): The subject label.
+        session (str | None): The session label, None for sessionless subjects.
+        cached (dict, optional): The cached entry of the session. Defaults to None.
+
+    Returns:
+        dict: The session entry with stamp and file rows.
+    """
+    stamp = directory_stamp(session_path)
+    if cached and cached["stamp"] == stamp:
+        return {"stamp": stamp, "rows": cached["rows"]}
+    return {"stamp": stamp, "rows": scan_session(session_path, subject, session), "rescanned": True}
+
+
+def scan_subject_cached(subject_path: str, subject: str, cached: dict = None) -> dict:
+    """
+    Scans a subject folder, reusing cached sessions which were not changed.
+
+    Args:
+        subject_path (str): The path to the subject folder.
+        subject (str): The subject label.
+        cached (dict, optional): The cached entry of the subject. Defaults to None.
+
+    Returns:
+        dict: The subject entry with mtime, session folders, subject level rows and session entries.
+    """
+    mtime = os.stat(subject_path).st_mtime_ns
+    cached = cached or dict()
+    if cached.get("mtime") == mtime:  # No session was added or removed
+        session_dirs = cached["session_dirs"]
+        subject_rows = cached["rows"]
+    else:
+        session_dirs = list_labeled_dirs(subject_path, SESSION_DIR_PATTERN)
+        subject_rows = scan_datatype(subject_path, subject, None, None) if session_dirs else []
+    cached_sessions = cached.get("sessions", dict())
+    sessions = dict()
+    if not session_dirs:  # Sessionless dataset
+        sessions[None] = scan_session_cached(subject_path, subject, None, cached_sessions.get(None))
+    for session, session_path in session_dirs:
+        sessions[session] = scan_session_cached(session_path, subject, session, cached_sessions.get(session))
+    return {"mtime": mtime, "session_dirs": session_dirs, "rows": subject_rows, "sessions": sessions}
+
+
+def try_scan_subject(subject_path: str, subject: str, cached: dict = None) -> tuple:
+    """
+    Scans a subject folder with scan_subject_cached, the error is returned instead of being raised.
+
+    Args:
+        subject_path (str): The path to the subject folder.
+        subject (str): The subject label.
+        cached (dict, optional): The cached entry of the subject. Defaults to None.
+
+    Returns:
+        tuple: (subject entry | None, error message | None).
+    """
+    try:
+        return scan_subject_cached(subject_path, subject, cached), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def load_index_cache(cache_path: str, root: str) -> dict:
+    """
+    Loads the index cache. The cache is ignored if it is missing, corrupted, or created for a different dataset.
+
+    Args:
+        cache_path (str): The path to the index cache file.
+        root (str): The absolute root path of the BIDS dataset.
+
+    Returns:
+        dict: The cached subject entries, or an empty dictionary.
+    """
+    if not ut.file_exists(cache_path):
+        return dict()
+    try:
+        with open(cache_path, "rb") as f:
+            cache = pickle.load(f)
+    except Exception as e:
+        msg = f"BIDS index cache {cache_path} could not be loaded and will be rebuilt: {e}"
+        ut.get_logger("error_logger").error(msg)
+        return dict()
+    if not isinstance(cache, dict) or cache.get("version") != cache_version or cache.get("root") != root:
+        return dict()
+    return cache.get("subjects", dict())
+
+
+def save_index_cache(cache_path: str, root: str, subjects: dict) -> None:
+    """
+    Atomically writes the index cache.
+
+    Args:
+        cache_path (str): The path to the index cache file.
+        root (str): The absolute root path of the BIDS dataset.
+        subjects (dict): The subject entries to store.
+    """
+    for entry in subjects.values():
+        for session_entry in entry["sessions"].values():
+            session_entry.pop("rescanned", None)
+    ut.write_atomic(cache_path, pickle.dumps({"version": cache_version, "root": root, "subjects": subjects}, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def rows_to_columns(rows: list) -> dict:
+    """
+    Converts file rows into the columnar table.
+
+    Args:
+        rows (list): A list of dictionaries, one per file.
+
+    Returns:
+        dict: A columnar table (column name -> list of values).
+    """
+    extra_columns = sorted(set().union(*rows) - set(base_columns))
+    columns = ["path"] + sorted(base_columns[1:] + extra_columns)
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+
+def to_dataframe(table: dict):
+    """
+    Converts the columnar table into the pandas DataFrame.
+
+    Args:
+        table (dict): The columnar table.
+
+    Returns:
+        pd.DataFrame: The table as a DataFrame, sorted by path.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(table).sort_values("path", ignore_index=True)
+
+
+def validate_with_pybids(root: str, table: dict) -> bool:
+    """
+    Validates the native index against pybids BIDSLayout. pybids is an optional dependency.
+
+    Args:
+        root (str): The root path of the BIDS dataset.
+        table (dict): The columnar table created by scan_bids.
+
+    Returns:
+        bool: True if both indexes contain the same subject files, False otherwise (or if pybids is not installed).
+    """
+    try:
+        import bids
+    except ImportError:
+        msg = "pybids is not installed, BIDS index validation is skipped."
+        ut.get_logger("info_logger").info(msg)
+        return False
+    layout_df = bids.BIDSLayout(root).to_df()
+    pybids_paths = set(layout_df[layout_df["subject"].notna()]["path"].astype(str))
+    native_paths = set(table.get("path", []))
+    if pybids_paths != native_paths:
+        msg = (
+            f"BIDS index differs from pybids: {len(native_paths - pybids_paths)} files only in native index, "
+            + f"{len(pybids_paths - native_paths)} files only in pybids index."
+        )
+        ut.get_logger("error_logger").error(msg)
+        return False
+    return True
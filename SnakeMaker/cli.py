@@ -0,0 +1,146 @@
+"""
+Console entry point of SnakeMaker.
+
+Only the standard library is imported at module level, heavy dependencies (pandas, numpy, dynaconf, yaml)
+are imported by the selected subcommand, so `snakemaker --help` stays fast.
+
+Example:
+    snakemaker generate --shards 4 --workers 8
+    snakemaker plan --input samples.csv
+    snakemaker report --output report.txt
+    snakemaker bench startup --target-ms 150
+"""
+
+import argparse
+import sys
+
+benchmarks_package = "SnakeMaker.benchmarks"
+
+
+def add_input_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the arguments shared by the generate and plan subcommands.
+    """
+    parser.add_argument("--settings", help="Settings file, defaults to config/settings.yaml.")
+    parser.add_argument("--input", help="BIDS directory or samples manifest (csv, txt, npy), defaults to app.INPUT_DIR_PATH.")
+    parser.add_argument("--shards", type=int, default=1, help="Number of independent Snakefiles, partitioned by subject.")
+    parser.add_argument("--workers", type=int, default=1, help="Threads scanning the BIDS subject folders, 0 uses all CPUs.")
+    parser.add_argument("--validate-bids", action="store_true", help="Validate the BIDS index against pybids.")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Creates the argument parser with the generate, plan, report and bench subcommands.
+    """
+    parser = argparse.ArgumentParser(prog="snakemaker", description="Generate Snakemake workflows from BIDS datasets and YAML rule configurations.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Generate rules, Snakefile(s) and run scripts.")
+    add_input_arguments(generate)
+    generate.add_argument("--no-bids-cache", action="store_true", help="Rescan the whole BIDS tree, ignoring the index cache.")
+    generate.add_argument("--no-rule-cache", action="store_true", help="Rebuild all rules, ignoring the compiled rule cache.")
+    generate.add_argument("--export-manifest", action="store_true", help="Export samples and file table into the binary manifest.")
+    generate.set_defaults(handler=generate_command)
+
+    plan = subparsers.add_parser("plan", help="Print the samples, shards and rules without writing any files.")
+    add_input_arguments(plan)
+    plan.set_defaults(handler=plan_command)
+
+    report = subparsers.add_parser("report", help="Summarize the benchmarks of the workflow runs per rule and sample.")
+    report.add_argument("--settings", help="Settings file, defaults to config/settings.yaml.")
+    report.add_argument("--benchmarks", help="Benchmarks directory, defaults to OUTPUT_DIR_PATH/benchmarks.")
+    report.add_argument("--output", help="Write the report to this file and the per-rule summary next to it (.tsv).")
+    report.add_argument("--top", type=int, default=10, help="Number of the slowest rules and samples.")
+    report.set_defaults(handler=report_command)
+
+    bench = subparsers.add_parser("bench", help="Run a benchmark from SnakeMaker.benchmarks, remaining arguments are passed to it.")
+    bench.add_argument("name", help="Benchmark module name, e.g. bids_index or startup.")
+    bench.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the benchmark.")
+    bench.set_defaults(handler=bench_command)
+    return parser
+
+
+def load_config(args: argparse.Namespace):
+    """
+    Returns the settings given by --settings, or None for the default settings.
+    """
+    if not args.settings:
+        return None
+    import SnakeMaker.defaults as df
+
+    return df.get_settings(args.settings)
+
+
+def generate_command(args: argparse.Namespace) -> int:
+    from SnakeMaker.snakemaker import Snakemaker
+
+    snakemaker = Snakemaker(
+        input_data_files=args.input,
+        config=load_config(args),
+        validate_bids=args.validate_bids,
+        bids_cache=not args.no_bids_cache,
+        rule_cache=not args.no_rule_cache,
+        workers=args.workers,
+        export_manifest=args.export_manifest,
+        shards=args.shards,
+    )
+    print(f"Generated workflow for {len(snakemaker.samples)} samples and {len(snakemaker.rules)} rules.")
+    if snakemaker.failed_subjects:
+        print(f"Failed subjects ({len(snakemaker.failed_subjects)}): {', '.join(sorted(snakemaker.failed_subjects))}")
+    return 0
+
+
+def plan_command(args: argparse.Namespace) -> int:
+    import SnakeMaker.utils as ut
+    from SnakeMaker.snakemaker import Snakemaker
+
+    snakemaker = Snakemaker(input_data_files=args.input, config=load_config(args), validate_bids=args.validate_bids, workers=args.workers, debug=True)
+    snakemaker.bids_cache = False  # Plan does not write anything
+    snakemaker.shards = args.shards
+    snakemaker.initialize_config()
+    snakemaker.assign_env_variables()
+    snakemaker.samples = snakemaker.create_samples(snakemaker.input_data_files)
+    rule_configuration = snakemaker.rule_configuration
+    rule_configuration = rule_configuration.get("rules", rule_configuration) if isinstance(rule_configuration, dict) else {}
+    print(f"Samples: {len(snakemaker.samples)}")
+    if snakemaker.failed_subjects:
+        print(f"Failed subjects: {len(snakemaker.failed_subjects)}")
+    if args.shards > 1:
+        for shard, samples in enumerate(snakemaker.partition_samples(args.shards)):
+            print(f"Shard {shard}: {len(samples)} samples")
+    print(f"Rules ({len(rule_configuration)}): {', '.join(rule_configuration)}")
+    print(f"Output: {ut.get_env_variable('OUTPUT_SNAKEMAKE_PATH')}")
+    return 0
+
+
+def report_command(args: argparse.Namespace) -> int:
+    import SnakeMaker.benchmark_report as br
+    from SnakeMaker.snakemaker import Snakemaker
+
+    snakemaker = Snakemaker(config=load_config(args), debug=True)
+    snakemaker.initialize_config()
+    snakemaker.assign_env_variables()
+    rules = snakemaker.create_rules(shortened=True)  # Threads as emitted, the estimated ones included
+    threads = {name: rule.threads for name, rule in rules.items() if isinstance(rule.threads, int) and not isinstance(rule.threads, bool)}
+    print(br.create_report(args.benchmarks, args.output, threads, args.top))
+    return 0
+
+
+def bench_command(args: argparse.Namespace) -> int:
+    import importlib
+
+    try:
+        module = importlib.import_module(f"{benchmarks_package}.{args.name}")
+    except ModuleNotFoundError:
+        print(f"Unknown benchmark {args.name}, see the modules in {benchmarks_package}.", file=sys.stderr)
+        return 2
+    return module.main(args.args) or 0
+
+
+def main(argv: list = None) -> int:
+    args = create_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,8 +2,6 @@ import logging
 import os
 from pathlib import Path
 
-from dynaconf import Dynaconf
-
 from SnakeMaker import utils as ut
 
 # Environ variables
@@ -12,39 +10,57 @@ os.environ["ROOT_PATH_FOR_DYNACONF"] = str(Path(__file__).parent.parent)
 os.environ["INPUT_DIR_PATH"] = ""
 os.environ["OUTPUT_DIR_PATH"] = ""
 
-settings = Dynaconf(settings_files=["config/settings.yaml"], environments=False)
-
-# Loggers
-log_settings = settings.get("logger")
-info_logger = ut.create_logger(
-    name="info_logger",
-    path=ut.merge_root_path(log_settings.info.path),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s - %(message)s",
-    filemode="a",
-)
-error_logger = ut.create_logger(
-    name="error_logger",
-    path=ut.merge_root_path(log_settings.error.path),
-    level=logging.ERROR,
-    format="%(asctime)s %(levelname)s - %(message)s",
-    filemode="a",
-)
-debug_logger = ut.create_logger(
-    name="debug_logger",
-    path=ut.merge_root_path(log_settings.debug.path),
-    level=logging.DEBUG,
-    format="%(asctime)s %(levelname)s - %(message)s",
-    filemode="a",
-)
-
-# Default lists/dicts
-loggers = {
-    "info_logger": info_logger,
-    "error_logger": error_logger,
-    "debug_logger": debug_logger,
-}
-pass
+# Settings and loggers are created on first use (see __getattr__), not at import time
+lazy_values = dict()
+logger_format = "%(asctime)s %(levelname)s - %(message)s"
+
+
+def get_settings(settings_file: str = None):
+    """
+    Returns the Dynaconf settings, loaded on first use.
+
+    Args:
+        settings_file (str, optional): Loads the settings from this file instead of config/settings.yaml. Defaults to None.
+    """
+    if "settings" not in lazy_values or settings_file:
+        from dynaconf import Dynaconf
+
+        lazy_values["settings"] = Dynaconf(settings_files=[settings_file or "config/settings.yaml"], environments=False)
+    return lazy_values["settings"]
+
+
+def get_loggers() -> dict:
+    """
+    Returns the default loggers, created on first use.
+    """
+    if "loggers" not in lazy_values:
+        log_settings = get_settings().get("logger")
+        lazy_values["loggers"] = {
+            "info_logger": ut.create_logger(
+                name="info_logger", path=ut.merge_root_path(log_settings.info.path), level=logging.INFO, format=logger_format, filemode="a"
+            ),
+            "error_logger": ut.create_logger(
+                name="error_logger", path=ut.merge_root_path(log_settings.error.path), level=logging.ERROR, format=logger_format, filemode="a"
+            ),
+            "debug_logger": ut.create_logger(
+                name="debug_logger", path=ut.merge_root_path(log_settings.debug.path), level=logging.DEBUG, format=logger_format, filemode="a"
+            ),
+        }
+    return lazy_values["loggers"]
+
+
+def __getattr__(name: str):
+    # Lazy module attributes: settings, log_settings, loggers, info_logger, error_logger, debug_logger
+    if name == "settings":
+        return get_settings()
+    if name == "log_settings":
+        return get_settings().get("logger")
+    if name == "loggers":
+        return get_loggers()
+    if name in ("info_logger", "error_logger", "debug_logger"):
+        return get_loggers()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 env_variables_mapping = {
     "input_data_dir": {
@@ -97,7 +113,7 @@ b0 = {
 b1000 = {
     "name": "b1000",
     "datatype": "dwi",
-    "acquisition": "b0",
+    "acquisition": "b1000",
     "direction": "",
     "nifti": "",
     "json": "",
@@ -105,22 +121,35 @@ b1000 = {
     "bvec": "",
 }
 
+nifti_extensions = [".nii.gz", ".nii"]
+
 default_placeholders = {
     "input_dir_path": "INPUT_DIR_PATH",
     "rule0_folder_name": "RULE0_FOLDER_NAME",
     # Add more mappings as needed
 }
 
+bids_index_cache_name = ".bids_index.pkl"  # Saved in OUTPUT_SNAKEMAKE_PATH
+manifest_folder_name = "manifest"  # Binary samples manifest, saved in OUTPUT_SNAKEMAKE_PATH
+
 output_env_variables = ["OUTPUT_RULE_MAKER_PATH", "OUTPUT_SNAKEMAKE_PATH"]
 env_variables_excluded = ["ROOT_PATH_FOR_DYNACONF", "APPLICATION_ROOT_PATH", "OUTPUT_DIR_PATH"]
 list_env_variables = ["CUSTOM_FUNCTIONS_PATH_LIST"]
 
 
+smkfile_name = "Snakemake.smk"
+# Sharded workflow - one Snakefile and run scripts per shard
+shard_smkfile_name = "Snakemake.shard-{shard}.smk"
+shard_dry_run_name = "dry_run.shard-{shard}.sh"
+shard_hot_run_name = "run.shard-{shard}.sh"
+wave_run_name = "run_waves.sh"  # Rule all in batches, see the waves option
+shard_wave_run_name = "run_waves.shard-{shard}.sh"
+
 dry_run_command = """#!/bin/bash
-snakemake all --dry-run --debug-dag --snakefile Snakemake.smk
+snakemake all --dry-run --debug-dag --snakefile {snakefile}
 """
 hot_run_command = """#!/bin/bash
-snakemake all --cores all --debug-dag --keep-going --snakefile Snakemake.smk
+snakemake all --cores all --debug-dag --keep-going --snakefile {snakefile}{options}
 """
 
 
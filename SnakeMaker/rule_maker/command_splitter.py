@@ -0,0 +1,135 @@
+"""
+Splitting of multi-command shell rules into independent parts.
+
+Shell commands of a rule are independent when they write disjoint outputs and none of them uses the output
+of another, e.g. "dwidenoise {input.b0} {output.b0_denoised}" and "dwidenoise {input.b1000} {output.b1000_denoised}".
+Commands sharing an output key are kept together in one part, in their original order. Rules are split only
+when every command references its inputs and outputs by key, so the parts and their files are known.
+"""
+
+import copy
+import re
+
+from SnakeMaker.rule_maker import rule_defaults as rdf
+
+reference_pattern = re.compile(r"\{(input|output|params)\.(\w+)\}")
+whole_reference_pattern = re.compile(r"\{(input|output|params)(\}|\[)")  # {input}, {output[0]} - not splittable
+
+
+def get_commands(shell: list) -> list:
+    """
+    Returns the shell commands, lines ending with a backslash are joined with the following line.
+    """
+    output = []
+    continued = False
+    for line in shell:
+        line = str(line)
+        if continued:
+            output[-1].append(line)
+        else:
+            output.append([line])
+        continued = line.rstrip().endswith("\\")
+    return output
+
+
+def get_references(command: list) -> dict:
+    """
+    Returns the keys referenced by the command {"input": set, "output": set, "params": set}.
+    """
+    output = {"input": set(), "output": set(), "params": set()}
+    for line in command:
+        for section, key in reference_pattern.findall(line):
+            output[section].add(key)
+    return output
+
+
+def find_parts(rule) -> list | None:
+    """
+    Finds the independent parts of the rule shell.
+
+    Args:
+        rule (Rule): The rule.
+
+    Returns:
+        list | None: Parts [{"shell": [lines], "input": set, "output": set, "params": set}] in the order of the commands,
+                     None if the rule has a single part or can not be split.
+    """
+    if not rule.shell or rule.run:
+        return None
+    commands = get_commands(rule.shell)
+    if len(commands) < 2 or any(whole_reference_pattern.search(line) for command in commands for line in command):
+        return None
+    references = [get_references(command) for command in commands]
+    if any(not reference["output"] for reference in references):  # Command with unknown outputs (mkdir, cd, ...)
+        return None
+    output_keys = [key for item in rule.outputs for key in item]
+    if set(output_keys) != set().union(*(reference["output"] for reference in references)):
+        return None  # Outputs written implicitly (prefixes, log files)
+    # Union of commands sharing an output key
+    parts = []
+    for index, reference in enumerate(references):
+        part = {"commands": [index], "input": set(reference["input"]), "output": set(reference["output"]), "params": set(reference["params"])}
+        for other in [other for other in parts if other["output"] & reference["output"]]:
+            parts.remove(other)
+            part["commands"] = other["commands"] + part["commands"]
+            for key in ("input", "output", "params"):
+                part[key] |= other[key]
+        parts.append(part)
+    if len(parts) < 2:
+        return None
+    # Keep the original command order within and across the parts
+    parts.sort(key=lambda part: min(part["commands"]))
+    for part in parts:
+        part["shell"] = [line for index in sorted(part.pop("commands")) for line in commands[index]]
+    return parts
+
+
+def split_rule(rule, parts: list) -> list:
+    """
+    Splits the rule into sub-rules <rule>_part<i>, one per part. Inputs not referenced by any command are kept
+    in every sub-rule, as they can be implicit dependencies. Threads, resources and the benchmark are copied.
+
+    Args:
+        rule (Rule): The rule to split.
+        parts (list): The parts from find_parts.
+
+    Returns:
+        list: The sub-rules.
+    """
+    referenced = set().union(*(part["input"] for part in parts))
+    output = []
+    for index, part in enumerate(parts, start=1):
+        sub_rule = copy.deepcopy(rule)
+        sub_rule.name = f"{rule.name}{rdf.split_rule_suffix}{index}"
+        sub_rule.inputs = [item for item in rule.inputs if any(key in part["input"] or key not in referenced for key in item)]
+        sub_rule.outputs = [item for item in rule.outputs if any(key in part["output"] for key in item)]
+        sub_rule.params = [item for item in rule.params or [] if any(key in part["params"] for key in item)]
+        sub_rule.shell = list(part["shell"])
+        if rule.benchmark:
+            sub_rule.benchmark = rule.benchmark.replace(f"/{rule.name}/", f"/{sub_rule.name}/").replace(f"/{rule.name}.tsv", f"/{sub_rule.name}.tsv")
+        output.append(sub_rule)
+    return output
+
+
+def concurrent_shell(parts: list, threads: int | None) -> list:
+    """
+    Returns the shell running the parts as background jobs, at most `threads` at once. Every batch is awaited
+    job by job, so a failing command fails the rule.
+
+    Args:
+        parts (list): The parts from find_parts.
+        threads (int | None): The thread budget of the rule, None to run all parts at once.
+
+    Returns:
+        list: The shell lines.
+    """
+    batch_size = threads if isinstance(threads, int) and threads > 0 else len(parts)
+    output = []
+    for start in range(0, len(parts), batch_size):
+        for part in parts[start : start + batch_size]:
+            if len(part["shell"]) == 1:
+                output.append(f"{part['shell'][0]} &")
+            else:
+                output += ["("] + part["shell"] + [") &"]
+        output.append(rdf.concurrent_wait_command)
+    return output
@@ -0,0 +1,110 @@
+"""
+Interned path templates of the rule inputs and outputs.
+
+A template is parsed once into its root, literal segments and wildcards, e.g. INPUT_DIR_PATH with ("base", "{sample}", "b0.nii.gz").
+The full form (root joined by pathlib) and the shortened form ({output_path}/base/{sample}/b0.nii.gz) are rendered on the first
+use and cached. Equal templates are shared through the intern table, so registered names of all rules point to one object.
+"""
+
+import re
+from pathlib import Path
+
+wildcard_pattern = re.compile(r"\{(\w+)\}")
+short_root = "{output_path}"
+templates = dict()  # Intern table {(root, segments, short_root, short_segments): PathTemplate}
+
+
+class PathTemplate:
+    __slots__ = ("root", "segments", "short_root", "short_segments", "wildcards", "short_wildcards", "_full", "_short")
+
+    def __init__(self, root: str, segments: tuple, short_root: str = short_root, short_segments: tuple = None):
+        """
+        Parses the template, use intern_template to get the shared instance.
+
+        Args:
+            root (str): The root directory of the full form, e.g. INPUT_DIR_PATH.
+            segments (tuple): The literal segments joined to the root, wildcards like "{sample}" included.
+            short_root (str, optional): The root of the shortened form. Defaults to "{output_path}".
+            short_segments (tuple, optional): The segments of the shortened form, if they differ. Defaults to None.
+        """
+        self.root = root
+        self.segments = tuple(segments)
+        self.short_root = short_root
+        self.short_segments = self.segments if short_segments is None else tuple(short_segments)
+        self.wildcards = frozenset(wildcard_pattern.findall("/".join((root,) + self.segments)))
+        self.short_wildcards = frozenset(wildcard_pattern.findall("/".join((short_root,) + self.short_segments)))
+        self._full = None
+        self._short = None
+
+    def __reduce__(self):
+        # Unpickled templates (rule cache) are interned again
+        return intern_template, (self.root, self.segments, self.short_root, self.short_segments)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PathTemplate) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __str__(self) -> str:
+        return self.full
+
+    def __repr__(self) -> str:
+        return f"PathTemplate({self.full!r})"
+
+    @property
+    def key(self) -> tuple:
+        return (self.root, self.segments, self.short_root, self.short_segments)
+
+    @property
+    def full(self) -> str:
+        if self._full is None:
+            self._full = str(Path(self.root).joinpath(*self.segments))
+        return self._full
+
+    @property
+    def short(self) -> str:
+        if self._short is None:
+            self._short = "/".join((self.short_root,) + self.short_segments)
+        return self._short
+
+    def render(self, shortened: bool = False) -> str:
+        return self.short if shortened else self.full
+
+    def get_wildcards(self, shortened: bool = False) -> frozenset:
+        """
+        Returns the names of the wildcards in the rendered form, e.g. {"sample"} or {"output_path", "sample"}.
+        """
+        return self.short_wildcards if shortened else self.wildcards
+
+
+def intern_template(root: str, segments: tuple, short_root: str = short_root, short_segments: tuple = None) -> PathTemplate:
+    """
+    Returns the shared template of the path, parsed on the first request.
+
+    Example:
+    >>> template = intern_template("data/input_data", ("base", "{sample}", "b0.nii.gz"))
+    >>> template.render(shortened=True), sorted(template.wildcards)
+    ('{output_path}/base/{sample}/b0.nii.gz', ['sample'])
+    """
+    segments = tuple(segments)
+    short_segments = segments if short_segments is None else tuple(short_segments)
+    key = (root, segments, short_root, short_segments)
+    template = templates.get(key)
+    if template is None:
+        template = templates[key] = PathTemplate(root, segments, short_root, short_segments)
+    return template
+
+
+def render_path(value, shortened: bool = False):
+    """
+    Renders the template, other values (literal paths, functions) are returned as they are.
+    """
+    return value.render(shortened) if isinstance(value, PathTemplate) else value
+
+
+def render_paths(items: list, shortened: bool = False) -> list:
+    """
+    Renders the templates of parsed rule inputs or outputs [{key: value}].
+    """
+    return [{key: render_path(value, shortened) for key, value in item.items()} for item in items]
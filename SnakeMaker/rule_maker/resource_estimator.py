@@ -0,0 +1,185 @@
+"""
+Estimation of rule resources (threads, mem_mb, runtime) from past Snakemake benchmark measurements.
+
+Benchmarks are read from OUTPUT_DIR_PATH/benchmarks/<rule>/<sample>.tsv (the Snakemake benchmark format with
+s, max_rss, cpu_time, ... columns). For every rule the chosen quantile of the measurements is taken with a headroom.
+When the sizes of the rule inputs are known for enough samples, memory and runtime are fitted linearly against
+the input size and emitted as callables of `input.size_mb`.
+"""
+
+import math
+import os
+
+import SnakeMaker.utils as ut
+from SnakeMaker.rule_maker import rule_defaults as rdf
+
+benchmark_extension = ".tsv"
+numeric_columns = ["s", "max_rss", "io_in", "io_out", "cpu_time"]
+
+
+def get_benchmarks_path() -> str:
+    return ut.merge_paths(ut.get_env_variable("OUTPUT_DIR_PATH"), rdf.benchmarks_folder_name)
+
+
+def find_benchmarks(directory: str) -> dict:
+    """
+    Finds the benchmark files of all rules.
+
+    Args:
+        directory (str): The benchmarks directory.
+
+    Returns:
+        dict: {rule_name: [(sample, path)]}, the sample is the path relative to the rule folder without extension,
+              empty for benchmarks of rules which do not run per sample (<rule>.tsv).
+    """
+    output = dict()
+    if not os.path.isdir(directory):
+        return output
+    for rule_entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if rule_entry.is_file() and rule_entry.name.endswith(benchmark_extension):
+            output.setdefault(rule_entry.name[: -len(benchmark_extension)], []).append(("", rule_entry.path))
+            continue
+        if not rule_entry.is_dir():
+            continue
+        for root, directories, files in os.walk(rule_entry.path):
+            directories.sort()  # Stable order of the samples and of the cache stamp
+            for name in sorted(files):
+                if name.endswith(benchmark_extension):
+                    path = os.path.join(root, name)
+                    sample = os.path.relpath(path, rule_entry.path)[: -len(benchmark_extension)]
+                    output.setdefault(rule_entry.name, []).append((sample, path))
+    return output
+
+
+def benchmarks_stamp(directory: str) -> list:
+    """
+    Returns [(path, size, mtime)] of all benchmark files, used to invalidate cached rules when measurements change.
+    """
+    output = []
+    for files in find_benchmarks(directory).values():
+        for _, path in files:
+            stat = os.stat(path)
+            output.append((path, stat.st_size, stat.st_mtime_ns))
+    return output
+
+
+def input_size_mb(rule, sample: str) -> float | None:
+    """
+    Returns the summed size of the rule inputs for the sample in MB, None if some of the inputs does not exist.
+    """
+    output_dir = ut.get_env_variable("OUTPUT_DIR_PATH")
+    input_dir = ut.get_env_variable("INPUT_DIR_PATH")
+    size = 0
+    for item in rule.inputs:
+        for value in item.values():
+            if not isinstance(value, str):  # Input functions can not be resolved here
+                return None
+            path = value.replace("{output_path}", output_dir).replace("{input_path}", input_dir).replace("{sample}", sample)
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                return None
+    return size / 1024**2
+
+
+def load_benchmarks(files: list, rule=None):
+    """
+    Loads the benchmark files of one rule into a DataFrame.
+
+    Args:
+        files (list): The benchmark files [(sample, path)].
+        rule (Rule, optional): The rule, to resolve the input size of each sample. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Measurements with the sample, s, max_rss, io_in, io_out, cpu_time and input_size_mb columns.
+    """
+    import pandas as pd
+
+    frames = []
+    for sample, path in files:
+        try:
+            frame = pd.read_csv(path, sep="\t")
+        except (OSError, ValueError) as e:
+            ut.get_logger("error_logger").error(f"Benchmark {path} could not be read: {e}")
+            continue
+        frame["sample"] = sample
+        frame["input_size_mb"] = input_size_mb(rule, sample) if rule is not None else None
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["sample", "input_size_mb"] + numeric_columns)
+    data = pd.concat(frames, ignore_index=True)
+    for column in numeric_columns + ["input_size_mb"]:
+        data[column] = pd.to_numeric(data[column], errors="coerce") if column in data else float("nan")
+    return data
+
+
+def fit_linear(size, values, quantile: float, headroom: float, minimum: int) -> str | None:
+    """
+    Fits values = a + b * size and returns a Snakemake callable of the input size, with the residual
+    quantile and headroom added. None if the values do not grow with the size.
+    """
+    import numpy as np
+
+    slope, intercept = np.polyfit(size, values, 1)
+    if not slope > 0:
+        return None
+    residual = max(float(np.quantile(values - (intercept + slope * size), quantile)), 0.0)
+    return f"lambda wildcards, input: max({minimum}, int(({intercept:.4f} + {slope:.6f} * input.size_mb + {residual:.4f}) * {1 + headroom:g}) + 1)"
+
+
+def estimate_rule(data, options: dict) -> dict:
+    """
+    Estimates the resources of one rule from its measurements.
+
+    Args:
+        data (pd.DataFrame): The measurements of the rule.
+        options (dict): The rule_maker options (resource_quantile, resource_headroom, resource_min_samples, max_threads).
+
+    Returns:
+        dict: Estimated {"threads": int, "mem_mb": int | str, "runtime": int | str}, empty if there are not enough measurements.
+    """
+    quantile = options["resource_quantile"]
+    headroom = options["resource_headroom"]
+    min_samples = options["resource_min_samples"]
+    data = data.dropna(subset=["s", "max_rss"])
+    if len(data) < min_samples:
+        return dict()
+    output = dict()
+    if "cpu_time" in data and data["cpu_time"].notna().any():
+        usage = (data["cpu_time"] / data["s"].where(data["s"] > 0)).dropna()
+        max_threads = options["max_threads"] or os.cpu_count() or 1
+        output["threads"] = min(max(int(round(float(usage.median()))), 1), max_threads) if len(usage) else 1
+    output["mem_mb"] = max(math.ceil(float(data["max_rss"].quantile(quantile)) * (1 + headroom)), 1)
+    output["runtime"] = max(math.ceil(float(data["s"].quantile(quantile)) / 60 * (1 + headroom)), 1)
+    sized = data.dropna(subset=["input_size_mb"])
+    if len(sized) >= min_samples and sized["input_size_mb"].nunique() > 1:  # Scale with the input size
+        size = sized["input_size_mb"].to_numpy()
+        mem_mb = fit_linear(size, sized["max_rss"].to_numpy(), quantile, headroom, 1)
+        runtime = fit_linear(size, sized["s"].to_numpy() / 60, quantile, headroom, 1)
+        output["mem_mb"] = mem_mb or output["mem_mb"]
+        output["runtime"] = runtime or output["runtime"]
+    return output
+
+
+def estimate_resources(rules: dict, options: dict, directory: str = None) -> dict:
+    """
+    Estimates the resources of the rules with benchmark measurements.
+
+    Args:
+        rules (dict): The rules {rule_name: Rule}.
+        options (dict): The rule_maker options.
+        directory (str, optional): The benchmarks directory. Defaults to OUTPUT_DIR_PATH/benchmarks.
+
+    Returns:
+        dict: {rule_name: estimated resources}, rules without enough measurements are left out.
+    """
+    output = dict()
+    for rule_name, files in find_benchmarks(directory or get_benchmarks_path()).items():
+        if rule_name not in rules:
+            continue
+        estimates = estimate_rule(load_benchmarks(files, rules[rule_name]), options)
+        if estimates:
+            output[rule_name] = estimates
+    if output:
+        ut.get_logger("info_logger").info(f"Resources estimated from benchmarks: {output}")
+    return output
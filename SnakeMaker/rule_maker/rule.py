@@ -1,8 +1,5 @@
-from pathlib import Path
-
-from SnakeMaker import defaults as df
 from SnakeMaker import utils as ut
-from SnakeMaker.rule_maker import rule_defaults as rdf
+from SnakeMaker.rule_maker import path_template as pt
 from SnakeMaker.rule_maker import rule_utils as rut
 
 
@@ -13,11 +10,16 @@ class Rule:
         self.inputs = dict()
         self.params = dict()
         self.outputs = dict()
+        self.output_flags = dict()  # {output key: flag}, e.g. "temp", rendered as temp("<path>")
         self.resources = dict()
+        self.threads = None
+        self.benchmark = ""
+        self.group = ""
+        self.scratch = False  # Run on node-local scratch (SCRATCH_DIR)
+        self.sidecars = dict()  # {lookup key: {"path": str, "field": str}} of the sidecar params
         self.description = ""
         self.shell = list()
         self.run = ""
-        self.rule_string = ""
         # Initialize
 
     def __str__(self):
@@ -26,59 +28,7 @@ class Rule:
 
         The string includes the name, inputs, parameters, outputs, shell command, run condition, and resources of the Rule.
         """
-        return f"Rule(name={self.name}, inputs={self.inputs}, params={self.params}, outputs={self.outputs}, shell={self.shell}, run={self.run}, resources={self.resources})"
-
-    def construct_plane_rule(self):
-        inputs = ""
-        i = 0
-        for input in self.inputs:
-            for key, value in input.items():
-                if isinstance(value, dict) and "function" in value.keys():  # if its a different param
-                    inputs += f"\n\t\t{key}={value.get('function')}," if i > 0 else f"{key}={value.get('function')},"
-                else:
-                    inputs += f"\n\t\t{key}={f'"{Path(value)}"'}," if i > 0 else f"{key}={f'"{Path(value)}"'},"
-                i += 1
-        # Params
-        params = ""
-        for param in self.params:
-            for key, value in param.items():
-                if isinstance(value, dict):  # if its a different param
-                    params += f"\n\t\t{key}={value.get('function')},"  # Like function call
-                elif isinstance(value, str) and value.startswith("/"):  # if its a path value
-                    params += f"\n\t\t{key}={f'"{Path(value)}"'},"
-                elif isinstance(value, str) and value.startswith("lambda"):
-                    params += f"\n\t\t{key}={value},"
-                else:
-                    params += f"\n\t\t{key}={f'"{value}"'},"
-
-        outputs = "\n\t\t".join(
-            [f'{key}="{Path(value) if isinstance(value, str) else value}",' for outputs_dict in self.outputs for key, value in outputs_dict.items()]
-        )
-        resources = (
-            "\n\t\t".join([f"{key}={value}," for resources_dict in self.resources for key, value in resources_dict.items()]) if self.resources else ""
-        )
-        shell = '"""\n\t\t\t' + "\n\t\t\t".join([f"{cmd}" for cmd in self.shell]) + '\n\t\t"""' if self.shell else ""
-        run = ""
-        i = 0
-        for r in self.run:
-            for key, val in r.items():
-                run += f"\n\t\t{key}={val}" if i > 0 else f"{key}={val}"
-        rule_str = f"# Description: {self.description}" if self.description else "# Description missing"
-        rule_str += f"""\nrule {self.name}:"""
-        if not ut.is_none_or_empty(inputs):  # Set inputs
-            rule_str += f"""\n\tinput:\n\t\t{inputs}"""
-        if not ut.is_none_or_empty(params):  # Set parameters
-            rule_str += f"""\n\tparams:\t\t{params}"""
-        if not ut.is_none_or_empty(outputs):  # Set outputs
-            rule_str += f"""\n\toutput:\n\t\t{outputs}"""
-        if not ut.is_none_or_empty(resources):  # Set resources
-            rule_str += f"""\n\tresources:\n\t\t{resources}"""
-        if not ut.is_none_or_empty(shell):  # Set shell
-            rule_str += f"""\n\tshell:\n\t\t{shell}"""
-        if not ut.is_none_or_empty(run):  # Set run
-            rule_str += f"""\n\trun:\n\t\t{run}"""
-        # Sometimes run
-        self.rule_string = rule_str + "\n"
+        return f"Rule(name={self.name}, inputs={self.inputs}, params={self.params}, outputs={self.outputs}, output_flags={self.output_flags}, shell={self.shell}, run={self.run}, resources={self.resources}, threads={self.threads}, benchmark={self.benchmark}, group={self.group}, scratch={self.scratch})"
 
 
 class RuleBuilder:
@@ -119,8 +69,9 @@ class RuleBuilder:
             msg = f"Inputs for rule {self.rule.name} is None. Check the inputs for the rule."
             ut.get_logger("error_logger").error(msg)
             print(f"{msg}. Check the inputs for the rule.")
-        self.rule.inputs = rut.parse_input_keys_rule(inputs, registered_names, shortened=self.shortened)
-        register_names(self, self.rule.inputs, registered_names)
+        inputs = rut.parse_input_keys_rule(inputs, registered_names, shortened=self.shortened)
+        register_names(self, inputs, registered_names)
+        self.rule.inputs = pt.render_paths(inputs, self.shortened)
         return self
 
     def set_params(self, params: dict = None, registered_name: dict = None) -> list | None:
@@ -135,7 +86,12 @@ class RuleBuilder:
         """
         if params is None:
             return self
-        self.rule.params = rut.parse_params(params, registered_name)
+        self.rule.params = rut.parse_params(params, registered_name, shortened=self.shortened)
+        self.rule.sidecars = dict(
+            rut.parse_sidecar(key, value["sidecar"], registered_name, shortened=self.shortened)
+            for key, value in params.items()
+            if isinstance(value, dict) and value.get("sidecar", None)
+        )
         return self
 
     def set_outputs(self, outputs: dict | None, registered_names: dict = None) -> list | None:
@@ -152,8 +108,9 @@ class RuleBuilder:
             msg = f"Outputs for rule {self.rule.name} is None. Check the outputs for the rule."
             ut.get_logger("error_logger").error(msg)
             print(f"{msg}. Check the outputs for the rule.")
-        self.rule.outputs = rut.parse_output_keys_rule(outputs, registered_names, shortened=self.shortened)
-        register_names(self, self.rule.outputs, registered_names)
+        outputs = rut.parse_output_keys_rule(outputs, registered_names, shortened=self.shortened)
+        register_names(self, outputs, registered_names)
+        self.rule.outputs = pt.render_paths(outputs, self.shortened)
         return self
 
     def set_shell(self, shell: str | None, inputs: dict, outputs: dict) -> list | None:
@@ -186,17 +143,45 @@ class RuleBuilder:
         self.rule.run = rut.parse_run_command(run, registered_names)
         return self
 
-    def set_resources(self, resources: dict):
+    def set_resources(self, resources: dict | list | None):
         """
         Set the resources for the rule.
 
         Args:
-            resources (dict): A dictionary containing the resources.
+            resources (dict | list): A dictionary containing the resources, or a list of {name: value} dictionaries.
 
         Returns:
             self: The Rule object with the updated resources.
         """
-        self.rule.resources = resources
+        if resources is None:
+            return self
+        self.rule.resources = [{key: value} for key, value in resources.items()] if isinstance(resources, dict) else resources
+        return self
+
+    def set_threads(self, threads: int | str | None):
+        """
+        Set the threads of the rule.
+
+        Args:
+            threads (int | str): The number of threads, or a callable string.
+
+        Returns:
+            self: The Rule object with the updated threads.
+        """
+        self.rule.threads = threads
+        return self
+
+    def set_scratch(self, scratch: bool | None):
+        """
+        Set if the rule runs on node-local scratch.
+
+        Args:
+            scratch (bool): True to stage the inputs and outputs through SCRATCH_DIR.
+
+        Returns:
+            self: The Rule object with the updated scratch flag.
+        """
+        self.rule.scratch = bool(scratch)
         return self
 
     def set_description(self, description: str | None):
@@ -223,6 +208,7 @@ class RuleBuilder:
 
 
 def register_names(self, vars: list, registered_names: dict):
+    # Paths are registered as interned PathTemplates, rendered by the rule using them
     for var in vars:
         for var_name, path in var.items():
             if var_name in registered_names.keys():
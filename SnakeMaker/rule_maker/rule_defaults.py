@@ -25,4 +25,43 @@ file_register_keys = ["inputs", "outputs"]
 
 rule0_folder_name = "base"
 
+rules_file_name = "rules.smk"  # Index including the rule fragments
+rule_fragments_folder_name = "fragments"  # One <rule>.smk file per rule, relative to OUTPUT_RULE_MAKER_PATH
+
+# Compiled rule cache - stored in OUTPUT_RULE_MAKER_PATH/.rule_cache/<key>.pkl
+rule_cache_folder_name = ".rule_cache"
+rule_cache_version = 11  # Increase when the rendered rule format or the cached objects change
+rule_cache_size = 8  # Number of cached rule configurations kept
+rule_cache_env_variables = ["INPUT_DIR_PATH", "OUTPUT_DIR_PATH", "OUTPUT_RULE_MAKER_PATH", "SCRATCH_DIR"]
+
 rules_demo = {}
+
+# Defaults of the rule_maker settings section
+rule_maker_options = {
+    "sort_rules": True,  # Emit rules in topological order
+    "prune_rules": True,  # Leave out rules not needed for rule all
+    "group_chains": False,  # Group linear per-sample rule chains into one job
+    "group_max_size": 0,  # Maximum number of rules in a group, 0 - no limit
+    "group_max_runtime": 0,  # Maximum summed runtime of a group in minutes, 0 - no limit
+    "group_components": 1,  # Samples packed into one group job (--group-components in run.sh)
+    "auto_temp": False,  # Wrap intermediate outputs consumed only within the workflow in temp()
+    "split_commands": False,  # Independent shell commands - "rules" (sub-rules) or "concurrent" (background jobs)
+    "scratch_slots": 4,  # Concurrent copies to and from SCRATCH_DIR per node, for rules with scratch: true
+    "benchmark_rules": False,  # Emit benchmark: OUTPUT_DIR_PATH/benchmarks/<rule>/{sample}.tsv for every rule
+    "estimate_resources": True,  # Estimate threads, mem_mb and runtime from OUTPUT_DIR_PATH/benchmarks
+    "resource_quantile": 0.95,  # Quantile of the measurements used for the estimates
+    "resource_headroom": 0.2,  # Added to the estimated mem_mb and runtime
+    "resource_min_samples": 3,  # Minimum number of measurements of a rule
+    "max_threads": 0,  # Maximum estimated threads, 0 - number of CPUs
+    "waves": 0,  # run_waves.sh runs rule all in N batches, auto - sized from the free space under OUTPUT_DIR_PATH, 0 - disabled
+    "wave_footprint_mb": 0,  # Disk footprint of one sample for waves: auto, 0 - estimated from the benchmarks (io_out)
+    "wave_disk_reserve": 0.1,  # Part of the free space kept free by waves: auto
+}
+group_prefix = "chain_"
+pipe_group_prefix = "pipe_"  # Groups of piped producers and consumers pipe_<producer>
+benchmarks_folder_name = "benchmarks"  # Benchmark measurements in OUTPUT_DIR_PATH/benchmarks/<rule>/<sample>.tsv
+split_commands_modes = ["rules", "concurrent"]
+split_rule_suffix = "_part"  # Sub-rules of split shell commands <rule>_part<i>
+concurrent_wait_command = "for pid in $(jobs -p); do wait $pid; done"  # Awaits the concurrent commands, fails on a failed one
+sidecars_file_name = "sidecars.json"  # Sidecar lookup table {key: {sample: value}} in OUTPUT_RULE_MAKER_PATH
+sidecars_variable = "sidecars"  # The lookup table loaded once by rules.smk
@@ -0,0 +1,214 @@
+"""
+Explicit rule dependency graph (DAG) built from the parsed rule inputs and outputs.
+
+An edge producer -> consumer exists when an input path of the consumer is an output path of the producer.
+Registered names resolve to the producer output path, so name and path based references are both covered.
+"""
+
+import heapq
+
+import SnakeMaker.utils as ut
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import rule_renderer as rr
+
+
+def get_paths(files: list) -> list:
+    """
+    Returns [(key, normalized path)] of the parsed rule inputs or outputs, function values are skipped.
+    """
+    return [(key, rr.normalize_path(value)) for item in files for key, value in item.items() if isinstance(value, str) and value]
+
+
+def is_referenced(path: str, text: str) -> bool:
+    """
+    Checks if the path is referenced in the text, also with the resolved {output_path} or with {wildcards.sample} (lambdas).
+    """
+    output_dir = ut.get_env_variable("OUTPUT_DIR_PATH")
+    variants = [path, path.replace("{sample}", "{wildcards.sample}")]
+    if output_dir:
+        variants += [variant.replace("{output_path}", output_dir) for variant in variants]
+    return any(variant in text for variant in variants)
+
+
+class RuleGraph:
+    def __init__(self, rules: dict):
+        """
+        Builds the graph from the rules.
+
+        Args:
+            rules (dict): The built rules {rule_name: Rule}, in the configuration order.
+        """
+        self.order = {name: index for index, name in enumerate(rules)}  # Configuration order, used for stable sorting
+        self.inputs = {name: get_paths(rule.inputs) for name, rule in rules.items()}
+        self.outputs = {name: get_paths(rule.outputs) for name, rule in rules.items()}
+        self.producers = dict()  # {path: rule_name}, the first producer wins
+        self.consumers = dict()  # {path: [rule_name]} of the produced paths
+        self.parents = {name: [] for name in rules}
+        self.children = {name: [] for name in rules}
+        self.edges = []  # [(producer, consumer, input_key)]
+        for name, outputs in self.outputs.items():
+            for _, path in outputs:
+                self.producers.setdefault(path, name)
+        for name, inputs in self.inputs.items():
+            for key, path in inputs:
+                producer = self.producers.get(path)
+                if producer is None:  # Input from the dataset (or rule0)
+                    continue
+                self.edges.append((producer, name, key))
+                if name not in self.consumers.setdefault(path, []):
+                    self.consumers[path].append(name)
+                if producer not in self.parents[name]:
+                    self.parents[name].append(producer)
+                    self.children[producer].append(name)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.order
+
+    def __repr__(self) -> str:
+        return f"RuleGraph(rules={len(self.order)}, edges={len(self.edges)})"
+
+    @property
+    def rules(self) -> list:
+        return list(self.order)
+
+    def find_cycle(self) -> list | None:
+        """
+        Returns the rule names forming a dependency cycle (first rule repeated at the end), or None.
+        """
+        state = dict()  # 1 - on the current path, 2 - finished
+        for start in self.order:
+            if start in state:
+                continue
+            path = [start]
+            stack = [iter(self.children[start])]
+            state[start] = 1
+            while stack:
+                child = next(stack[-1], None)
+                if child is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(child) == 1:
+                    return path[path.index(child) :] + [child]
+                elif child not in state:
+                    state[child] = 1
+                    path.append(child)
+                    stack.append(iter(self.children[child]))
+        return None
+
+    def topological_order(self) -> list:
+        """
+        Returns the rule names in topological order (Kahn), ties are kept in the configuration order.
+
+        Raises:
+            ConfigError: If the rules contain a dependency cycle.
+        """
+        in_degree = {name: len(parents) for name, parents in self.parents.items()}
+        ready = [(self.order[name], name) for name, degree in in_degree.items() if degree == 0]
+        heapq.heapify(ready)
+        output = []
+        while ready:
+            _, name = heapq.heappop(ready)
+            output.append(name)
+            for child in self.children[name]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    heapq.heappush(ready, (self.order[child], child))
+        if len(output) != len(self.order):
+            msg = f"Rule dependency cycle: {' -> '.join(self.find_cycle() or [])}"
+            ut.get_logger("error_logger").error(msg)
+            raise ConfigError(msg)
+        return output
+
+    def ancestors(self, names: list) -> set:
+        """
+        Returns the rules and all the rules they depend on.
+        """
+        output = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in output:
+                continue
+            output.add(name)
+            stack.extend(self.parents[name])
+        return output
+
+    def chains(self, allowed: set = None) -> list:
+        """
+        Returns the linear chains of the graph, in topological order. An edge A -> B is a chain edge, if A is
+        the only parent of B and B is the only child of A depending on A alone.
+
+        Args:
+            allowed (set, optional): Rules which can be part of a chain, all rules if None. Defaults to None.
+
+        Returns:
+            list: Chains of rule names, with at least two rules.
+        """
+        allowed = set(self.order) if allowed is None else allowed
+
+        def next_link(name: str) -> str | None:
+            children = [child for child in self.children[name] if child in allowed and self.parents[child] == [name]]
+            return children[0] if len(children) == 1 else None
+
+        linked = {child for name in self.order if name in allowed for child in [next_link(name)] if child}
+        output = []
+        for name in self.topological_order():
+            if name not in allowed or name in linked:  # Not allowed or not a chain head
+                continue
+            chain = [name]
+            while (child := next_link(chain[-1])) is not None:
+                chain.append(child)
+            if len(chain) > 1:
+                output.append(chain)
+        return output
+
+    def match_targets(self, targets: list) -> list:
+        """
+        Returns the rules with an output referenced by the targets, e.g. the input of rule all
+        "expand('{output_path}/eddy/{sample}/b1000_eddy_unwarped.nii.gz', sample=samples)".
+
+        Args:
+            targets (list): Target strings, searched for output paths.
+
+        Returns:
+            list: Names of the target rules in the configuration order.
+        """
+        text = "\n".join(str(target) for target in targets)
+        return [name for name, outputs in self.outputs.items() if any(is_referenced(path, text) for _, path in outputs)]
+
+    def prune(self, targets: list) -> list:
+        """
+        Returns the rules needed for the targets in the configuration order. If no rule output matches the targets,
+        nothing is pruned, as the targets can be built dynamically (functions, variables).
+
+        Args:
+            targets (list): Target strings, see match_targets.
+
+        Returns:
+            list: Names of the rules to keep.
+        """
+        target_rules = self.match_targets(targets)
+        if not target_rules:
+            return self.rules
+        needed = self.ancestors(target_rules)
+        return [name for name in self.order if name in needed]
+
+    def to_dict(self) -> dict:
+        """
+        Returns the graph as plain data, e.g. for JSON export.
+        """
+        return {
+            "rules": [{"name": name, "inputs": dict(self.inputs[name]), "outputs": dict(self.outputs[name])} for name in self.order],
+            "edges": [{"producer": producer, "consumer": consumer, "input": key} for producer, consumer, key in self.edges],
+        }
+
+    def to_dot(self) -> str:
+        """
+        Returns the graph in the Graphviz dot format.
+        """
+        lines = ["digraph rules {"] + [f'\t"{name}";' for name in self.order]
+        lines += [f'\t"{producer}" -> "{consumer}";' for producer, consumer in {(p, c): None for p, c, _ in self.edges}]
+        return "\n".join(lines + ["}"])
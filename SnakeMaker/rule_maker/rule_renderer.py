@@ -0,0 +1,145 @@
+"""
+Rendering of Rule objects into Snakemake rule text.
+
+Every section is assembled from precompiled templates with a single join, paths are normalized once
+per distinct value, and rules are rendered lazily one by one, so their text is not kept in memory.
+The output is byte-identical to the original string concatenation rendering.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Precompiled section templates
+entry_separator = "\n\t\t"
+shell_separator = "\n\t\t\t"
+description_template = "# Description: {}"
+description_missing = "# Description missing"
+rule_template = "\nrule {}:"
+section_headers = {
+    "input": "\n\tinput:\n\t\t",
+    "params": "\n\tparams:\t\t",
+    "output": "\n\toutput:\n\t\t",
+    "benchmark": "\n\tbenchmark:\n\t\t",
+    "threads": "\n\tthreads:\n\t\t",
+    "resources": "\n\tresources:\n\t\t",
+    "group": "\n\tgroup:\n\t\t",
+    "shell": "\n\tshell:\n\t\t",
+    "run": "\n\trun:\n\t\t",
+}
+shell_start = '"""\n\t\t\t'
+shell_end = '\n\t\t"""'
+
+
+def normalize_path(value: str) -> str:
+    """
+    Returns the normalized path string, same as str(Path(value)).
+    Paths without repeated separators, dot segments and trailing separator are already normalized and returned as they are.
+
+    Example:
+    >>> normalize_path("{output_path}//base/{sample}/b0.nii.gz")
+    '{output_path}/base/{sample}/b0.nii.gz'
+    """
+    if isinstance(value, str) and value and "//" not in value and "/." not in value and not value.startswith("./") and not value.endswith("/"):
+        return value
+    return parse_path(value)
+
+
+@lru_cache(maxsize=65536)
+def parse_path(value: str) -> str:
+    # Cached, as templated rules repeat the same paths
+    return str(Path(value))
+
+
+def render_inputs(inputs: list) -> str:
+    return entry_separator.join(
+        f"{key}={value.get('function')}," if isinstance(value, dict) and "function" in value else f'{key}="{normalize_path(value)}",'
+        for input in inputs
+        for key, value in input.items()
+    )
+
+
+def render_param(key: str, value) -> str:
+    if isinstance(value, dict):  # Like function call
+        return f"{entry_separator}{key}={value.get('function')},"
+    if isinstance(value, str) and value.startswith("/"):  # Path value
+        return f'{entry_separator}{key}="{normalize_path(value)}",'
+    if isinstance(value, str) and value.startswith("lambda"):
+        return f"{entry_separator}{key}={value},"
+    return f'{entry_separator}{key}="{value}",'
+
+
+def render_params(params: list) -> str:
+    return "".join(render_param(key, value) for param in params for key, value in param.items())
+
+
+def render_output(key: str, value, flags: dict) -> str:
+    path = f'"{normalize_path(value) if isinstance(value, str) else value}"'
+    return f"{key}={flags[key]}({path})," if key in flags else f"{key}={path},"
+
+
+def render_outputs(outputs: list, flags: dict = None) -> str:
+    # Flagged outputs are wrapped, e.g. temp("{output_path}/denoised/{sample}/b0_denoised.nii.gz")
+    return entry_separator.join(render_output(key, value, flags or {}) for output in outputs for key, value in output.items())
+
+
+def render_benchmark(benchmark: str) -> str:
+    return f'"{benchmark}"' if benchmark else ""
+
+
+def render_threads(threads: int | str | None) -> str:
+    return "" if threads is None or threads == "" else f"{threads}"
+
+
+def render_resources(resources: list) -> str:
+    return entry_separator.join(f"{key}={value}," for resource in resources for key, value in resource.items()) if resources else ""
+
+
+def render_group(group: str) -> str:
+    return f'"{group}"' if group else ""
+
+
+def render_shell(shell: list) -> str:
+    return shell_start + shell_separator.join(f"{cmd}" for cmd in shell) + shell_end if shell else ""
+
+
+def render_run(run: list | str) -> str:
+    # Run items are not separated, same as the original rendering
+    return "".join(f"{key}={value}" for item in run for key, value in item.items())
+
+
+def render_rule(rule) -> str:
+    """
+    Renders the rule into Snakemake rule text.
+
+    Args:
+        rule (Rule): The rule to render.
+
+    Returns:
+        str: The rule text, ending with a newline.
+    """
+    parts = [description_template.format(rule.description) if rule.description else description_missing, rule_template.format(rule.name)]
+    for section, content in (
+        ("input", render_inputs(rule.inputs)),
+        ("params", render_params(rule.params)),
+        ("output", render_outputs(rule.outputs, getattr(rule, "output_flags", None))),
+        ("benchmark", render_benchmark(rule.benchmark)),
+        ("threads", render_threads(rule.threads)),
+        ("resources", render_resources(rule.resources)),
+        ("group", render_group(rule.group)),
+        ("shell", render_shell(rule.shell)),
+        ("run", render_run(rule.run)),
+    ):
+        if content:
+            parts.append(section_headers[section])
+            parts.append(content)
+    parts.append("\n")
+    return "".join(parts)
+
+
+def render_rules(rules: Iterable) -> Iterator[str]:
+    """
+    Lazily renders the rules one by one.
+    """
+    for rule in rules:
+        yield render_rule(rule)
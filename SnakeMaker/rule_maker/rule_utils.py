@@ -1,10 +1,7 @@
-from pathlib import Path
-
-import numpy as np
-
 from SnakeMaker import utils as ut
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import path_template as pt
 from SnakeMaker.rule_maker import rule_defaults as rdf
-from SnakeMaker.subject import Subject, SubjectSession
 
 
 def get_base_rule_dict():
@@ -22,8 +19,8 @@ def parse_input_keys_rule(rule: dict, registered_names: dict = None, shortened:
                                            Defaults to None.
 
     Returns:
-        list: A list of dictionaries where each dictionary contains the output name and its corresponding path or
-              function details.
+        list: A list of dictionaries where each dictionary contains the output name and its corresponding path
+              (PathTemplate, rendered by the RuleBuilder) or function details.
     TODO: Add examples
 
     Raises:
@@ -44,15 +41,10 @@ def parse_input_keys_rule(rule: dict, registered_names: dict = None, shortened:
         elif value.get("function", None):  # For other functions, which returns specific path
             output[key] = construct_function_output(key, value, registered_names, shortened=shortened)  # TODO: shortened
         elif value.get("input_folder", None) and value.get("filename", None):
-            output[key] = (
-                str(
-                    Path(ut.get_env_variable("INPUT_DIR_PATH"))
-                    / Path(value.get("input_folder"))
-                    / Path("{sample}")
-                    / Path(f"{value.get('filename')}")
-                )
-                if not shortened
-                else f"{{output_path}}/{value.get('input_folder')}/{value.get('filename')}"
+            output[key] = pt.intern_template(
+                ut.get_env_variable("INPUT_DIR_PATH"),
+                (value.get("input_folder"), "{sample}", f"{value.get('filename')}"),
+                short_segments=(value.get("input_folder"), f"{value.get('filename')}"),
             )
         else:
             msg = f"Path for {key} is not provided in the input rule"
@@ -76,7 +68,7 @@ def parse_output_keys_rule(rule: dict, registered_names: dict = None, shortened:
     Returns:
         list: A list of dictionaries where each dictionary represents an output path for a rule.
               If the rule contains a "path" key, the output path is taken from the "output_name".
-              Otherwise, the output path is constructed using the base rule dictionary, output
+              Otherwise, the output path is a PathTemplate of the base rule dictionary, output
               folder, and output name.
     """
     output_creator = list()
@@ -86,11 +78,7 @@ def parse_output_keys_rule(rule: dict, registered_names: dict = None, shortened:
         if value.get("path", None):  # if there is path for output name
             output[key] = value.get("output_name")
         else:
-            output[key] = (
-                str(Path(get_base_rule_dict()) / Path(value.get("output_folder")) / Path("{sample}") / Path(f"{value.get('output_name')}"))
-                if not shortened
-                else f"{{output_path}}/{value.get('output_folder')}/{{sample}}/{value.get('output_name')}"
-            )
+            output[key] = pt.intern_template(get_base_rule_dict(), (f"{value.get('output_folder')}", "{sample}", f"{value.get('output_name')}"))
         output_creator.append(output)
     return output_creator
 
@@ -100,7 +88,7 @@ def parse_params(rule: dict, registered_names: dict = None, shortened: bool = Fa
     Parses a given rule dictionary and generates a list of output configurations.
 
     This function processes each key-value pair in the input `rule` dictionary. If the value is a nested dictionary,
-    it checks for specific keys ("name" and "folder" or "function") to create output configurations. If the value is
+    it checks for specific keys ("name" and "folder", "function" or "sidecar") to create output configurations. If the value is
     not a nested dictionary, it directly adds the key-value pair to the output configurations.
 
     Args:
@@ -119,11 +107,14 @@ def parse_params(rule: dict, registered_names: dict = None, shortened: bool = Fa
         # if is nested dict:
         if isinstance(value, dict):
             if value.get("name", None) and (value.get("folder", None)):
-                output[key] = str(Path(get_base_rule_dict()) / Path(value.get("folder")) / Path("{sample}") / Path(f"{value.get('name')}"))
+                output[key] = pt.intern_template(get_base_rule_dict(), (value.get("folder"), "{sample}", f"{value.get('name')}")).full
                 output_creator.append(output)
+            elif value.get("sidecar", None):  # Value from the sidecar lookup table, extracted during generation
+                lookup_key, _ = parse_sidecar(key, value.get("sidecar"), registered_names, shortened=shortened)
+                output_creator.append({key: f"lambda wildcards: {rdf.sidecars_variable}[{lookup_key!r}][wildcards.sample]"})
             elif value.get("function", None):
                 # output_creator.append({k_: v_} for k_, v_ in x.items() for x in construct_function_output(key, value))\
-                for item in construct_function_output(key, value, registered_names):
+                for item in construct_function_output(key, value, registered_names, shortened=shortened):
                     output_creator.append(item)
             else:
                 msg = f"Incorrect {key} : {value} in input rule"
@@ -136,6 +127,32 @@ def parse_params(rule: dict, registered_names: dict = None, shortened: bool = Fa
     return output_creator
 
 
+def parse_sidecar(var_name: str, value: dict, registered_names: dict = None, shortened: bool = False) -> tuple:
+    """
+    Parses a sidecar param declaration - the field of a per-sample JSON file, e.g. {"file": "b0_json", "field": "TotalReadoutTime"}.
+
+    Args:
+        var_name (str): The name of the param.
+        value (dict): The declaration, `file` is a registered name or a path with the {sample} wildcard,
+                      `field` is the JSON key, nested keys are separated by dots.
+        registered_names (dict, optional): A dictionary of registered names. Defaults to None.
+        shortened (bool, optional): A flag to indicate if the paths are shortened. Defaults to False.
+
+    Returns:
+        tuple: The lookup key "<file>.<field>" and the extraction spec {"path": str, "field": str}.
+
+    Raises:
+        ConfigError: If the file or the field is missing.
+    """
+    file, field = (value.get("file"), value.get("field")) if isinstance(value, dict) else (None, None)
+    if not file or not field:
+        msg = f"Sidecar of {var_name} needs file and field: {value}"
+        ut.get_logger("error_logger").error(msg)
+        raise ConfigError(msg)
+    path = pt.render_path(registered_names[file], shortened) if registered_names and file in registered_names else file
+    return f"{file}.{field}", {"path": str(path), "field": str(field)}
+
+
 def parse_shell_command(rule: dict, inputs: dict, outputs: dict):
     """
     Parses a shell command from a given rule and appends it to the output_creator list.
@@ -196,7 +213,7 @@ def construct_function_output(var_name, value: dict | str, registered_names: dic
         shortened (bool, optional): A flag to indicate if the paths are shortened. Defaults to False.
 
     Returns:
-        str: The constructed function output string.
+        PathTemplate | list: The path template of base_input_dir, otherwise the constructed function output strings.
 
     Raises:
         KeyError: If required keys are missing in the value dictionary.
@@ -211,19 +228,23 @@ def construct_function_output(var_name, value: dict | str, registered_names: dic
     """
     output = []
     if value.get("function", {}).get("name") == "base_input_dir" and not from_run:
-        return (
-            str(Path(ut.get_env_variable("INPUT_DIR_PATH")) / Path(value.get("folder", "") / Path("{sample}") / Path(f"{value.get('filename')}")))
-            if not shortened
-            else f"{{output_path}}/{value.get('folder')}/{{sample}}/{value.get('filename')}"
+        return pt.intern_template(
+            ut.get_env_variable("INPUT_DIR_PATH"),
+            (value.get("folder", ""), "{sample}", f"{value.get('filename')}"),
+            short_segments=(f"{value.get('folder')}", "{sample}", f"{value.get('filename')}"),
         )
     elif value.get("function", {}) and isinstance(value.get("function"), dict):
         func_name = value.get("function").get("name")
         if "args" in value.get("function") and "from_input" in value.get("function").get("args", {}).keys() and not from_run:
             for item in value.get("function").get("args").get("from_input"):
-                function_string = f"{func_name}(f'{parse_input_keys_rule({item: value.get("function").get("args").get("from_input").get(item)},registered_names)[0].get(item)}')"
-                if ut.string_contains_pattern(function_string, r"{.+}"):  # Check if there is some wildcard used
-                    # check for shortened version
-                    if "{sample}" in function_string:
+                path = parse_input_keys_rule({item: value.get("function").get("args").get("from_input").get(item)}, registered_names, shortened)[0].get(item)
+                function_string = f"{func_name}(f'{pt.render_path(path, shortened)}')"
+                if isinstance(path, pt.PathTemplate):  # Wildcards are parsed with the template
+                    wildcards = path.get_wildcards(shortened)
+                else:  # Literal path
+                    wildcards = set(pt.wildcard_pattern.findall(str(path)))
+                if wildcards:  # Check if there is some wildcard used
+                    if "sample" in wildcards:
                         function_string = function_string.replace("{sample}", "{wildcards.sample}")
                     output.append({item: f"lambda wildcards: {function_string}"})
                 else:
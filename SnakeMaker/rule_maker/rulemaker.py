@@ -1,13 +1,41 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+
 import SnakeMaker.rule_maker.rule_defaults as rdf
 import SnakeMaker.utils as ut
 from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import command_splitter as cs
+from SnakeMaker.rule_maker import path_template as pt
+from SnakeMaker.rule_maker import resource_estimator as res
+from SnakeMaker.rule_maker import rule_graph as rg
+from SnakeMaker.rule_maker import rule_renderer as rr
+from SnakeMaker.rule_maker import scratch as sc
 from SnakeMaker.rule_maker.rule import Rule, RuleBuilder
 
 
 class Rulemaker:
-    def __init__(self, rule_config: dict | str = None, shortened: bool = False):
+    def __init__(
+        self,
+        rule_config: dict | str = None,
+        shortened: bool = False,
+        cache: bool = True,
+        targets: list = None,
+        options: dict = None,
+    ):
         """
         Initializes a new instance of the Rulemaker class.
+
+        Args:
+            rule_config (dict | str, optional): The rule configuration or path to it. Defaults to None.
+            shortened (bool, optional): If the paths are shortened. Defaults to False.
+            cache (bool, optional): If the compiled rules are cached, unchanged configurations skip
+                building and writing the rule files. Defaults to True.
+            targets (list, optional): Target strings (input of rule all) used to prune the rules. Defaults to None.
+            options (dict, optional): Rule generation options (the rule_maker settings section), missing options
+                are taken from rule_defaults.rule_maker_options. Defaults to None.
         """
         # Parameters
         self.rule_config = dict()
@@ -15,10 +43,27 @@ class Rulemaker:
         self.rule_0 = None
         self.registered_names = dict()
         self.shortened = shortened  # If the paths are shortened
+        self.cache = cache
+        self.cache_hit = False
+        self.targets = targets or []
+        self.options = {**rdf.rule_maker_options, **(options or {})}
+        self.rule_graph = None
+        self.pruned_rules = []
+        self.groups = dict()  # {group_name: [rule_name]}
+        self.kept_outputs = set()  # Paths of outputs with keep: true, never marked as temp
+        self.stream_outputs = set()  # Paths of outputs with stream: true, piped to their consumer
         # Initialize parameters
         self.initialize_config(rule_config)
         # Rules
-        self.create_rules()
+        if self.cache and self.load_cached_rules():
+            self.cache_hit = True
+            ut.get_logger("info_logger").info(f"Rule cache hit, {len(self.rules)} rules loaded without rebuilding the rule files.")
+            if any(rule.scratch for rule in self.rules.values()):  # The staged rules call the script, which is not cached
+                self.write_stage_script()
+        else:
+            self.create_rules()
+            if self.cache:
+                self.save_cached_rules()
 
     def initialize_config(self, rule_config: dict | str):
         """
@@ -60,19 +105,444 @@ class Rulemaker:
                 .set_shell(rule_dict.get("shell", None), inputs=rule_builder.rule.inputs, outputs=rule_builder.rule.outputs)
                 .set_description(rule_dict.get("description", None))
                 .set_run(rule_dict.get("run", None), self.registered_names)
+                .set_resources(rule_dict.get("resources", None))
+                .set_threads(rule_dict.get("threads", None))
+                .set_scratch(rule_dict.get("scratch", None))
                 .build()
             )
 
             self.rules[rule.name] = rule
-        # Construct plane rule
-        for rule in self.rules.values():
-            rule.construct_plane_rule()
-        # Write them to the file
-        ut.create_directory(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"))
-        with open(ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), "rules.smk"), "w") as f:
-            for rule in self.rules.values():
-                f.write(rule.rule_string)
-        pass
+            self.kept_outputs.update(get_flagged_outputs(rule, rule_dict.get("output", None), "keep"))
+            self.stream_outputs.update(get_flagged_outputs(rule, rule_dict.get("output", None), "stream"))
+        if self.options["split_commands"]:
+            self.split_commands()
+        # Order and prune by the rule graph
+        self.arrange_rules()
+        if self.options["auto_temp"]:
+            self.mark_temp_outputs()
+        if self.options["benchmark_rules"]:
+            self.assign_benchmarks()
+        if self.options["estimate_resources"]:
+            self.apply_resource_estimates()
+        if self.options["group_chains"]:
+            self.assign_groups()
+        if self.stream_outputs:
+            self.assign_pipes()
+        if any(rule.scratch for rule in self.rules.values()):
+            self.stage_scratch_rules()
+        # Render and write them to the files
+        self.write_rules()
+
+    def arrange_rules(self) -> None:
+        """
+        Orders the rules topologically and leaves out the rules not needed for the targets.
+
+        Raises:
+            ConfigError: If the rules contain a dependency cycle.
+        """
+        graph = rg.RuleGraph(self.rules)
+        names = graph.topological_order() if self.options["sort_rules"] else graph.rules
+        if not self.options["sort_rules"]:
+            graph.topological_order()  # Cycle detection
+        if self.options["prune_rules"] and self.targets:
+            needed = set(graph.prune(self.targets))
+            self.pruned_rules = [name for name in names if name not in needed]
+            names = [name for name in names if name in needed]
+            if self.pruned_rules:
+                ut.get_logger("info_logger").info(f"Rules not needed for the targets are left out: {', '.join(self.pruned_rules)}")
+        if names != graph.rules:
+            self.rules = {name: self.rules[name] for name in names}
+            graph = rg.RuleGraph(self.rules)
+        self.rule_graph = graph
+
+    def split_commands(self) -> dict:
+        """
+        Splits the independent shell commands of the rules (see command_splitter), by the split_commands option:
+        "rules" - every part becomes a sub-rule <rule>_part<i> with its own inputs and outputs, scheduled as separate jobs,
+        "concurrent" - the parts run as background jobs of the rule, at most `threads` at once. Rules without threads
+        get one thread per part.
+
+        Returns:
+            dict: The split rules {rule_name: [part shell lines]}.
+
+        Raises:
+            ConfigError: If the split_commands option is not "rules" or "concurrent".
+        """
+        mode = self.options["split_commands"]
+        if mode not in rdf.split_commands_modes:
+            msg = f"Unknown split_commands option: {mode}. Use one of {', '.join(rdf.split_commands_modes)}."
+            ut.get_logger("error_logger").error(msg)
+            raise ConfigError(msg)
+        split = dict()
+        rules = dict()
+        for name, rule in self.rules.items():
+            parts = cs.find_parts(rule)
+            if parts is None:
+                rules[name] = rule
+                continue
+            split[name] = [part["shell"] for part in parts]
+            if mode == "concurrent":
+                rule.threads = len(parts) if rule.threads is None else rule.threads
+                rule.shell = cs.concurrent_shell(parts, rule.threads)
+                rules[name] = rule
+                continue
+            sub_rules = cs.split_rule(rule, parts)
+            clashes = [sub_rule.name for sub_rule in sub_rules if sub_rule.name in self.rules]
+            if clashes:
+                msg = f"Rule {name} can not be split, rules {', '.join(clashes)} already exist."
+                ut.get_logger("error_logger").error(msg)
+                raise ConfigError(msg)
+            rules.update({sub_rule.name: sub_rule for sub_rule in sub_rules})
+        self.rules = rules
+        if split:
+            ut.get_logger("info_logger").info(f"Independent shell commands split ({mode}): {', '.join(split)}")
+        return split
+
+    def mark_temp_outputs(self) -> list:
+        """
+        Wraps intermediate outputs in temp(), so Snakemake deletes them once all their consumers finished. An output is
+        temporary, if it is an input of some rule of the workflow, it is not referenced by the targets (rule all) and no rule
+        refers to it outside of its inputs (params, input functions, shell, run). Outputs with keep: true are kept.
+
+        Returns:
+            list: The temporary outputs "<rule>.<output key>".
+        """
+        targets = "\n".join(str(target) for target in self.targets)
+        references = [get_references_text(rule) for rule in self.rules.values()]
+        marked = []
+        for name, rule in self.rules.items():
+            for item in rule.outputs:
+                for key, value in item.items():
+                    path = rr.normalize_path(value) if isinstance(value, str) else None
+                    if path is None or path in self.kept_outputs or not self.rule_graph.consumers.get(path):
+                        continue
+                    if rg.is_referenced(path, targets) or any(rg.is_referenced(path, text) for text in references):
+                        continue
+                    rule.output_flags[key] = "temp"
+                    marked.append(f"{name}.{key}")
+        if marked:
+            ut.get_logger("info_logger").info(f"Temporary outputs: {', '.join(marked)}")
+        return marked
+
+    def assign_benchmarks(self) -> None:
+        """
+        Sets the benchmark file of every rule - {output_path}/benchmarks/<rule>/{sample}.tsv for per-sample rules,
+        {output_path}/benchmarks/<rule>.tsv otherwise. The measurements are used by the resource estimation
+        and the benchmark report.
+
+        Snakemake requires the benchmark to have the same wildcards as the outputs, so the path is built only from
+        the wildcards of every output: the literal OUTPUT_DIR_PATH without {output_path}, no {sample} folder without
+        {sample}, and other wildcards appended to the file name, e.g. <rule>/{sample}.{side}.tsv.
+        """
+        for name, rule in self.rules.items():
+            wildcards = get_output_wildcards(rule)
+            base_path = "{output_path}" if self.shortened and "output_path" in wildcards else ut.get_env_variable("OUTPUT_DIR_PATH")
+            others = "".join(f".{{{wildcard}}}" for wildcard in wildcards if wildcard not in ("output_path", "sample"))
+            if "sample" in wildcards:
+                file_name = f"{name}/{{sample}}{others}.tsv"
+            else:
+                file_name = f"{name}/{others[1:]}.tsv" if others else f"{name}.tsv"
+            rule.benchmark = f"{base_path}/{rdf.benchmarks_folder_name}/{file_name}"
+
+    def apply_resource_estimates(self) -> dict:
+        """
+        Sets threads, mem_mb and runtime of the rules estimated from past benchmark measurements
+        (see resource_estimator). Values from the rule configuration override the estimates.
+
+        Returns:
+            dict: The estimates {rule_name: {resource: value}}.
+        """
+        estimates = res.estimate_resources(self.rules, self.options)
+        for rule_name, values in estimates.items():
+            rule = self.rules[rule_name]
+            values = dict(values)
+            threads = values.pop("threads", None)
+            if rule.threads is None and threads is not None:
+                rule.threads = threads
+            configured = {key for item in rule.resources or [] for key in item}
+            rule.resources = list(rule.resources or []) + [{key: value} for key, value in values.items() if key not in configured]
+        return estimates
+
+    def assign_groups(self) -> dict:
+        """
+        Assigns a Snakemake group to every linear per-sample chain of the rule graph, so the chain runs as one job
+        per sample. Chains are split by the group_max_size (rules) and group_max_runtime (minutes, sum of the
+        rule runtime resources) options, 0 means no limit. Groups are named after their first rule.
+
+        Returns:
+            dict: The groups {group_name: [rule_name]}.
+        """
+        max_size = self.options["group_max_size"]
+        max_runtime = self.options["group_max_runtime"]
+        per_sample = {name for name, rule in self.rules.items() if is_per_sample(rule)}
+        self.groups = dict()
+        for chain in self.rule_graph.chains(per_sample):
+            group, runtime = [], 0
+            for name in chain + [None]:  # None closes the last group
+                rule_runtime = get_runtime(self.rules[name]) if name else 0
+                if name is None or (max_size and len(group) >= max_size) or (max_runtime and group and runtime + rule_runtime > max_runtime):
+                    if len(group) > 1:
+                        self.groups[f"{rdf.group_prefix}{group[0]}"] = group
+                    group, runtime = [], 0
+                if name:
+                    group.append(name)
+                    runtime += rule_runtime
+        for group_name, names in self.groups.items():
+            for name in names:
+                self.rules[name].group = group_name
+        if self.groups:
+            ut.get_logger("info_logger").info(f"Rule groups: {self.groups}")
+        return self.groups
+
+    def assign_pipes(self) -> list:
+        """
+        Emits the outputs with stream: true as pipe(), the producer writes into a FIFO read by the consumer while both run.
+        An output is piped only if exactly one rule consumes it, it is not a target and nothing else refers to it, otherwise
+        it stays a file. It must also be the only output of the producer read by the consumer - the producer blocks on the
+        FIFO until the consumer opens it, which waits for the other files of the producer. The producer and the consumer
+        are put into one group, so they are scheduled together; an existing group of the consumer (e.g. a chain) is merged
+        into the group of the producer.
+
+        Returns:
+            list: The piped outputs "<rule>.<output key>".
+        """
+        targets = "\n".join(str(target) for target in self.targets)
+        references = [get_references_text(rule) for rule in self.rules.values()]
+        piped = []
+        for name, rule in self.rules.items():
+            for item in rule.outputs:
+                for key, value in item.items():
+                    path = rr.normalize_path(value) if isinstance(value, str) else None
+                    if path not in self.stream_outputs:
+                        continue
+                    consumers = self.rule_graph.consumers.get(path, [])
+                    if len(consumers) != 1 or rg.is_referenced(path, targets) or any(rg.is_referenced(path, text) for text in references):
+                        ut.get_logger("info_logger").info(f"Output {name}.{key} is not streamed, it needs exactly one consuming rule: {consumers}")
+                        continue
+                    edges = [other for other in get_output_paths(rule) if consumers[0] in self.rule_graph.consumers.get(other, [])]
+                    if len(edges) > 1:
+                        msg = f"Output {name}.{key} is not streamed, {consumers[0]} reads {len(edges)} outputs of {name} and would wait for them on the pipe"
+                        ut.get_logger("info_logger").info(msg)
+                        continue
+                    rule.output_flags[key] = "pipe"  # Replaces temp, a pipe is never stored
+                    self.merge_groups(name, consumers[0])
+                    piped.append(f"{name}.{key}")
+        if piped:
+            self.groups = dict()
+            for rule_name, rule in self.rules.items():
+                if rule.group:
+                    self.groups.setdefault(rule.group, []).append(rule_name)
+            ut.get_logger("info_logger").info(f"Streamed outputs: {', '.join(piped)}")
+        return piped
+
+    def merge_groups(self, producer: str, consumer: str) -> str:
+        """
+        Puts the consumer (with the rest of its group) into the group of the producer, a new group pipe_<producer> if none.
+
+        Returns:
+            str: The group name.
+        """
+        group = self.rules[producer].group or self.rules[consumer].group or f"{rdf.pipe_group_prefix}{producer}"
+        merged = {self.rules[producer].group, self.rules[consumer].group} - {""}
+        moved = {producer, consumer} | {name for name, rule in self.rules.items() if rule.group in merged}
+        for name in moved:
+            self.rules[name].group = group
+        return group
+
+    def stage_scratch_rules(self) -> list:
+        """
+        Wraps the shell of the rules with scratch: true to run on node-local scratch (see scratch), with at most
+        scratch_slots concurrent copies per node. Without the SCRATCH_DIR setting the rules run in place.
+
+        Returns:
+            list: The staged rule names.
+        """
+        scratch_dir = ut.get_env_variable("SCRATCH_DIR")
+        names = [name for name, rule in self.rules.items() if rule.scratch]
+        if not scratch_dir:
+            ut.get_logger("error_logger").error(f"SCRATCH_DIR is not set, rules run on the shared filesystem: {', '.join(names)}")
+            return []
+        script_path = self.get_stage_script_path()
+        staged = []
+        for name in names:
+            shell = sc.stage_shell(self.rules[name], scratch_dir, self.options["scratch_slots"], script_path)
+            if shell is None:
+                ut.get_logger("error_logger").error(f"Rule {name} can not run on scratch, all its outputs must be referenced as {{output.<key>}} in shell.")
+                continue
+            self.rules[name].shell = shell
+            staged.append(name)
+        if staged:
+            self.write_stage_script()
+            ut.get_logger("info_logger").info(f"Rules staged on {scratch_dir}: {', '.join(staged)}")
+        return staged
+
+    def write_stage_script(self) -> str | None:
+        """
+        Writes scratch_stage.sh if some rule calls it, only if it is missing or its content changed.
+
+        Returns:
+            str | None: The path to the script, None if no rule is staged.
+        """
+        script_path = self.get_stage_script_path()
+        if not any(script_path in "\n".join(str(line) for line in rule.shell or []) for rule in self.rules.values() if rule.scratch):
+            return None
+        if ut.write_if_changed(script_path, sc.stage_script):
+            os.chmod(script_path, 0o755)
+        return script_path
+
+    def get_stage_script_path(self) -> str:
+        """
+        Returns the path to scratch_stage.sh in OUTPUT_RULE_MAKER_PATH.
+        """
+        return ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), sc.stage_script_name)
+
+    def get_groups(self) -> dict:
+        """
+        Returns the rule groups {group_name: [rule_name]}.
+        """
+        if not self.groups:  # Rules loaded from the cache
+            for name, rule in self.rules.items():
+                if getattr(rule, "group", ""):
+                    self.groups.setdefault(rule.group, []).append(name)
+        return self.groups
+
+    def write_rules(self) -> list:
+        """
+        Writes every rule into its own fragment file and rules.smk as the index including them in the rule order.
+
+        Fragments and the index are replaced atomically and only if their content changed, so editing one rule
+        touches one fragment. Rules are rendered one by one while their fragment is written, the rendered text
+        is not kept on the rules nor in the rule cache. Fragments of removed rules are deleted.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        fragments_path = ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), rdf.rule_fragments_folder_name)
+        ut.directory_exists(fragments_path, True)
+        paths = [self.get_fragment_path(rule_name) for rule_name in self.rules]
+        written = [path for path, text in zip(paths, rr.render_rules(self.rules.values())) if ut.write_if_changed(path, text)]
+        if ut.write_if_changed(self.get_rules_file_path(), self.get_rules_file_content()):
+            written.append(self.get_rules_file_path())
+        fragments = {os.path.basename(path) for path in self.get_rules_files()}
+        for path in glob.glob(ut.merge_paths(fragments_path, "*.smk")):
+            if os.path.basename(path) not in fragments:  # Stale fragment of a removed rule
+                os.remove(path)
+        if written:
+            ut.get_logger("info_logger").info(f"Rules written: {len(written)} of {len(self.rules) + 1} files changed.")
+        return written
+
+    def get_rules_file_path(self) -> str:
+        return ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), rdf.rules_file_name)
+
+    def get_fragment_path(self, rule_name: str) -> str:
+        return ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), [rdf.rule_fragments_folder_name, f"{rule_name}.smk"])
+
+    def get_rules_files(self) -> list:
+        """
+        Returns the paths of the rule fragments followed by the rules.smk index.
+        """
+        return [self.get_fragment_path(rule_name) for rule_name in self.rules] + [self.get_rules_file_path()]
+
+    def get_rules_file_content(self) -> str:
+        """
+        Returns the content of the rules.smk index (include paths relative to the index).
+        """
+        header = ""
+        if self.get_sidecars():  # Sidecar params read the lookup table loaded once per Snakemake process
+            header = f'import json\n\nwith open("{self.get_sidecars_path()}") as f:\n\t{rdf.sidecars_variable} = json.load(f)\n\n'
+        return header + "".join(f'include: "{rdf.rule_fragments_folder_name}/{rule_name}.smk"\n' for rule_name in self.rules)
+
+    def get_sidecars(self) -> dict:
+        """
+        Returns the sidecar fields used by the rule params {lookup key: {"path": str, "field": str}}.
+        """
+        return {key: spec for rule in self.rules.values() for key, spec in getattr(rule, "sidecars", {}).items()}
+
+    def get_sidecars_path(self) -> str:
+        return ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), rdf.sidecars_file_name)
+
+    def get_rules_files_stat(self) -> dict:
+        """
+        Returns {path: (size, mtime)} of the rule fragments and the index.
+
+        Raises:
+            OSError: If some of the files does not exist.
+        """
+        output = dict()
+        for path in self.get_rules_files():
+            stat = os.stat(path)
+            output[path] = (stat.st_size, stat.st_mtime_ns)
+        return output
+
+    def get_cache_key(self) -> str:
+        """
+        Returns the content hash of the normalized rule configuration, the environment paths used
+        in the rendered rules and the shortened flag.
+
+        Key order is kept, as the order of rules and their inputs is the order in rules.smk.
+        """
+        content = {
+            "version": rdf.rule_cache_version,
+            "rule0": self.rule_0,
+            "rules": self.rule_config,
+            "env": {var: ut.get_env_variable(var) for var in rdf.rule_cache_env_variables},
+            "shortened": self.shortened,
+            "targets": self.targets,
+            "options": self.options,
+            "benchmarks": res.benchmarks_stamp(res.get_benchmarks_path()) if self.options["estimate_resources"] else None,
+        }
+        return hashlib.sha256(json.dumps(content, default=str, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def get_cache_path(self, key: str) -> str:
+        return ut.merge_paths(ut.get_env_variable("OUTPUT_RULE_MAKER_PATH"), [rdf.rule_cache_folder_name, f"{key}.pkl"])
+
+    def load_cached_rules(self) -> bool:
+        """
+        Loads the compiled rules of this configuration from the cache.
+
+        The cache entry is used only if the rule fragments and rules.smk were not rewritten since it was stored
+        (e.g. by another configuration).
+
+        Returns:
+            bool: True on a cache hit, False otherwise.
+        """
+        cache_path = self.get_cache_path(self.get_cache_key())
+        try:
+            with open(cache_path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return False
+        rules, self.rules = self.rules, entry["rules"]
+        try:
+            files_stat = self.get_rules_files_stat()
+        except OSError:
+            files_stat = None
+        if entry.get("rules_files_stat") != files_stat:
+            self.rules = rules
+            return False
+        self.registered_names = entry["registered_names"]
+        self.pruned_rules = entry["pruned_rules"]
+        return True
+
+    def save_cached_rules(self) -> None:
+        """
+        Stores the compiled rules and the stat of the written rule files, only the newest cache entries are kept.
+        """
+        entry = {
+            "rules": self.rules,
+            "registered_names": self.registered_names,
+            "pruned_rules": self.pruned_rules,
+            "rules_files_stat": self.get_rules_files_stat(),
+        }
+        cache_path = self.get_cache_path(self.get_cache_key())
+        try:
+            ut.write_atomic(cache_path, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        except (OSError, pickle.PicklingError) as e:
+            ut.get_logger("error_logger").error(f"Rule cache could not be saved to {cache_path}: {e}")
+            return
+        entries = sorted(glob.glob(ut.merge_paths(os.path.dirname(cache_path), "*.pkl")), key=os.path.getmtime, reverse=True)
+        for old_entry in entries[rdf.rule_cache_size :]:
+            os.remove(old_entry)
 
     def get_rules(self):
         return self.rules
@@ -80,3 +550,62 @@ class Rulemaker:
     def get_rule_0(self):
         return self.rule_0
 
+    def get_rule_graph(self) -> rg.RuleGraph:
+        """
+        Returns the dependency graph of the emitted rules.
+        """
+        if self.rule_graph is None:  # Rules loaded from the cache
+            self.rule_graph = rg.RuleGraph(self.rules)
+        return self.rule_graph
+
+
+def is_per_sample(rule: Rule) -> bool:
+    """
+    Checks if the rule runs once per sample - all its outputs contain the {sample} wildcard.
+    """
+    outputs = [value for item in rule.outputs for value in item.values()]
+    return bool(outputs) and all(isinstance(value, str) and "{sample}" in value for value in outputs)
+
+
+def get_output_wildcards(rule: Rule) -> list:
+    """
+    Returns the wildcards present in every output of the rule, in the order of the first output.
+    """
+    outputs = [str(value) for item in rule.outputs for value in item.values()]
+    if not outputs:
+        return []
+    common = set.intersection(*(set(pt.wildcard_pattern.findall(output)) for output in outputs))
+    return [wildcard for wildcard in dict.fromkeys(pt.wildcard_pattern.findall(outputs[0])) if wildcard in common]
+
+
+def get_output_paths(rule: Rule) -> list:
+    """
+    Returns the normalized paths of the rule outputs, as they are matched against the inputs in the rule graph.
+    """
+    return [rr.normalize_path(value) for item in rule.outputs for value in item.values() if isinstance(value, str)]
+
+
+def get_flagged_outputs(rule: Rule, outputs: dict | None, flag: str) -> list:
+    """
+    Returns the normalized paths of the rule outputs configured with the flag, e.g. keep: true or stream: true.
+    """
+    flagged = {key for key, value in (outputs or {}).items() if isinstance(value, dict) and value.get(flag, False)}
+    return [rr.normalize_path(value) for item in rule.outputs for key, value in item.items() if key in flagged and isinstance(value, str)]
+
+
+def get_references_text(rule: Rule) -> str:
+    """
+    Returns the text of the rule parts which can refer to paths besides the inputs - params, input functions, shell and run.
+    """
+    functions = [value for item in rule.inputs for value in item.values() if not isinstance(value, str)]
+    return json.dumps([rule.params, functions, rule.shell, rule.run], default=str)
+
+
+def get_runtime(rule: Rule) -> float:
+    """
+    Returns the runtime resource of the rule in minutes, 0 if it is not set.
+    """
+    for item in rule.resources or []:
+        if isinstance(item.get("runtime"), (int, float)):
+            return item["runtime"]
+    return 0
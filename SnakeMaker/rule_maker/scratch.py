@@ -0,0 +1,79 @@
+"""
+Staging of rules on node-local scratch.
+
+The shell of a rule with scratch: true is wrapped - a private directory is created in SCRATCH_DIR, the inputs referenced
+by the commands are copied there, the commands run on the copies and the outputs are copied back next to their target
+and renamed into place, so readers never see a partial file. Copies go through scratch_stage.sh, which holds one
+of `scratch_slots` lock slots per node, so concurrent jobs do not saturate the shared filesystem.
+"""
+
+import re
+
+reference_pattern = re.compile(r"\{(input|output)\.(\w+)\}")
+whole_reference_pattern = re.compile(r"\{(input|output)(\}|\[)")  # {input}, {output[0]} - not staged
+stage_script_name = "scratch_stage.sh"
+stage_script = """#!/bin/bash
+# Copies one file between the shared filesystem and node-local scratch, holding one of <slots> lock slots.
+# Usage: scratch_stage.sh <in|out> <scratch_dir> <slots> <source> <destination>
+# in  - copies the source into the staged destination
+# out - copies the staged source next to the destination and renames it into place
+set -euo pipefail
+mode=$1
+scratch_dir=$2
+slots=$3
+source=$4
+destination=$5
+while true; do
+    for slot in $(seq 1 "$slots"); do
+        exec 9>"$scratch_dir/.snakemaker_stage_$slot.lock"
+        if flock -n 9; then
+            break 2
+        fi
+    done
+    sleep 0.2
+done
+mkdir -p "$(dirname "$destination")"
+if [ "$mode" = "in" ]; then
+    cp -rL -- "$source" "$destination"
+else
+    partial="$destination.stage.$$"
+    cp -r -- "$source" "$partial"
+    mv -f -- "$partial" "$destination"
+fi
+"""
+
+
+def get_variable(section: str, key: str) -> str:
+    return f"{'in' if section == 'input' else 'out'}_{key}"
+
+
+def stage_shell(rule, scratch_dir: str, slots: int, script_path: str) -> list | None:
+    """
+    Returns the shell of the rule running on scratch.
+
+    Args:
+        rule (Rule): The rule with scratch: true.
+        scratch_dir (str): The node-local scratch directory (SCRATCH_DIR).
+        slots (int): The number of concurrent copies per node.
+        script_path (str): The path to scratch_stage.sh.
+
+    Returns:
+        list | None: The shell lines, None if the rule can not be staged (run block, whole {input}/{output} references,
+                     outputs not referenced by the commands, piped outputs).
+    """
+    if not rule.shell or rule.run or any(whole_reference_pattern.search(str(line)) for line in rule.shell):
+        return None
+    if "pipe" in getattr(rule, "output_flags", {}).values():
+        return None
+    references = list(dict.fromkeys(reference_pattern.findall("\n".join(str(line) for line in rule.shell))))
+    output_keys = {key for item in rule.outputs for key in item}
+    if output_keys != {key for section, key in references if section == "output"}:  # Outputs written implicitly stay on scratch
+        return None
+    stage = f'"{script_path}" {{}} "{scratch_dir}" {slots}'
+    lines = [f'S=$(mktemp -d "{scratch_dir}/{rule.name}.XXXXXX")', """trap 'rm -rf "$S"' EXIT"""]
+    lines += [f'{get_variable(section, key)}="$S/{section}/{key}/$(basename {{{section}.{key}}})"' for section, key in references]
+    lines += ["mkdir -p " + " ".join(f'"$S/output/{key}"' for section, key in references if section == "output")]
+    lines += [f'{stage.format("in")} {{input.{key}}} "${get_variable(section, key)}"' for section, key in references if section == "input"]
+    lines += [reference_pattern.sub(lambda match: f'"${get_variable(match.group(1), match.group(2))}"', str(line)) for line in rule.shell]
+    lines += [f'{stage.format("out")} "${get_variable(section, key)}" {{output.{key}}}' for section, key in references if section == "output"]
+    return lines
@@ -0,0 +1,235 @@
+import csv
+import gzip
+from collections.abc import Sequence
+from typing import Iterator
+
+import SnakeMaker.utils as ut
+
+# Supported manifest formats, optionally gzip compressed (e.g. samples.csv.gz)
+manifest_extensions = [".csv", ".txt"]
+samples_column = "samples"
+# Binary manifest - one .npy array (UTF-8 bytes) per column
+binary_manifest_extension = ".npy"
+samples_file_name = "samples.npy"
+file_table_modalities = {
+    "t1": ["nifti", "json"],
+    "b0": ["nifti", "json", "bval", "bvec", "direction"],
+    "b1000": ["nifti", "json", "bval", "bvec", "direction"],
+}
+
+
+def is_manifest(path: str) -> bool:
+    """
+    Check if the path is a sample manifest file (csv or txt, optionally gzip compressed).
+
+    Args:
+        path (str): The path to check.
+
+    Returns:
+        bool: True if the path points to an existing manifest file, False otherwise.
+    """
+    return manifest_format(path) is not None and ut.file_exists(path)
+
+
+def manifest_format(path: str) -> str | None:
+    """
+    Returns the manifest format (extension without the .gz suffix) of the path.
+
+    Example:
+    >>> manifest_format("samples.csv.gz")
+    '.csv'
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    for extension in manifest_extensions:
+        if name.endswith(extension):
+            return extension
+    return None
+
+
+def open_manifest(path: str):
+    """
+    Opens the manifest as a text stream, gzip compressed manifests are decompressed on the fly.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, "r", newline="")
+
+
+def read_txt_samples(stream) -> Iterator[str]:
+    """
+    Yields samples from a TXT manifest, one sample per line.
+    """
+    for line in stream:
+        yield line
+
+
+def read_csv_samples(stream, column: str = samples_column) -> Iterator[str]:
+    """
+    Yields samples from the given column of a CSV manifest.
+
+    Raises:
+        KeyError: If the column is not in the CSV header.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, [])
+    if column not in header:
+        msg = f"Column {column} is not in the samples manifest header: {header}"
+        ut.get_logger("error_logger").error(msg)
+        raise KeyError(msg)
+    index = header.index(column)
+    for row in reader:
+        if len(row) > index:
+            yield row[index]
+
+
+def normalize_sample(sample: str) -> str:
+    """
+    Normalizes the sample ID - strips whitespace, newlines, quotes and trailing path separators.
+
+    Example:
+    >>> normalize_sample(" sub-01/ses-1/\\n")
+    'sub-01/ses-1'
+    """
+    return sample.strip().strip("'\"").rstrip("/")
+
+
+def iter_samples(path: str, level: str | int = None, column: str = samples_column) -> Iterator[str]:
+    """
+    Streams samples from a CSV/TXT manifest (optionally gzip compressed) in bounded memory.
+    Samples are normalized, deduplicated on the fly and optionally shortened to the last `level` directories.
+
+    Args:
+        path (str): The path to the manifest.
+        level (str | int, optional): The level of the path to return. Defaults to None.
+        column (str, optional): The column with samples in CSV manifests. Defaults to "samples".
+
+    Yields:
+        str: Unique samples in the order of the manifest.
+
+    Raises:
+        NotImplementedError: If the manifest format is not supported.
+    """
+    extension = manifest_format(path)
+    if extension is None:
+        raise NotImplementedError(f"Unsupported samples manifest {path}, use one of {manifest_extensions} (optionally .gz).")
+    seen = set()
+    with open_manifest(path) as stream:
+        reader = read_csv_samples(stream, column) if extension == ".csv" else read_txt_samples(stream)
+        for sample in reader:
+            sample = normalize_sample(sample)
+            if not sample:
+                continue
+            if level:
+                sample = ut.get_last_directory(sample, level)
+            if sample in seen:
+                continue
+            seen.add(sample)
+            yield sample
+
+
+class MemmapColumn(Sequence):
+    """
+    Read-only sequence of strings backed by a memory mapped .npy array.
+    Items are decoded into Python strings only when they are accessed.
+    """
+
+    def __init__(self, array, level: str | int = None) -> None:
+        self.array = array
+        self.level = level
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, index: int | slice) -> str | list:
+        if isinstance(index, slice):
+            return [self.decode(value) for value in self.array[index]]
+        return self.decode(self.array[index])
+
+    def __iter__(self) -> Iterator[str]:
+        for value in self.array:
+            yield self.decode(value)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def decode(self, value: bytes) -> str:
+        value = value.decode("utf-8")
+        return ut.get_last_directory(value, self.level) if self.level and value else value
+
+
+def save_column(path: str, values) -> None:
+    """
+    Atomically saves the string values as a fixed width UTF-8 .npy array.
+
+    Args:
+        path (str): The path to the .npy file.
+        values: An iterable of strings.
+    """
+    import io
+
+    import numpy as np
+
+    array = np.array([value.encode("utf-8") for value in values], dtype=bytes)
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    ut.write_atomic(path, buffer.getvalue())
+
+
+def load_column(path: str, level: str | int = None) -> MemmapColumn:
+    """
+    Loads the .npy string column with memory mapping.
+
+    Args:
+        path (str): The path to the .npy file.
+        level (str | int, optional): The level of the path to return for each item. Defaults to None.
+
+    Returns:
+        MemmapColumn: The lazily decoded column.
+    """
+    import numpy as np
+
+    return MemmapColumn(np.load(path, mmap_mode="r", allow_pickle=False), level)
+
+
+def export_manifest(directory: str, samples: list, subjects: dict = None) -> str:
+    """
+    Exports the resolved samples and the per-session file table into a binary columnar manifest.
+
+    The directory contains samples.npy and one .npy file per file table column (sample, t1_nifti, b0_bval, ...).
+
+    Args:
+        directory (str): The directory of the manifest.
+        samples (list): The resolved samples.
+        subjects (dict, optional): Subjects {subject_id: Subject} to export the file table from. Defaults to None.
+
+    Returns:
+        str: The path to samples.npy, which can be passed to Snakemaker.create_samples.
+    """
+    samples_path = ut.merge_paths(directory, samples_file_name)
+    save_column(samples_path, samples)
+    if subjects:
+        columns = {"sample": []}
+        columns.update({f"{modality}_{attribute}": [] for modality, attributes in file_table_modalities.items() for attribute in attributes})
+        for subject_id, subject in subjects.items():
+            for session_id, session in subject.sessions.items():
+                columns["sample"].append(f"sub-{subject_id}/ses-{session_id}")
+                for modality, attributes in file_table_modalities.items():
+                    for attribute in attributes:
+                        columns[f"{modality}_{attribute}"].append(subject.get_file(session_id, modality, attribute) or "")
+        for column, values in columns.items():
+            save_column(ut.merge_paths(directory, f"{column}{binary_manifest_extension}"), values)
+    return samples_path
+
+
+def load_file_table(directory: str) -> dict:
+    """
+    Loads the per-session file table of the binary manifest with memory mapping.
+
+    Args:
+        directory (str): The directory of the manifest.
+
+    Returns:
+        dict: Columns of the file table {column: MemmapColumn}.
+    """
+    columns = ["sample"] + [f"{modality}_{attribute}" for modality, attributes in file_table_modalities.items() for attribute in attributes]
+    return {column: load_column(ut.merge_paths(directory, f"{column}{binary_manifest_extension}")) for column in columns}
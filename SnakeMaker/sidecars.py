@@ -0,0 +1,114 @@
+"""
+Generation-time extraction of per-sample sidecar metadata.
+
+Params declared with `sidecar` (see parse_sidecar) read a field of a per-sample JSON file, e.g. TotalReadoutTime of b0.json.
+All declared fields of all samples are extracted in one parallel pass into OUTPUT_RULE_MAKER_PATH/sidecars.json
+{key: {sample: value}}. rules.smk loads the table once, so evaluating the DAG does not open any sidecar file.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import SnakeMaker.utils as ut
+
+missing_reported = 10  # Missing values listed in the error log
+
+
+def resolve_path(path: str, sample: str) -> str:
+    """
+    Resolves the rule path of the sample, e.g. "{output_path}/base/{sample}/b0.json".
+    """
+    path = path.replace("{output_path}", ut.get_env_variable("OUTPUT_DIR_PATH") or "")
+    return path.replace("{input_path}", ut.get_env_variable("INPUT_DIR_PATH") or "").replace("{sample}", sample)
+
+
+def get_field(data, field: str):
+    """
+    Returns the field of the parsed JSON, nested keys and list indices are separated by dots (e.g. "SliceTiming.0").
+
+    Raises:
+        KeyError: If the field does not exist.
+    """
+    for part in field.split("."):
+        if isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        elif isinstance(data, dict) and part in data:
+            data = data[part]
+        else:
+            raise KeyError(field)
+    return data
+
+
+def read_sidecar(path: str, fields: list) -> tuple:
+    """
+    Reads the fields of one sidecar file.
+
+    Args:
+        path (str): The resolved path to the JSON file.
+        fields (list): The lookup keys and fields [(key, field)].
+
+    Returns:
+        tuple: The values {key: value} and the errors {key: message}.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return dict(), {key: f"{path}: {e}" for key, _ in fields}
+    values, errors = dict(), dict()
+    for key, field in fields:
+        try:
+            values[key] = get_field(data, field)
+        except KeyError:
+            errors[key] = f"{path}: field {field} not found"
+    return values, errors
+
+
+def extract_sidecars(specs: dict, samples: list, workers: int = None) -> tuple:
+    """
+    Extracts the sidecar fields of all samples, every file is read once by a thread pool.
+
+    Args:
+        specs (dict): The sidecar fields {key: {"path": str, "field": str}} (Rulemaker.get_sidecars).
+        samples (list): The samples.
+        workers (int, optional): The number of threads, the ThreadPoolExecutor default if None. Defaults to None.
+
+    Returns:
+        tuple: The lookup table {key: {sample: value}} and the missing values [(key, sample, message)].
+    """
+    files = dict()  # {path: [(key, field)]}, fields of one file are read together
+    for key, spec in specs.items():
+        files.setdefault(spec["path"], []).append((key, spec["field"]))
+    tasks = [(sample, path, fields) for sample in samples for path, fields in files.items()]
+    table = {key: dict() for key in specs}
+    missing = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda task: read_sidecar(resolve_path(task[1], task[0]), task[2]), tasks)
+        for (sample, _, _), (values, errors) in zip(tasks, results):
+            for key, value in values.items():
+                table[key][sample] = value
+            missing.extend((key, sample, message) for key, message in errors.items())
+    return table, missing
+
+
+def create_sidecars(specs: dict, samples: list, output_path: str, workers: int = None) -> dict:
+    """
+    Extracts the sidecar fields and writes the lookup table, the file is replaced only if its content changed.
+
+    Args:
+        specs (dict): The sidecar fields {key: {"path": str, "field": str}}.
+        samples (list): The samples.
+        output_path (str): The path to the lookup table.
+        workers (int, optional): The number of threads. Defaults to None.
+
+    Returns:
+        dict: The lookup table {key: {sample: value}}.
+    """
+    table, missing = extract_sidecars(specs, samples, workers)
+    if missing:
+        listed = "; ".join(f"{key} of {sample} ({message})" for key, sample, message in missing[:missing_reported])
+        msg = f"Sidecar values missing for {len(missing)} samples and fields, their params fail in Snakemake: {listed}"
+        ut.get_logger("error_logger").error(msg)
+    ut.write_if_changed(output_path, json.dumps(table, separators=(",", ":")))
+    ut.get_logger("info_logger").info(f"Sidecar lookup table: {len(specs)} fields of {len(samples)} samples in {output_path}")
+    return table
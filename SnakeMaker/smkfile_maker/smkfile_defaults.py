@@ -39,3 +39,31 @@ default_rules = {  # all have only one value per line. no list allowed, but mult
         "shell": "python process_one.py {input} {output}",
     },
 }
+
+# Samples written into a text file next to the Snakefile (vars: samples: file: true) and read on the first use
+samples_file_extension = ".samples.txt"
+samples_file_loader = '''from collections.abc import Sequence
+
+
+class SampleFile(Sequence):
+    # Samples read from the newline-delimited file on the first use, jobs not using them do not read it
+    def __init__(self, path):
+        self.path = path
+        self.samples = None
+
+    def load(self):
+        if self.samples is None:
+            with open(self.path, encoding="utf-8") as f:
+                self.samples = f.read().splitlines()
+        return self.samples
+
+    def __getitem__(self, index):
+        return self.load()[index]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+'''
@@ -1,6 +1,10 @@
+import os
+import re
+
 import SnakeMaker.defaults as df
 import SnakeMaker.rule_maker.rule_utils as ru
 import SnakeMaker.smkfile_maker.smkfile_defaults as sdf
+import SnakeMaker.smkfile_maker.wildcard_constraints as wc
 import SnakeMaker.utils as ut
 
 
@@ -16,6 +20,7 @@ class SmkFileMaker:
         smkfile_path: str = None,
         samples: list = None,
         test: bool = False,
+        smkfile_name: str = df.smkfile_name,
     ):
         # Parameters
         self.imports = imports
@@ -28,6 +33,7 @@ class SmkFileMaker:
         # Initialize
         self.config = self.initialize_config(config)
         self.smkfile_path = smkfile_path or ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH")
+        self.smkfile_name = smkfile_name
         # Run
         if not test:
             self.process_config()
@@ -125,6 +131,8 @@ class SmkFileMaker:
                     continue
                 if "{default_path}" in value:  # Replace default_path with actual data path
                     value = value.replace("{default_path}", ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"))
+                if key == "input" and self.get_samples_file() and re.search(r"\bsamples\b", value):  # Samples are read when the DAG is built
+                    value = f"lambda wildcards: {value}"
                 output += f"\t{key}:\n\t\t{value}\n"
             output += "\n"
         return output
@@ -197,7 +205,10 @@ class SmkFileMaker:
         output = ""
         wildcard_constraints = "\n\n#Wildcard constraints\nwildcard_constraints:"
         for k, v in self.vars.items():
-            if k == "samples" and not v.get("paths", None) and not v.get("function", None):
+            if k == "samples" and v.get("file", None):
+                output = sdf.samples_file_loader + output
+                output += f"{k} = SampleFile('{self.write_samples_file()}')\n"
+            elif k == "samples" and not v.get("paths", None) and not v.get("function", None):
                 output += f"{k} = {self.samples}\n"
             elif k == "samples" and v.get("paths", None):
                 output += f"{k} = {v['paths']}\n"
@@ -212,8 +223,10 @@ class SmkFileMaker:
             elif isinstance(v, dict) and v.get("type", "") == "env":
                 output += f"{k} = '{ut.get_env_variable(v.get('name'))}'\n"
             # Specific cases:
-            elif k == "wildcard_constraints" and v == "default":
+            elif k == "wildcard_constraints" and (v == "default" or v in wc.modes):
                 for k, v in sdf.defaults["wildcard_constraints"].items():
+                    if k == "sample":
+                        v = self.get_sample_constraint(self.vars["wildcard_constraints"]) or v
                     wildcard_constraints += f"\n\t{k} = {v}\n"
             elif k == "wildcard_constraints":  # Without default - user specific
                 if isinstance(v, dict):
@@ -226,6 +239,51 @@ class SmkFileMaker:
 
         return "\n\n#Variables\n" + output
 
+    def get_sample_constraint(self, mode: str = "default") -> str | None:
+        """
+        Returns the compact sample wildcard constraint generated from the samples (see wildcard_constraints).
+
+        Args:
+            mode (str, optional): default (exact) or one of wildcard_constraints.modes. Defaults to "default".
+
+        Returns:
+            str | None: The constraint as a Python string literal, None if the samples are defined in the Snakefile
+                        (vars: samples: paths / function).
+        """
+        samples = (self.vars or dict()).get("samples")
+        if not self.samples or (isinstance(samples, dict) and (samples.get("paths", None) or samples.get("function", None))):
+            return None
+        pattern, mode = wc.create_constraint(self.samples, "exact" if mode == "default" else mode)
+        ut.get_logger("info_logger").info(f"Sample wildcard constraint ({mode}, {len(pattern)} characters) for {len(self.samples)} samples")
+        return repr(pattern)
+
+    def get_samples_file(self) -> str | None:
+        """
+        Returns the path to the samples file of the Snakefile, if the samples are not inlined (vars: samples: file).
+        `file: true` - <Snakefile name>.samples.txt next to the Snakefile, or a path relative to it.
+
+        Returns:
+            str | None: The path, None if the samples are inlined.
+        """
+        samples = (self.vars or dict()).get("samples")
+        file = samples.get("file", None) if isinstance(samples, dict) else None
+        if not file:
+            return None
+        if file is True:
+            file = f"{os.path.splitext(self.smkfile_name)[0]}{sdf.samples_file_extension}"
+        return file if str(file).startswith("/") else ut.merge_paths(self.smkfile_path, file)
+
+    def write_samples_file(self) -> str:
+        """
+        Writes the samples newline-delimited into the samples file, only if they changed.
+
+        Returns:
+            str: The path to the samples file.
+        """
+        path = self.get_samples_file()
+        ut.write_if_changed(path, "".join(f"{sample}\n" for sample in self.samples or []))
+        return path
+
     def process_imports(self, imports: dict = None) -> str:
         """
         Processes the imports for the current instance.
@@ -260,7 +318,7 @@ class SmkFileMaker:
         smkfile_path = smkfile_path or self.smkfile_path
         try:
             ut.create_directory(smkfile_path)
-            with open(ut.merge_paths(smkfile_path, "Snakemake.smk"), "w") as smkfile:
+            with open(ut.merge_paths(smkfile_path, self.smkfile_name), "w") as smkfile:
                 smkfile.write(smkfile_content)
             return True
         except Exception as e:
@@ -277,6 +335,26 @@ class SmkFileMaker:
         return self.snakefile_string
 
 
+def get_targets(config: dict, rule_name: str = "all") -> list:
+    """
+    Returns the inputs of the target rule (rule all) of the snakefile configuration as a list of strings.
+
+    Args:
+        config (dict): The snakefile configuration.
+        rule_name (str, optional): The name of the target rule. Defaults to "all".
+
+    Returns:
+        list: The target strings, empty if the rule or its input is not defined.
+    """
+    rules = (config.get("rules") if isinstance(config, dict) else None) or {}
+    inputs = (rules.get(rule_name) or {}).get("input")
+    if isinstance(inputs, dict):
+        return [str(value) for value in inputs.values()]
+    if isinstance(inputs, list):
+        return [str(value) for value in inputs]
+    return [str(inputs)] if inputs else []
+
+
 def write_test_file(path, name, data):
     import os
 
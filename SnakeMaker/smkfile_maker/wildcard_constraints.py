@@ -0,0 +1,156 @@
+"""
+Compact wildcard constraints derived from the sample IDs.
+
+The alternation of all escaped samples is tried alternative by alternative, for every candidate file Snakemake matches.
+- exact: the samples are factored into a trie, e.g. sub-01/ses-1, sub-01/ses-2, sub-02/ses-1 -> sub\\-0(?:1/ses\\-[12]|2/ses\\-1).
+         Shared prefixes are matched once and sibling branches with the same remainder are merged into a character class.
+- shape: the samples are described by their separators and segment classes, e.g. sub\\-[A-Z0-9]{5,7}/ses\\-[0-9]{1}.
+         The pattern stays valid for samples added later, it is used only if it matches every sample and none of the
+         boundary probes (a sample cut or extended at a separator), otherwise the exact pattern is used.
+"""
+
+import re
+
+import SnakeMaker.utils as ut
+
+modes = ["exact", "shape"]
+separator_pattern = re.compile(r"([^A-Za-z0-9]+)")
+character_classes = [("a-z", str.islower), ("A-Z", str.isupper), ("0-9", str.isdigit)]
+
+
+def factor(samples: list) -> str:
+    """
+    Returns the trie-factored pattern of the sorted unique samples.
+
+    Example:
+    >>> factor(["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"])
+    'sub\\\\-0(?:1/ses\\\\-[12]|2/ses\\\\-1)'
+    """
+    if samples == [""]:
+        return ""
+    # Common prefix of the group
+    prefix = samples[0]
+    for sample in samples[1:]:
+        while not sample.startswith(prefix):
+            prefix = prefix[:-1]
+    if prefix:
+        return re.escape(prefix) + factor([sample[len(prefix) :] for sample in samples])
+    # Branches by the first character, branches with the same remainder are merged
+    branches = dict()  # {first character: [remainders]}
+    for sample in samples:
+        branches.setdefault(sample[:1], []).append(sample[1:])
+    remainders = dict()  # {remainder pattern: [first characters]}
+    for character, group in branches.items():
+        remainders.setdefault(factor(group) if character else None, []).append(character)
+    alternatives = []
+    optional = None in remainders  # One sample is a prefix of the others
+    for remainder, characters in remainders.items():
+        if remainder is None:
+            continue
+        if len(characters) == 1:
+            alternatives.append(re.escape(characters[0]) + remainder)
+        else:
+            alternatives.append("[" + "".join(re.escape(character) for character in characters) + "]" + remainder)
+    pattern = alternatives[0] if len(alternatives) == 1 and not optional else f"(?:{'|'.join(alternatives)})"
+    return pattern + "?" if optional else pattern
+
+
+def exact_pattern(samples: list) -> str:
+    """
+    Returns the pattern matching exactly the samples.
+    """
+    return factor(sorted(set(str(sample) for sample in samples)))
+
+
+def segment_pattern(values: list) -> str:
+    """
+    Returns the pattern of one segment (the text between two separators) of the samples: the literal if it is shared,
+    otherwise the common literal prefix and suffix around the character class and length range of the rest.
+    """
+    if len(set(values)) == 1:
+        return re.escape(values[0])
+    prefix = values[0]
+    for value in values[1:]:
+        while not value.startswith(prefix):
+            prefix = prefix[:-1]
+    rests = [value[len(prefix) :] for value in values]
+    suffix = rests[0]
+    for rest in rests[1:]:
+        while not rest.endswith(suffix):
+            suffix = suffix[1:]
+    rests = [rest[: len(rest) - len(suffix)] for rest in rests]
+    text = "".join(rests)
+    classes = "".join(name for name, check in character_classes if any(check(character) for character in text))
+    lengths = {len(rest) for rest in rests}
+    quantifier = f"{{{min(lengths)}}}" if len(lengths) == 1 else f"{{{min(lengths)},{max(lengths)}}}"
+    return f"{re.escape(prefix)}[{classes}]{quantifier}{re.escape(suffix)}"
+
+
+def shape_pattern(samples: list) -> str:
+    """
+    Returns the shape grammar of the samples, one alternative per separator structure. Characters outside
+    of the classes (non-ASCII letters) are separators, so they are matched literally.
+    """
+    structures = dict()  # {separators: [segments of the samples]}
+    for sample in sorted(set(str(sample) for sample in samples)):
+        parts = separator_pattern.split(sample)
+        structures.setdefault(tuple(parts[1::2]), []).append(parts[::2])
+    alternatives = []
+    for separators, segments in structures.items():
+        pattern = segment_pattern([parts[0] for parts in segments])
+        for index, separator in enumerate(separators, start=1):
+            pattern += re.escape(separator) + segment_pattern([parts[index] for parts in segments])
+        alternatives.append(pattern)
+    return alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+
+
+def get_probes(samples: list) -> set:
+    """
+    Returns the boundary probes of the samples which must not match - every sample cut at a separator
+    and extended by its last separator and segment (e.g. sub-01 and sub-01/ses-1/ses-1 for sub-01/ses-1).
+    """
+    output = set()
+    for sample in samples:
+        parts = separator_pattern.split(str(sample))
+        for index in range(1, len(parts), 2):
+            output.add("".join(parts[:index]))
+        if len(parts) > 1:
+            output.add(str(sample) + "".join(parts[-2:]))
+    return output - set(str(sample) for sample in samples)
+
+
+def verify(pattern: str, samples: list, probes: set = None) -> bool:
+    """
+    Returns True if the pattern matches every sample and none of the probes.
+    """
+    compiled = re.compile(pattern)
+    if not all(compiled.fullmatch(str(sample)) for sample in samples):
+        return False
+    return not any(compiled.fullmatch(probe) for probe in probes or set())
+
+
+def create_constraint(samples: list, mode: str = "exact") -> tuple:
+    """
+    Creates the sample wildcard constraint.
+
+    Args:
+        samples (list): The samples.
+        mode (str, optional): The mode (modes), shape falls back to exact if its pattern does not verify. Defaults to "exact".
+
+    Returns:
+        tuple: The pattern and the mode used.
+
+    Raises:
+        ValueError: If the exact pattern does not match exactly the samples.
+    """
+    probes = get_probes(samples)
+    if mode == "shape":
+        pattern = shape_pattern(samples)
+        if verify(pattern, samples, probes):
+            return pattern, "shape"
+    pattern = exact_pattern(samples)
+    if not verify(pattern, samples, probes):
+        msg = f"Wildcard constraint {pattern[:100]} does not match exactly the samples"
+        ut.get_logger("error_logger").error(msg)
+        raise ValueError(msg)
+    return pattern, "exact"
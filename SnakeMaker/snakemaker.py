@@ -1,15 +1,24 @@
+from __future__ import annotations
+
 import argparse
+import os
 import sys
+from typing import TYPE_CHECKING
 
-import bids
-import pandas as pd
-
+import SnakeMaker.bids_index as bi
 import SnakeMaker.defaults as df
+import SnakeMaker.samples as smp
+import SnakeMaker.sidecars as sc
 import SnakeMaker.subject as sb
 import SnakeMaker.utils as ut
+import SnakeMaker.waves as wv
+from SnakeMaker.rule_maker import rule_defaults as rdf
 from SnakeMaker.rule_maker import rulemaker as rm
 from SnakeMaker.smkfile_maker import smkfile_maker as sm
 
+if TYPE_CHECKING:  # pandas is imported only by the code paths which need it
+    import pandas as pd
+
 
 class Snakemaker:
     def __init__(
@@ -21,6 +30,12 @@ class Snakemaker:
         full_run: bool = False,
         config: dict = None,
         debug: bool = False,
+        validate_bids: bool = False,
+        bids_cache: bool = True,
+        workers: int = 1,
+        export_manifest: bool = False,
+        shards: int = 1,
+        rule_cache: bool = True,
     ) -> None:
         # Parameters
         self.input_data_files = None
@@ -33,21 +48,43 @@ class Snakemaker:
         self.full_run = False
         self.rule0 = None
         self.env_vars = dict()
+        self.validate_bids = False
+        self.bids_cache = True
+        self.workers = 1
+        self.failed_subjects = dict()
+        self.export_manifest = False
+        self.shards = 1
+        self.shard_samples = []
+        self.rule_cache = True
+        self.rule_graph = None
+        self.rule_groups = dict()
+        self.sidecars = dict()
+        self.sidecars_path = None
         # Assign parameters
         self.input_data_files = input_data_files
         self.rule_configuration = rule_configuration
         self.snakefile_configuration = snakefile_configuration
         self.config = config or df.settings
         self.full_run = full_run
+        self.validate_bids = validate_bids
+        self.bids_cache = bids_cache
+        self.workers = workers
+        self.export_manifest = export_manifest
+        self.shards = shards
+        self.rule_cache = rule_cache
         # Call initialize functions
         if not debug:
             self.initialize_config()
             self.assign_env_variables()
             self.samples = self.create_samples(self.input_data_files)
+            if self.export_manifest:
+                self.create_manifest()
             self.rules = self.create_rules(shortened=True)
             self.snakemake_main_file = self.create_snakemake_main_file()
             if self.rule0:
                 self.execute_rule0()
+            if self.sidecars:  # After rule0, which can stage the sidecar files
+                self.create_sidecars()
             self.create_shells()
 
     def create_samples(self, input_data_files: str | dict | list = None, level: str | int = None) -> list:
@@ -73,21 +110,15 @@ class Snakemaker:
             If the input_data_files parameter is not in the correct format (str, list, or dict).
         """
         input_data_files = input_data_files or self.input_data_files
-        if (
+        if isinstance(input_data_files, str) and smp.is_manifest(input_data_files):  # CSV/TXT input samples format
+            return list(smp.iter_samples(input_data_files, level))
+        elif isinstance(input_data_files, str) and input_data_files.endswith(smp.binary_manifest_extension):  # Binary manifest
+            return smp.load_column(input_data_files, level)
+        elif (
             isinstance(input_data_files, str) and self.load_bids_structure
         ):  # This will have exact rule! check it! # THIS IS PREPARATION FOR FUTURE IMG DATA
             self.bids_structure = self.load_bids_structure(input_data_files)
             return self.create_subjects()
-        elif isinstance(input_data_files, str) and ut.file_exists(input_data_files):  # CSV input samples format
-            if input_data_files.endswith(".csv"):
-                return (
-                    pd.read_csv(input_data_files)["samples"].to_list()
-                    if not level
-                    else ut.get_last_directory(pd.read_csv(input_data_files)["samples"].to_list(), level)
-                )
-            elif input_data_files.endswith(".txt"):  # TXT input samples format
-                with open(input_data_files, "r") as f:
-                    return f.readlines() if not level else ut.get_last_directory(f.readlines(), level)
         elif isinstance(input_data_files, dict):  # Given dictionary
             return input_data_files.get("samples", []) if not level else ut.get_last_directory(input_data_files.get("samples", []), level)
         elif isinstance(input_data_files, list):
@@ -95,9 +126,23 @@ class Snakemaker:
         else:
             raise NotImplementedError(
                 "The input_data_files parameter is not in the correct format. You can use only str, list or dict."
-                + "for file types: csv, txt, json, yaml, for dict: {'samples': ['sample1', 'sample2']}"
+                + "for file types: csv, txt (optionally .gz), for dict: {'samples': ['sample1', 'sample2']}"
             )
 
+    def create_manifest(self, directory: str = None) -> str:
+        """
+        Exports the samples and the per-session file table into the binary columnar manifest.
+        The returned samples.npy can be passed as input_data_files in next runs to skip text parsing and BIDS indexing.
+
+        Args:
+            directory (str, optional): The manifest directory. Defaults to OUTPUT_SNAKEMAKE_PATH/manifest.
+
+        Returns:
+            str: The path to the samples.npy file.
+        """
+        directory = directory or ut.merge_paths(ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"), df.manifest_folder_name)
+        return smp.export_manifest(directory, self.samples, self.subjects)
+
     def initialize_config(self) -> None:
         """
         Initializes the configuration for the Snakemaker instance.
@@ -170,42 +215,53 @@ class Snakemaker:
                 self.env_vars.update(ut.set_env_variable(key, ut.merge_paths(ut.get_env_variable(path_key), value), True, as_list=True))
             else:
                 self.env_vars.update(ut.set_env_variable(key, ut.merge_paths(ut.get_env_variable(path_key), value), True)) if value else None
-        # Also set Input dir path as the main path for input samples
-        if ut.get_env_variable("INPUT_DIR_PATH"):
+        # Also set Input dir path as the main path for input samples, if they were not given explicitly
+        if ut.get_env_variable("INPUT_DIR_PATH") and self.input_data_files is None:
             self.input_data_files = ut.get_env_variable("INPUT_DIR_PATH")
 
-    def add_subject(self, subject_id: str, subject_data: pd.DataFrame) -> None:
+    def add_subject(self, subject_id: str, subject_data: pd.DataFrame | dict) -> None:
         """
         Create and add a subject to the snakemaker.
 
         Args:
             subject_id (str): The ID of the subject.
-            subject_data (pd.DataFrame): The data associated with the subject.
+            subject_data (pd.DataFrame | dict): The data associated with the subject, or its grouped session lookups.
 
         Returns:
             None
         """
         self.subjects[subject_id] = sb.Subject(subject_id, subject_data)
 
-    def load_bids_structure(self, input_data_files: str) -> bids.BIDSLayout:
+    def load_bids_structure(self, input_data_files: str) -> dict:
         """
         Load the BIDS structure from the given data input path.
 
+        The dataset is indexed with the native scandir based indexer. When `bids_cache` is set, the index
+        is cached in OUTPUT_SNAKEMAKE_PATH and only changed subject/session folders are rescanned.
+        When `validate_bids` is set, the index is additionally compared with pybids BIDSLayout (optional dependency).
+        Subject folders which could not be scanned are stored in `failed_subjects`, the other subjects are loaded.
+
         Args:
             input_data_files (str): The path to the BIDS dataset.
 
         Returns:
-            bids.BIDSLayout: The loaded BIDSLayout object.
+            dict: The columnar BIDS index (column name -> list of values).
 
         Raises:
             Exception: If there is an error while loading the BIDS structure.
         """
+        cache_path = None
+        if self.bids_cache and ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"):
+            cache_path = ut.merge_paths(ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"), df.bids_index_cache_name)
         try:
-            return bids.BIDSLayout(input_data_files)
+            bids_structure = bi.scan_bids(input_data_files, cache_path=cache_path, workers=self.get_workers(), failed_subjects=self.failed_subjects)
         except Exception as e:
             msg = f"Error while loading BIDS structure: {e}"
             ut.get_logger("error_logger").error(msg)
             raise Exception(msg)
+        if self.validate_bids:
+            bi.validate_with_pybids(input_data_files, bids_structure)
+        return bids_structure
 
     def get_bids_df(self) -> pd.DataFrame:
         """
@@ -214,7 +270,7 @@ class Snakemaker:
         Returns:
             pd.DataFrame: The BIDS structure as a DataFrame.
         """
-        return self.bids_structure.to_df()
+        return bi.to_dataframe(self.bids_structure)
 
     def get_subject(self, subject_id: str) -> dict:
         """
@@ -244,21 +300,33 @@ class Snakemaker:
                 output.append(subject)
         return output
 
+    def get_workers(self) -> int:
+        """
+        Returns the number of threads scanning the subject folders, all CPUs for workers 0 or less.
+        """
+        return (os.cpu_count() or 1) if self.workers <= 0 else self.workers
+
     def create_subjects(self) -> None:
         """
         Get the subjects from the BIDS structure.
 
+        The subject folders are scanned in parallel by load_bids_structure (`workers`), the Subject objects are built
+        in memory from the index in its order. Subjects which failed are reported in the error log and stored in `failed_subjects`.
+
         Returns:
             dict: A dictionary containing the subjects.
         """
         if self.load_bids_structure:
-            bids_df = self.get_bids_df()
-            subject_ids = bids_df["subject"].dropna().unique()
+            session_lookups = sb.create_session_lookups(self.bids_structure)  # Single pass over the index
         else:
-            subject_ids = self.samples
-        for subject_id in subject_ids:  # For each unique subject
-            # Create subjects
-            self.add_subject(subject_id, bids_df[(bids_df["subject"] == subject_id)])
+            session_lookups = {subject_id: dict() for subject_id in self.samples}
+        for subject_id, subject, error in sb.build_subjects(session_lookups):  # For each unique subject
+            if error:
+                self.failed_subjects[subject_id] = error
+                msg = f"Subject {subject_id} could not be created: {error}"
+                ut.get_logger("error_logger").error(msg)
+                continue
+            self.subjects[subject_id] = subject
         return self.get_all_subjects_str()
 
     def execute_rule0(self):
@@ -309,36 +377,140 @@ class Snakemaker:
         Create the shell scripts for the rules.
 
         This method iterates over the rules and creates the shell scripts
-        based on the shell commands provided in the rules.
+        based on the shell commands provided in the rules. For sharded workflows
+        a pair of scripts is created for each shard. With the `waves` option run_waves.sh runs rule all in batches (see waves).
 
         Returns:
             None
         """
-        ut.create_shell_script(ut.merge_paths(ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"), "dry_run.sh"), df.dry_run_command)
-        ut.create_shell_script(ut.merge_paths(ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH"), "run.sh"), df.hot_run_command)
+        output_path = ut.get_env_variable("OUTPUT_SNAKEMAKE_PATH")
+        if self.shards > 1:
+            for shard, samples in enumerate(self.shard_samples):
+                if not samples:
+                    continue
+                snakefile = df.shard_smkfile_name.format(shard=shard)
+                dry_run_path = ut.merge_paths(output_path, df.shard_dry_run_name.format(shard=shard))
+                hot_run_path = ut.merge_paths(output_path, df.shard_hot_run_name.format(shard=shard))
+                ut.create_shell_script(dry_run_path, df.dry_run_command.format(snakefile=snakefile))
+                ut.create_shell_script(hot_run_path, df.hot_run_command.format(snakefile=snakefile, options=self.get_run_options()))
+                self.create_wave_shell(ut.merge_paths(output_path, df.shard_wave_run_name.format(shard=shard)), snakefile, samples)
+            return
+        ut.create_shell_script(ut.merge_paths(output_path, "dry_run.sh"), df.dry_run_command.format(snakefile=df.smkfile_name))
+        ut.create_shell_script(ut.merge_paths(output_path, "run.sh"), df.hot_run_command.format(snakefile=df.smkfile_name, options=self.get_run_options()))
+        self.create_wave_shell(ut.merge_paths(output_path, df.wave_run_name), df.smkfile_name, self.samples)
+
+    def create_wave_shell(self, script_path: str, snakefile: str, samples: list) -> int | None:
+        """
+        Creates the wave script of the Snakefile, if the `waves` option is set (a number of waves or auto).
+
+        Args:
+            script_path (str): The path to the script.
+            snakefile (str): The Snakefile name.
+            samples (list): The samples of the Snakefile.
+
+        Returns:
+            int | None: The number of waves, None if waves are disabled.
+
+        Raises:
+            ConfigError: If the waves option is not a number or auto.
+        """
+        options = {**rdf.rule_maker_options, **self.get_rule_maker_options()}
+        waves = options["waves"]
+        if waves != "auto" and (isinstance(waves, bool) or not isinstance(waves, int) or waves < 0):
+            msg = f"Unknown waves option {waves}, use a number of waves or auto"
+            ut.get_logger("error_logger").error(msg)
+            raise df.ConfigError(msg)
+        if not waves:
+            return None
+        return wv.create_wave_script(script_path, snakefile, samples, options, self.get_run_options())
 
     def create_rules(self, shortened: bool = False) -> dict:
         """
         Create rules based on the given rule configuration.
+        Unchanged rule configurations are loaded from the compiled rule cache (see `rule_cache`).
+
+        Rules are ordered topologically and rules not needed for rule all of the snakefile configuration are left out,
+        configurable with `sort_rules` and `prune_rules` in the `rule_maker` settings section.
+        With `group_chains` linear per-sample rule chains are assigned to Snakemake groups.
 
         Returns:
             dict: A dictionary containing the created rules.
         """
         # NOTE: in future add try except for the rule configuration
-        rm_instance = rm.Rulemaker(self.rule_configuration, shortened=shortened)
+        rm_instance = rm.Rulemaker(
+            self.rule_configuration,
+            shortened=shortened,
+            cache=self.rule_cache,
+            targets=sm.get_targets(self.snakefile_configuration),
+            options=self.get_rule_maker_options(),
+        )
         self.rule0 = rm_instance.get_rule_0()
-        return rm.Rulemaker(self.rule_configuration, shortened=shortened).get_rules()
+        self.rule_graph = rm_instance.get_rule_graph()
+        self.rule_groups = rm_instance.get_groups()
+        self.sidecars = rm_instance.get_sidecars()
+        self.sidecars_path = rm_instance.get_sidecars_path()
+        return rm_instance.get_rules()
+
+    def create_sidecars(self) -> dict:
+        """
+        Extracts the sidecar fields of the rule params for all samples in one parallel pass into the lookup table
+        loaded by rules.smk (see sidecars).
+
+        Returns:
+            dict: The lookup table {key: {sample: value}}.
+        """
+        return sc.create_sidecars(self.sidecars, self.samples, self.sidecars_path)
+
+    def get_rule_maker_options(self) -> dict:
+        """
+        Returns the rule_maker settings section as a plain dictionary.
+        """
+        return {key.lower(): value for key, value in dict(self.config.get("rule_maker", None) or {}).items()}
 
-    def create_snakemake_main_file(self) -> str:
+    def get_run_options(self) -> str:
+        """
+        Returns the extra snakemake options of run.sh, --group-components for the rule groups.
+        """
+        components = self.get_rule_maker_options().get("group_components", rdf.rule_maker_options["group_components"])
+        if not self.rule_groups or components <= 1:
+            return ""
+        return " --group-components " + " ".join(f"{group}={components}" for group in self.rule_groups)
+
+    def create_snakemake_main_file(self) -> str | list:
         """
         Create the main Snakemake file.
 
+        With `shards` > 1 the samples are partitioned by subject hash and an independent Snakefile
+        is created for each non-empty shard. All shards include the same rules.smk.
+
         Returns:
-            str: The path to the created Snakemake file.
+            str | list: The content of the created Snakemake file, or a list of contents for sharded workflows.
         """
         # NOTE: in future add try except for the rule configuration
+        if self.shards > 1:
+            self.shard_samples = self.partition_samples(self.shards)
+            return [
+                sm.SmkFileMaker(self.snakefile_configuration, samples=samples, smkfile_name=df.shard_smkfile_name.format(shard=shard)).get_smkfile()
+                for shard, samples in enumerate(self.shard_samples)
+                if samples
+            ]
         return sm.SmkFileMaker(self.snakefile_configuration, samples=self.samples).get_smkfile()
 
+    def partition_samples(self, shards: int) -> list:
+        """
+        Partitions the samples into shards by the hash of their subject.
+
+        Args:
+            shards (int): The number of shards.
+
+        Returns:
+            list: A list of sample lists, one for each shard.
+        """
+        output = [[] for _ in range(shards)]
+        for sample in self.samples:
+            output[ut.get_shard_index(sample, shards)].append(sample)
+        return output
+
 
 if __name__ == "__main__":
     Snakemaker(load_bids_structure=True, debug=False)
@@ -1,11 +1,169 @@
-import bids
-import pandas as pd
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING
 
 import SnakeMaker.defaults as df
 
+if TYPE_CHECKING:  # pandas is imported only by the code paths which need it
+    import pandas as pd
+
+# Columns needed to resolve session files
+lookup_columns = ["subject", "session", "path", "datatype", "acquisition", "extension", "direction"]
+
+
+def create_session_lookups(data: pd.DataFrame | dict) -> dict:
+    """
+    Groups the BIDS index by subject and session in a single pass and creates a file lookup table for each session.
+
+    Args:
+        data (pd.DataFrame | dict): The BIDS index as a DataFrame or as a columnar table (column name -> list of values).
+
+    Returns:
+        dict: Nested dictionary {subject: {session: lookup}}, see `add_to_lookup` for the lookup structure.
+    """
+    columns = [get_column(data, column) for column in lookup_columns]
+    lookups = dict()
+    for subject, session, path, datatype, acquisition, extension, direction in zip(*columns):
+        if not isinstance(subject, str) or not isinstance(session, str):  # Files outside of subject sessions
+            continue
+        add_to_lookup(lookups.setdefault(subject, dict()).setdefault(session, dict()), path, datatype, acquisition, extension, direction)
+    return lookups
+
+
+def create_file_lookup(data: pd.DataFrame | dict) -> dict:
+    """
+    Creates a file lookup table from the data of a single session.
+
+    Args:
+        data (pd.DataFrame | dict): The session part of the BIDS index.
+
+    Returns:
+        dict: The file lookup table of the session.
+    """
+    lookup = dict()
+    for path, datatype, acquisition, extension, direction in zip(*[get_column(data, column) for column in lookup_columns[2:]]):
+        add_to_lookup(lookup, path, datatype, acquisition, extension, direction)
+    return lookup
+
+
+def add_to_lookup(lookup: dict, path: str, datatype: str, acquisition: str, extension: str, direction: str) -> None:
+    """
+    Adds a file into the lookup table. Files are keyed by (acquisition, extension) and by (datatype, extension),
+    the first file for each key is kept.
+
+    Args:
+        lookup (dict): The lookup table {(acquisition or datatype, extension): (path, direction)}.
+        path (str): The path to the file.
+        datatype (str): The datatype of the file (anat, dwi, ...).
+        acquisition (str): The acquisition of the file (b0, b1000, ...).
+        extension (str): The extension of the file.
+        direction (str): The phase encoding direction of the file.
+    """
+    entry = (path, direction if isinstance(direction, str) else "")
+    if isinstance(acquisition, str):
+        lookup.setdefault((acquisition, extension), entry)
+    if isinstance(datatype, str):
+        lookup.setdefault((datatype, extension), entry)
+
+
+def get_column(data: pd.DataFrame | dict, column: str) -> list:
+    """
+    Returns the column of a DataFrame or of a columnar table as a list, missing columns are filled with None.
+    """
+    if isinstance(data, dict):  # Columnar table
+        return data[column] if column in data else [None] * len(data.get("path", []))
+    return data[column].tolist() if column in data.columns else [None] * len(data)
+
+
+def find_file(lookup: dict, key: str, extensions: list) -> str:
+    """
+    Returns the path of the first file found for the given key and extensions.
+
+    Args:
+        lookup (dict): The file lookup table of the session.
+        key (str): The acquisition or datatype of the file.
+        extensions (list): The accepted extensions, in order of preference.
+
+    Returns:
+        str: The path to the file, or an empty string if the file is missing.
+    """
+    for extension in extensions:
+        if (key, extension) in lookup:
+            return lookup[(key, extension)][0]
+    return ""
+
+
+def find_direction(lookup: dict, key: str) -> str:
+    """
+    Returns the phase encoding direction of the image found for the given key.
+    """
+    for extension in df.nifti_extensions + [".json", ".bval", ".bvec"]:
+        if (key, extension) in lookup:
+            return lookup[(key, extension)][1]
+    return ""
+
+
+def build_subjects(session_lookups: dict) -> list:
+    """
+    Builds Subject objects of the subjects, errors are returned per subject instead of being raised.
+
+    Args:
+        session_lookups (dict): Grouped session lookups {subject: {session: lookup}}.
+
+    Returns:
+        list: A list of (subject_id, Subject | None, error message | None) tuples in the order of the lookups.
+    """
+    output = []
+    for subject_id, sessions in session_lookups.items():
+        try:
+            output.append((subject_id, Subject(subject_id, sessions), None))
+        except Exception as e:
+            output.append((subject_id, None, f"{type(e).__name__}: {e}"))
+    return output
+
+
+class ModalityFiles:
+    """
+    Compact record of the files of one modality (t1, b0, b1000, ...) in a session.
+
+    Values are initialized from a copy of the modality config (defaults.t1, defaults.b0, ...), so records
+    never share state. Supports dictionary style access, e.g. record["nifti"].
+    """
+
+    __slots__ = ("name", "datatype", "acquisition", "direction", "nifti", "json", "bval", "bvec")
+
+    def __init__(self, config: dict, **files) -> None:
+        for key in self.__slots__:
+            value = files.get(key, config.get(key, ""))
+            setattr(self, key, sys.intern(value) if isinstance(value, str) else value)
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ModalityFiles) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"ModalityFiles({self.to_dict()})"
+
+    def get(self, key: str, default=None) -> str:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the record as a dictionary.
+        """
+        return {key: getattr(self, key) for key in self.__slots__}
+
 
 class SubjectSession:
-    def __init__(self, data: pd.DataFrame, session_id: str) -> None:
+    __slots__ = ("t1", "b0", "b1000", "session_id")
+
+    def __init__(self, data: pd.DataFrame | dict, session_id: str) -> None:
         # Parameters
         self.t1 = None
         self.b0 = None
@@ -13,63 +171,52 @@ class SubjectSession:
         self.session_id = None
         # Initialize parameters
         self.session_id = session_id
-        self.populate(data)
+        self.populate(data if isinstance(data, dict) and all(isinstance(key, tuple) for key in data) else create_file_lookup(data))
 
-    def populate(self, data: pd.DataFrame, config: dict = df.t1) -> None:
+    def populate(self, lookup: dict, config: dict = df.t1) -> None:
         # Parse data for each input
-        t1_data = data[data["datatype"] == config["datatype"]]
         self.t1 = self.populate_t1(
-            nifti_path=t1_data[t1_data["extension"].isin([".nii.gz", ".nii"])].values[0][0],
-            json_path=t1_data[t1_data["extension"] == ".json"].values[0][0],
+            nifti_path=find_file(lookup, config["datatype"], df.nifti_extensions),
+            json_path=find_file(lookup, config["datatype"], [".json"]),
         )
         # Populate b0
-        b0_data = data[data["acquisition"] == "b0"]
         self.b0 = self.populate_b0(
-            nifti_path=b0_data[b0_data["extension"].isin([".nii.gz", ".nii"])].values[0][0],
-            json_path=b0_data[b0_data["extension"] == ".json"].values[0][0],
-            bvals_path=b0_data[b0_data["extension"] == ".bval"].values[0][0],
-            bvecs_path=b0_data[b0_data["extension"] == ".bvec"].values[0][0],
-            direction=b0_data["direction"].values[0] if "direction" in b0_data.columns and isinstance(b0_data["direction"].values[0], str) else "",
+            nifti_path=find_file(lookup, "b0", df.nifti_extensions),
+            json_path=find_file(lookup, "b0", [".json"]),
+            bvals_path=find_file(lookup, "b0", [".bval"]),
+            bvecs_path=find_file(lookup, "b0", [".bvec"]),
+            direction=find_direction(lookup, "b0"),
         )
         # Populate b1000
-        b1000_data = data[data["acquisition"] == "b1000"]
         self.b1000 = self.populate_b1000(
-            nifti_path=b1000_data[b1000_data["extension"].isin([".nii.gz", ".nii"])].values[0][0],
-            json_path=b1000_data[b1000_data["extension"] == ".json"].values[0][0],
-            bvals_path=b1000_data[b1000_data["extension"] == ".bval"].values[0][0],
-            bvecs_path=b1000_data[b1000_data["extension"] == ".bvec"].values[0][0],
-            direction=b1000_data["direction"].values[0]
-            if "direction" in b1000_data.columns and isinstance(b1000_data["direction"].values[0], str)
-            else "",
+            nifti_path=find_file(lookup, "b1000", df.nifti_extensions),
+            json_path=find_file(lookup, "b1000", [".json"]),
+            bvals_path=find_file(lookup, "b1000", [".bval"]),
+            bvecs_path=find_file(lookup, "b1000", [".bvec"]),
+            direction=find_direction(lookup, "b1000"),
         )
 
-    def populate_b0(self, nifti_path: str, json_path: str, bvals_path: str, bvecs_path: str, direction: str = "", config: dict = df.b0) -> None:
-        self.b0 = config
-        self.b0["nifti"] = nifti_path
-        self.b0["json"] = json_path
-        self.b0["bval"] = bvals_path
-        self.b0["bvec"] = bvecs_path
-        self.b0["direction"] = direction
+    def populate_b0(
+        self, nifti_path: str, json_path: str, bvals_path: str, bvecs_path: str, direction: str = "", config: dict = df.b0
+    ) -> ModalityFiles:
+        self.b0 = ModalityFiles(config, nifti=nifti_path, json=json_path, bval=bvals_path, bvec=bvecs_path, direction=direction)
         return self.b0
 
-    def populate_b1000(self, nifti_path: str, json_path: str, bvals_path: str, bvecs_path: str, direction: str = "", config: dict = df.b0) -> None:
-        self.b0 = config
-        self.b0["nifti"] = nifti_path
-        self.b0["json"] = json_path
-        self.b0["bval"] = bvals_path
-        self.b0["bvec"] = bvecs_path
-        self.b0["direction"] = direction
-        return self.b0
+    def populate_b1000(
+        self, nifti_path: str, json_path: str, bvals_path: str, bvecs_path: str, direction: str = "", config: dict = df.b1000
+    ) -> ModalityFiles:
+        self.b1000 = ModalityFiles(config, nifti=nifti_path, json=json_path, bval=bvals_path, bvec=bvecs_path, direction=direction)
+        return self.b1000
 
-    def populate_t1(self, nifti_path, json_path, config: dict = df.t1) -> pd.DataFrame:
-        self.t1 = config
-        self.t1["nifti"] = nifti_path
-        self.t1["json"] = json_path
+    def populate_t1(self, nifti_path, json_path, config: dict = df.t1) -> ModalityFiles:
+        self.t1 = ModalityFiles(config, nifti=nifti_path, json=json_path)
         return self.t1
 
 
 class Subject:
-    def __init__(self, subject_id: str, subject_data: pd.DataFrame) -> None:
+    __slots__ = ("subject_id", "sessions", "data")
+
+    def __init__(self, subject_id: str, subject_data: pd.DataFrame | dict) -> None:
         # Parameters
         self.subject_id = str()
         self.sessions = dict()
@@ -78,19 +225,21 @@ class Subject:
         self.subject_id = subject_id
         self.data = self.populate(subject_data)
 
-    def populate(self, data: pd.DataFrame) -> None:
+    def populate(self, data: pd.DataFrame | dict) -> None:
         """
         Populates the subject's sessions based on the provided data.
 
         Args:
-            data (pd.DataFrame): The data containing information about the subject's sessions.
+            data (pd.DataFrame | dict): The data containing information about the subject's sessions,
+                either the BIDS index or already grouped session lookups {session: lookup}.
 
         Returns:
             None
         """
-        for session_id in data[(data["subject"] == self.subject_id)]["session"].unique():  # For each session
-            subdf = data[(data["subject"] == self.subject_id) & (data["session"] == str(session_id))]
-            self.sessions[session_id] = SubjectSession(subdf, session_id)
+        if not isinstance(data, dict) or isinstance(next(iter(data.values()), None), list):  # Not grouped yet
+            data = create_session_lookups(data).get(self.subject_id, dict())
+        for session_id, lookup in data.items():  # For each session
+            self.sessions[session_id] = SubjectSession(lookup, session_id)
 
     def get_sessions_number(self) -> int:
         """
@@ -128,4 +277,8 @@ class Subject:
         Raises:
             KeyError: If the session ID or data key is not found.
         """
-        return self.sessions[session_id].__dict__[data][attribut]
+        session = self.sessions[session_id]
+        record = getattr(session, data, None) if data in session.__slots__ else None
+        if not isinstance(record, ModalityFiles):
+            raise KeyError(data)
+        return record[attribut]
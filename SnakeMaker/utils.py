@@ -6,13 +6,11 @@ import os
 import re
 import subprocess
 import sys
+import uuid
+import zlib
 from datetime import datetime
 from pathlib import Path
 
-import yaml
-from dynaconf.utils.boxing import DynaBox
-from dynaconf.vendor.box.box_list import BoxList
-
 
 def merge_paths(base_path: str, merge_path: str | list) -> str:
     """
@@ -50,10 +48,28 @@ def get_last_directory(path: str | list, level: str | int):
     if isinstance(level, str):
         level = int(level)
     if isinstance(path, list):
-        values = [Path(single_path).parts[-level:] for single_path in path]
-        return [os.path.join(*value) for value in values]
-    values = Path(path).parts[-level:]
-    return os.path.join(*values)
+        return [get_last_directory(single_path, level) for single_path in path]
+    # Same parts as Path(path).parts, split directly on the string as it is called per sample
+    values = [part for part in path.split(os.sep) if part not in ("", ".")]
+    if path.startswith(os.sep):
+        values.insert(0, os.sep)
+    return os.path.join(*values[-level:])
+
+
+def get_shard_index(sample: str, shards: int) -> int:
+    """
+    Returns the shard of the sample. Samples are hashed by their first path component (subject),
+    so all sessions of a subject are placed into the same shard, independently of the sample order.
+
+    Args:
+        sample (str): The sample, e.g. 'sub-01/ses-1'.
+        shards (int): The number of shards.
+
+    Returns:
+        int: The shard index in range 0..shards-1.
+    """
+    subject = sample.strip("/").split("/")[0]
+    return zlib.crc32(subject.encode("utf-8")) % shards
 
 
 def is_none_or_empty(value: str) -> bool:
@@ -107,6 +123,8 @@ def ensure_list(variable):
       A list (either the original list if it was already a list or a
       converted list from a BoxList).
     """
+    from dynaconf.vendor.box.box_list import BoxList
+
     if isinstance(variable, BoxList):
         return list(variable)  # Convert BoxList to list
     elif isinstance(variable, list):
@@ -416,6 +434,8 @@ def load_config(config_path: str) -> dict:
         with open(config_path, "r") as f:
             return json.load(f)
     elif config_path.endswith(".yaml"):
+        import yaml
+
         with open(config_path, "r") as f:
             return yaml.load(f, Loader=yaml.FullLoader)
     else:
@@ -445,6 +465,56 @@ def import_scripts(script_paths: str | list, function_name: str = False) -> impo
             return module
 
 
+def write_atomic(file_path: str, content: str | bytes) -> None:
+    """
+    Atomically writes the content to the file. The content is written into a temporary file
+    in the same directory, which then replaces the target, so readers never see a half-written file.
+
+    Args:
+        file_path (str): The path to the file.
+        content (str | bytes): The text or binary content to write.
+    """
+    directory = os.path.dirname(file_path) or "."
+    directory_exists(directory, True)
+    try:  # Keep the mode of the replaced file
+        mode = os.stat(file_path).st_mode & 0o777
+    except OSError:
+        mode = None  # New files get 0666 without the umask, applied by os.open
+    temp_path = os.path.join(directory, f".{os.path.basename(file_path)}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_if_changed(file_path: str, content: str) -> bool:
+    """
+    Atomically writes the text content to the file, only if it differs from the current content.
+    Unchanged files keep their modification time.
+
+    Args:
+        file_path (str): The path to the file.
+        content (str): The text content to write.
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date.
+    """
+    try:
+        with open(file_path, "r") as f:
+            if f.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    write_atomic(file_path, content)
+    return True
+
+
 def file_exists(file_path: str) -> bool:
     """
     Check if the file exists.
@@ -0,0 +1,119 @@
+"""
+Batched execution of rule all in waves.
+
+run_waves.sh runs `snakemake all --batch all=<wave>/<waves>`, one wave after another, so Snakemake plans only the samples
+of the current wave and their intermediates do not pile up for the whole cohort. The number of waves is fixed (`waves: N`)
+or sized from the free space under OUTPUT_DIR_PATH and the per-sample footprint (`waves: auto`). The footprint
+is the `wave_footprint_mb` option, or estimated from the benchmarks as the quantile of the summed io_out of all rules
+per sample. Before each wave the script checks the free space, a failed wave stops the run, which is resumed
+by run_waves.sh <wave>.
+"""
+
+import math
+import os
+import shutil
+
+import SnakeMaker.utils as ut
+from SnakeMaker.rule_maker import resource_estimator as res
+
+wave_script = """#!/bin/bash
+# Runs rule all in {waves} waves of about {wave_size} samples, the next wave starts when the previous one completed.
+# Usage: {script_name} [first wave]
+set -uo pipefail
+waves={waves}
+required_kb={required_kb}  # Estimated footprint of one wave, 0 - not checked
+output_dir="{output_dir}"
+mkdir -p "$output_dir"
+for wave in $(seq "${{1:-1}}" "$waves"); do
+    available_kb=$(df -Pk "$output_dir" | awk 'NR == 2 {{print $4}}')
+    if [ "$required_kb" -gt 0 ] && [ "$available_kb" -lt "$required_kb" ]; then
+        echo "Wave $wave/$waves needs ${{required_kb}} kB, ${{available_kb}} kB free in $output_dir. Free space and resume with: $0 $wave" >&2
+        exit 1
+    fi
+    echo "Wave $wave/$waves"
+    snakemake all --batch all=$wave/$waves --cores all --keep-going --snakefile {snakefile}{options} || {{
+        echo "Wave $wave/$waves failed. Resume with: $0 $wave" >&2
+        exit 1
+    }}
+done
+"""
+
+
+def sample_footprint_mb(quantile: float = 0.95, directory: str = None) -> float | None:
+    """
+    Estimates the disk footprint of one sample from the benchmarks, the io_out of all rules summed per sample.
+
+    Args:
+        quantile (float, optional): The quantile over the samples. Defaults to 0.95.
+        directory (str, optional): The benchmarks directory. Defaults to OUTPUT_DIR_PATH/benchmarks.
+
+    Returns:
+        float | None: The footprint in MB, None if there are no per-sample measurements.
+    """
+    totals = None
+    for files in res.find_benchmarks(directory or res.get_benchmarks_path()).values():
+        data = res.load_benchmarks([(sample, path) for sample, path in files if sample])
+        data = data.dropna(subset=["io_out"])
+        if data.empty:
+            continue
+        written = data.groupby("sample")["io_out"].max()  # Repeated measurements of a sample are not summed
+        totals = written if totals is None else totals.add(written, fill_value=0)
+    if totals is None or totals.empty:
+        return None
+    return float(totals.quantile(quantile))
+
+
+def count_waves(samples: int, footprint_mb: float, free_bytes: int, reserve: float = 0.1) -> int:
+    """
+    Returns the number of waves, so one wave fits into the free space without the reserve.
+
+    Example:
+    >>> count_waves(20000, 500, 2 * 1024**4, 0.1)  # 3774 samples of 500 MB in 90 % of 2 TiB
+    6
+    """
+    if samples <= 0 or not footprint_mb or footprint_mb <= 0:
+        return 1
+    usable_mb = free_bytes / 1024**2 * (1 - reserve)
+    wave_size = max(1, math.floor(usable_mb / footprint_mb))
+    return math.ceil(samples / wave_size)
+
+
+def create_wave_script(script_path: str, snakefile: str, samples: list, options: dict, run_options: str = "") -> int:
+    """
+    Creates run_waves.sh for the Snakefile.
+
+    Args:
+        script_path (str): The path to the script.
+        snakefile (str): The Snakefile name, relative to OUTPUT_SNAKEMAKE_PATH.
+        samples (list): The samples of the Snakefile.
+        options (dict): The rule_maker options (waves, wave_footprint_mb, wave_disk_reserve, resource_quantile).
+        run_options (str, optional): Extra snakemake options of run.sh. Defaults to "".
+
+    Returns:
+        int: The number of waves.
+    """
+    output_dir = ut.get_env_variable("OUTPUT_DIR_PATH")
+    footprint_mb = options["wave_footprint_mb"] or sample_footprint_mb(options["resource_quantile"])
+    if options["waves"] == "auto":
+        os.makedirs(output_dir, exist_ok=True)
+        free_bytes = shutil.disk_usage(output_dir).free
+        waves = count_waves(len(samples), footprint_mb, free_bytes, options["wave_disk_reserve"])
+        if not footprint_mb:
+            ut.get_logger("error_logger").error("No per-sample footprint for waves: auto, set wave_footprint_mb or benchmark_rules. Running one wave.")
+    else:
+        waves = int(options["waves"])
+    waves = max(1, min(waves, len(samples) or 1))
+    wave_size = math.ceil(len(samples) / waves) if samples else 0
+    required_kb = math.ceil(wave_size * footprint_mb * 1024) if footprint_mb else 0
+    content = wave_script.format(
+        waves=waves,
+        wave_size=wave_size,
+        script_name=os.path.basename(script_path),
+        required_kb=required_kb,
+        output_dir=output_dir,
+        snakefile=snakefile,
+        options=run_options,
+    )
+    ut.create_shell_script(script_path, content)
+    ut.get_logger("info_logger").info(f"Wave script {script_path}: {len(samples)} samples in {waves} waves, footprint {footprint_mb} MB per sample")
+    return waves
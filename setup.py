@@ -12,6 +12,8 @@ setup(
     # Link to your project's repository
     packages=find_packages(),  # Automatically find packages within your project
     install_requires=required,
+    extras_require={"bids": ["pybids"]},  # Optional BIDS index validation
+    entry_points={"console_scripts": ["snakemaker=SnakeMaker.cli:main"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",  # Or choose another appropriate license
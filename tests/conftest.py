@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from SnakeMaker.rule_maker.rule import Rule
+
+# Files of every session in the test dataset (datatype, filename without the sub/ses prefix)
+session_files = [
+    ("anat", "T1w.nii.gz"),
+    ("dwi", "acq-b0_dir-PA_dwi.nii.gz"),
+    ("dwi", "acq-b0_dir-PA_dwi.json"),
+    ("dwi", "acq-b1000_dir-AP_dwi.nii.gz"),
+    ("dwi", "acq-b1000_dir-AP_dwi.json"),
+]
+
+
+def create_bids_tree(root: str, sessions: dict) -> list:
+    """
+    Creates a BIDS tree {subject: [sessions]} with the session files, returns the created paths.
+    """
+    output = []
+    with open(os.path.join(root, "dataset_description.json"), "w") as f:
+        f.write('{"Name": "test", "BIDSVersion": "1.8.0"}')
+    for subject, subject_sessions in sessions.items():
+        for session in subject_sessions:
+            for datatype, filename in session_files:
+                directory = os.path.join(root, f"sub-{subject}", f"ses-{session}", datatype)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"sub-{subject}_ses-{session}_{filename}")
+                with open(path, "w") as f:
+                    f.write('{"TotalReadoutTime": 0.05}' if filename.endswith(".json") else "")
+                output.append(path)
+    return output
+
+
+@pytest.fixture
+def bids_root(tmp_path):
+    """
+    BIDS dataset with the subjects 01 (sessions 1, 2) and 02 (session 1).
+    """
+    root = tmp_path / "bids"
+    root.mkdir()
+    create_bids_tree(str(root), {"01": ["1", "2"], "02": ["1"]})
+    return str(root)
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    """
+    Settings with the demo configurations and the application paths in a temporary directory.
+    The settings and the environment variables set from them are restored after the test.
+    """
+    import SnakeMaker.defaults as df
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    app = {
+        "APPLICATION_ROOT_PATH": str(tmp_path),
+        "INPUT_DIR_PATH": str(tmp_path / "input_data"),
+        "OUTPUT_DIR_PATH": str(tmp_path / "output_data" / "data"),
+        "OUTPUT_RULE_MAKER_PATH": str(tmp_path / "output_data" / "rules"),
+        "OUTPUT_SNAKEMAKE_PATH": str(tmp_path / "output_data"),
+    }
+    for key, value in app.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.delitem(df.lazy_values, "settings", raising=False)
+    path = tmp_path / "settings.yaml"
+    path.write_text(
+        "logger:\n"
+        + "".join(f"  {name}:\n    path: logs/{name}.log\n" for name in ["info", "error", "debug"])
+        + "configuration_files:\n"
+        + f"  rule_configuration: {os.path.join(root, 'config', 'demo_rule_config.yaml')}\n"
+        + f"  snakefile_configuration: {os.path.join(root, 'config', 'demo_snakefile_config.yaml')}\n"
+        + "app:\n"
+        + "".join(f"  {key}: {value}\n" for key, value in app.items())
+    )
+    return str(path)
+
+
+@pytest.fixture
+def output_paths(tmp_path, monkeypatch):
+    """
+    Points the environment paths of the rendered rules and the rule cache into a temporary directory.
+    """
+    for var in ["INPUT_DIR_PATH", "OUTPUT_DIR_PATH", "OUTPUT_RULE_MAKER_PATH"]:
+        monkeypatch.setenv(var, str(tmp_path / var.lower()))
+    monkeypatch.delenv("SCRATCH_DIR", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def make_rule():
+    """
+    Returns a factory of built rules with the parsed inputs and outputs {key: path}.
+    """
+
+    def factory(name: str, inputs: dict = None, outputs: dict = None, shell: list = None, run: str = "") -> Rule:
+        rule = Rule()
+        rule.name = name
+        rule.inputs = [{key: path} for key, path in (inputs or {}).items()]
+        rule.outputs = [{key: path} for key, path in (outputs or {}).items()]
+        rule.shell = shell or []
+        rule.run = run
+        return rule
+
+    return factory
@@ -0,0 +1,111 @@
+import copy
+import os
+
+import pytest
+
+import SnakeMaker.benchmark_report as br
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_resource_estimator import write_benchmark
+from tests.test_rule_cache import rule_config
+
+# {rule: [(sample, s, max_rss, cpu_time)]}
+measurements = {
+    "denoise": [("sub-01", 100, 1000, 400), ("sub-02", 110, 1100, 440), ("sub-03", 400, 1200, 1600)],
+    "degibbs": [("sub-01", 10, 100, 10), ("sub-02", 20, 100, 20), ("sub-03", 30, 100, 30)],
+}
+
+
+@pytest.fixture
+def benchmarks(tmp_path):
+    directory = tmp_path / "benchmarks"
+    for rule, rows in measurements.items():
+        for sample, s, max_rss, cpu_time in rows:
+            write_benchmark(str(directory / rule / f"{sample}.tsv"), s, max_rss, cpu_time)
+    write_benchmark(str(directory / "report.tsv"), 5, 50, 5)
+    return str(directory)
+
+
+def test_collect_benchmarks(benchmarks):
+    data = br.collect_benchmarks(benchmarks, {"denoise": 8})
+    assert list(data.columns) == ["rule", "sample", "s", "max_rss", "io_in", "io_out", "cpu_time", "cpu_usage", "cpu_efficiency"]
+    assert len(data) == 7
+    row = data[(data["rule"] == "denoise") & (data["sample"] == "sub-02")].iloc[0]
+    assert (row["s"], row["max_rss"], row["cpu_usage"], row["cpu_efficiency"]) == (110, 1100, 4, 0.5)
+    assert data[data["rule"] == "report"].iloc[0]["sample"] == ""
+    assert data[data["rule"] == "degibbs"]["cpu_efficiency"].tolist() == [1, 1, 1]  # 1 thread without the rule threads
+
+
+def test_collect_benchmarks_without_files(tmp_path):
+    assert br.collect_benchmarks(str(tmp_path / "missing")).empty
+
+
+def test_summarize(benchmarks):
+    summary = br.summarize(br.collect_benchmarks(benchmarks, {"denoise": 8}))
+    assert list(summary.index) == ["denoise", "degibbs", "report"]  # Slowest p95 first
+    denoise = summary.loc["denoise"]
+    assert (denoise["count"], denoise["s_p50"], denoise["s_max"], denoise["max_rss_max"]) == (3, 110, 400, 1200)
+    assert denoise["s_p95"] == pytest.approx(110 + 0.9 * 290)
+    assert denoise["cpu_efficiency_mean"] == pytest.approx(0.5)
+
+
+def test_slowest_samples(benchmarks):
+    slowest = br.slowest_samples(br.collect_benchmarks(benchmarks), top=2)
+    assert slowest.to_dict("records") == [
+        {"sample": "sub-03", "total_s": 430, "rules": 2, "slowest_rule": "denoise"},
+        {"sample": "sub-02", "total_s": 130, "rules": 2, "slowest_rule": "denoise"},
+    ]
+
+
+def test_outliers(benchmarks):
+    data = br.collect_benchmarks(benchmarks)
+    outlying = br.outliers(data, br.summarize(data))
+    assert list(zip(outlying["rule"], outlying["sample"])) == [("denoise", "sub-03"), ("degibbs", "sub-03")]
+
+
+def test_create_report(benchmarks, tmp_path):
+    output_path = str(tmp_path / "reports" / "report.txt")
+    os.makedirs(os.path.dirname(output_path))
+    report = br.create_report(benchmarks, output_path, {"denoise": 8}, top=2)
+    assert report.startswith("Benchmarks: 7 measurements of 3 rules, 4 samples\n")
+    assert "Slowest rules (p95 wall time): denoise (371.0 s), degibbs (29.0 s)" in report
+    assert "Low CPU efficiency (< 50% of threads used): denoise" not in report  # Exactly 50%
+    assert "Measurements above the p95 of their rule:" in report
+    with open(output_path) as f:
+        assert f.read() == report
+    with open(str(tmp_path / "reports" / "report.tsv")) as f:
+        assert f.readline().startswith("rule\tcount\ts_p50\ts_p95\ts_max")
+
+
+def test_create_report_without_benchmarks(tmp_path):
+    assert br.create_report(str(tmp_path)) == "Benchmarks: 0 measurements of 0 rules, 0 samples\n"
+
+
+@pytest.mark.parametrize("shortened", [True, False])
+def test_benchmark_directives(output_paths, shortened):
+    config = copy.deepcopy(rule_config)
+    config["rules"]["report"] = {"input": {"b0_degibbs": None}, "output": {"report": {"path": "/data/report.html"}}, "shell": ["report {input}"]}
+    rulemaker = Rulemaker(config, shortened=shortened, cache=False, options={"benchmark_rules": True})
+    base_path = "{output_path}" if shortened else os.environ["OUTPUT_DIR_PATH"]
+    assert rulemaker.rules["denoise"].benchmark == f"{base_path}/benchmarks/denoise/{{sample}}.tsv"
+    assert rulemaker.rules["report"].benchmark == f"{os.environ['OUTPUT_DIR_PATH']}/benchmarks/report.tsv"  # Output without {output_path}
+    with open(rulemaker.get_fragment_path("denoise")) as f:
+        assert f'\n\tbenchmark:\n\t\t"{base_path}/benchmarks/denoise/{{sample}}.tsv"' in f.read()
+    assert all(not rule.benchmark for rule in Rulemaker(copy.deepcopy(rule_config), cache=False).rules.values())
+
+
+def test_benchmark_paths_use_the_output_wildcards(output_paths, make_rule):
+    rulemaker = Rulemaker(copy.deepcopy(rule_config), shortened=True, cache=False, options={"benchmark_rules": True})
+    rulemaker.rules = {
+        "split": make_rule("split", outputs={"left": "{output_path}/split/{sample}/{side}_l.nii.gz", "right": "{output_path}/split/{sample}/{side}_r.nii.gz"}),
+        "atlas": make_rule("atlas", outputs={"atlas": "{output_path}/atlas/{side}.nii.gz"}),
+        "mixed": make_rule("mixed", outputs={"a": "{output_path}/{sample}/a.nii.gz", "b": "/data/{sample}/b.nii.gz"}),
+        "touch": make_rule("touch"),
+    }
+    rulemaker.assign_benchmarks()
+    output_dir = os.environ["OUTPUT_DIR_PATH"]
+    assert {name: rule.benchmark for name, rule in rulemaker.rules.items()} == {
+        "split": "{output_path}/benchmarks/split/{sample}.{side}.tsv",
+        "atlas": "{output_path}/benchmarks/atlas/{side}.tsv",
+        "mixed": f"{output_dir}/benchmarks/mixed/{{sample}}.tsv",
+        "touch": f"{output_dir}/benchmarks/touch.tsv",
+    }
@@ -0,0 +1,185 @@
+import os
+
+import pytest
+
+import SnakeMaker.bids_index as bi
+
+
+def test_parse_filename():
+    assert bi.parse_filename("sub-01_ses-1_acq-b0_dir-PA_dwi.nii.gz") == {
+        "subject": "01",
+        "session": "1",
+        "acquisition": "b0",
+        "direction": "PA",
+        "suffix": "dwi",
+        "extension": ".nii.gz",
+    }
+    assert bi.parse_filename("sub-01_T1w") == {"subject": "01", "suffix": "T1w", "extension": ""}
+
+
+@pytest.mark.parametrize("filename", ["README", "dataset_description.json", "sub-01.nii.gz", "sub_01_dwi.nii.gz"])
+def test_parse_filename_of_non_bids_files(filename):
+    assert bi.parse_filename(filename) is None
+
+
+def test_scan_bids(bids_root):
+    table = bi.scan_bids(bids_root)
+    assert list(table) == ["path", "acquisition", "datatype", "direction", "extension", "session", "subject", "suffix"]
+    assert len(table["path"]) == 15
+    assert sorted(set(zip(table["subject"], table["session"]))) == [("01", "1"), ("01", "2"), ("02", "1")]
+    row = table["path"].index(os.path.join(bids_root, "sub-01", "ses-2", "dwi", "sub-01_ses-2_acq-b1000_dir-AP_dwi.nii.gz"))
+    assert {column: values[row] for column, values in table.items() if column != "path"} == {
+        "acquisition": "b1000",
+        "datatype": "dwi",
+        "direction": "AP",
+        "extension": ".nii.gz",
+        "session": "2",
+        "subject": "01",
+        "suffix": "dwi",
+    }
+
+
+def test_scan_bids_skips_foreign_and_hidden_files(bids_root):
+    dwi = os.path.join(bids_root, "sub-02", "ses-1", "dwi")
+    for name in ["sub-01_ses-1_acq-b0_dwi.nii.gz", "sub-02_ses-2_acq-b0_dwi.nii.gz", ".sub-02_ses-1_acq-b0_dwi.nii.gz", "notes.txt"]:
+        open(os.path.join(dwi, name), "w").close()
+    os.makedirs(os.path.join(bids_root, "derivatives", "sub-01"))
+    assert len(bi.scan_bids(bids_root)["path"]) == 15
+
+
+def test_scan_bids_without_sessions(tmp_path):
+    dwi = tmp_path / "sub-01" / "dwi"
+    dwi.mkdir(parents=True)
+    (dwi / "sub-01_acq-b0_dwi.nii.gz").touch()
+    (tmp_path / "sub-01" / "sub-01_scans.tsv").touch()
+    table = bi.scan_bids(str(tmp_path))
+    assert sorted(zip(table["datatype"], table["suffix"], table["session"]), key=str) == [("dwi", "dwi", None), (None, "scans", None)]
+
+
+def test_scan_bids_extra_entities(bids_root):
+    open(os.path.join(bids_root, "sub-02", "ses-1", "dwi", "sub-02_ses-1_acq-b0_run-2_dwi.nii.gz"), "w").close()
+    table = bi.scan_bids(bids_root)
+    assert "run" in table
+    assert [run for run in table["run"] if run] == ["2"]
+
+
+def test_scan_bids_missing_root(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        bi.scan_bids(str(tmp_path / "missing"))
+
+
+def test_to_dataframe(bids_root):
+    data = bi.to_dataframe(bi.scan_bids(bids_root))
+    assert list(data["path"]) == sorted(data["path"])
+    assert set(data["subject"]) == {"01", "02"}
+
+
+def bump_mtime(path: str) -> None:
+    """
+    Moves the mtime forward, changes within the timestamp granularity of the file system are not visible otherwise.
+    """
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def scanned_sessions(monkeypatch):
+    """
+    Records the (subject, session) of every scanned session folder.
+    """
+    output = []
+    scan_session = bi.scan_session
+
+    def record(session_path, subject, session):
+        output.append((subject, session))
+        return scan_session(session_path, subject, session)
+
+    monkeypatch.setattr(bi, "scan_session", record)
+    return output
+
+
+def test_index_cache_reuses_unchanged_sessions(bids_root, tmp_path, scanned_sessions):
+    cache_path = str(tmp_path / "cache" / ".bids_index.pkl")
+    table = bi.scan_bids(bids_root, cache_path=cache_path)
+    assert len(scanned_sessions) == 3
+    assert os.listdir(tmp_path / "cache") == [".bids_index.pkl"]  # No temporary files left
+    stamp = os.stat(cache_path).st_mtime_ns
+    scanned_sessions.clear()
+    assert bi.scan_bids(bids_root, cache_path=cache_path) == table
+    assert scanned_sessions == []
+    assert os.stat(cache_path).st_mtime_ns == stamp  # Not rewritten
+
+
+def test_index_cache_rescans_changed_sessions(bids_root, tmp_path, scanned_sessions):
+    cache_path = str(tmp_path / ".bids_index.pkl")
+    bi.scan_bids(bids_root, cache_path=cache_path)
+    dwi = os.path.join(bids_root, "sub-01", "ses-2", "dwi")
+    open(os.path.join(dwi, "sub-01_ses-2_acq-b2000_dir-AP_dwi.nii.gz"), "w").close()
+    bump_mtime(dwi)
+    scanned_sessions.clear()
+    table = bi.scan_bids(bids_root, cache_path=cache_path)
+    assert scanned_sessions == [("01", "2")]
+    assert len(table["path"]) == 16
+    assert table == bi.scan_bids(bids_root)
+
+
+def test_index_cache_added_and_removed_sessions(bids_root, tmp_path, scanned_sessions):
+    cache_path = str(tmp_path / ".bids_index.pkl")
+    bi.scan_bids(bids_root, cache_path=cache_path)
+    os.makedirs(os.path.join(bids_root, "sub-02", "ses-2", "dwi"))
+    open(os.path.join(bids_root, "sub-02", "ses-2", "dwi", "sub-02_ses-2_acq-b0_dwi.nii.gz"), "w").close()
+    bump_mtime(os.path.join(bids_root, "sub-02"))
+    for path in sorted(bi.scan_bids(bids_root)["path"]):
+        if os.sep + "sub-01" + os.sep + "ses-1" + os.sep in path:
+            os.remove(path)
+    for directory in ["anat", "dwi", ""]:
+        os.rmdir(os.path.join(bids_root, "sub-01", "ses-1", directory))
+    bump_mtime(os.path.join(bids_root, "sub-01"))
+    scanned_sessions.clear()
+    table = bi.scan_bids(bids_root, cache_path=cache_path)
+    assert scanned_sessions == [("02", "2")]
+    assert sorted(set(zip(table["subject"], table["session"]))) == [("01", "2"), ("02", "1"), ("02", "2")]
+    assert table == bi.scan_bids(bids_root)
+
+
+@pytest.mark.parametrize("content", [b"corrupted", None])
+def test_index_cache_is_rebuilt(bids_root, tmp_path, scanned_sessions, content):
+    cache_path = str(tmp_path / ".bids_index.pkl")
+    bi.scan_bids(bids_root, cache_path=cache_path)
+    if content is None:  # Cache of another dataset
+        other = tmp_path / "other"
+        (other / "sub-01" / "dwi").mkdir(parents=True)
+        (other / "sub-01" / "dwi" / "sub-01_acq-b0_dwi.nii.gz").touch()
+        bi.scan_bids(str(other), cache_path=cache_path)
+    else:
+        with open(cache_path, "wb") as f:
+            f.write(content)
+    scanned_sessions.clear()
+    assert bi.scan_bids(bids_root, cache_path=cache_path) == bi.scan_bids(bids_root)
+    assert len(scanned_sessions) == 6  # All sessions with and without the cache
+
+
+@pytest.mark.parametrize("workers", [2, 8])
+def test_scan_bids_workers(bids_root, tmp_path, workers):
+    table = bi.scan_bids(bids_root)
+    assert bi.scan_bids(bids_root, workers=workers) == table
+    cache_path = str(tmp_path / ".bids_index.pkl")
+    assert bi.scan_bids(bids_root, cache_path=cache_path, workers=workers) == table
+    assert bi.scan_bids(bids_root, cache_path=cache_path, workers=workers) == table
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_bids_keeps_the_other_subjects_of_a_failed_subject(bids_root, monkeypatch, workers):
+    scan_session = bi.scan_session
+
+    def fail(session_path, subject, session):
+        if subject == "01":
+            raise PermissionError(f"Permission denied: {session_path}")
+        return scan_session(session_path, subject, session)
+
+    monkeypatch.setattr(bi, "scan_session", fail)
+    failed_subjects = dict()
+    table = bi.scan_bids(bids_root, workers=workers, failed_subjects=failed_subjects)
+    assert set(table["subject"]) == {"02"}
+    assert list(failed_subjects) == ["01"]
+    assert failed_subjects["01"].startswith("PermissionError: Permission denied")
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+from SnakeMaker import cli
+from SnakeMaker.benchmarks import startup
+from tests.test_resource_estimator import write_benchmark
+
+
+def test_import_does_not_load_heavy_modules():
+    code = f"import sys, SnakeMaker.cli; print(sorted(set({startup.heavy_modules!r}) & set(sys.modules)))"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout == "[]\n"
+
+
+def test_help(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["--help"])
+    assert exit_info.value.code == 0
+    assert "generate" in capsys.readouterr().out
+
+
+def test_plan(settings_file, tmp_path, capsys):
+    samples = tmp_path / "samples.txt"
+    samples.write_text("sub-01/ses-1\nsub-02/ses-1\nsub-01/ses-2\nsub-04/ses-1\n")
+    assert cli.main(["plan", "--settings", settings_file, "--input", str(samples), "--shards", "4"]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert output[:5] == ["Samples: 4", "Shard 0: 0 samples", "Shard 1: 2 samples", "Shard 2: 1 samples", "Shard 3: 1 samples"]
+    assert output[5].startswith("Rules (") and "denoise_step1" in output[5]
+    assert not (tmp_path / "output_data").exists()  # Plan does not write anything
+
+
+def test_unknown_benchmark(capsys):
+    assert cli.main(["bench", "missing"]) == 2
+    assert "Unknown benchmark missing" in capsys.readouterr().err
+
+
+def test_report_uses_the_estimated_threads(settings_file, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    for sample in ["sub-01", "sub-02", "sub-03"]:
+        # Past runs in OUTPUT_DIR_PATH estimate 8 threads, the reported runs use 2 of them
+        write_benchmark(str(tmp_path / "output_data" / "data" / "benchmarks" / "denoise_step1" / f"{sample}.tsv"), 10, 100, 80)
+        write_benchmark(str(tmp_path / "reported" / "denoise_step1" / f"{sample}.tsv"), 10, 100, 20)
+    assert cli.main(["report", "--settings", settings_file, "--benchmarks", str(tmp_path / "reported")]) == 0
+    assert "Low CPU efficiency (< 50% of threads used): denoise_step1" in capsys.readouterr().out
@@ -0,0 +1,134 @@
+import copy
+
+import pytest
+
+import SnakeMaker.rule_maker.rule_defaults as rdf
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import command_splitter as cs
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+
+
+@pytest.fixture
+def denoise(make_rule):
+    return make_rule(
+        "denoise",
+        {"b0": "/in/{sample}/b0.nii.gz", "b1000": "/in/{sample}/b1000.nii.gz"},
+        {"b0_denoised": "/out/{sample}/b0.nii.gz", "b1000_denoised": "/out/{sample}/b1000.nii.gz"},
+        ["dwidenoise {input.b0} {output.b0_denoised}", "dwidenoise {input.b1000} {output.b1000_denoised}"],
+    )
+
+
+def test_independent_commands(denoise):
+    assert cs.find_parts(denoise) == [
+        {"shell": ["dwidenoise {input.b0} {output.b0_denoised}"], "input": {"b0"}, "output": {"b0_denoised"}, "params": set()},
+        {"shell": ["dwidenoise {input.b1000} {output.b1000_denoised}"], "input": {"b1000"}, "output": {"b1000_denoised"}, "params": set()},
+    ]
+
+
+def test_commands_sharing_an_output_stay_together(make_rule):
+    rule = make_rule(
+        "roi",
+        {"b0": "/in/b0.nii.gz", "b1000": "/in/b1000.nii.gz"},
+        {"roi": "/out/roi.nii.gz", "mask": "/out/mask.nii.gz"},
+        [
+            "fslroi {input.b0} {output.roi} 0 1",
+            "bet {input.b1000} {output.mask}",
+            "fslmaths {output.roi} -mul 2 {output.roi}",
+        ],
+    )
+    parts = cs.find_parts(rule)
+    assert [part["shell"] for part in parts] == [
+        ["fslroi {input.b0} {output.roi} 0 1", "fslmaths {output.roi} -mul 2 {output.roi}"],
+        ["bet {input.b1000} {output.mask}"],
+    ]
+
+
+def test_continued_lines_are_one_command(make_rule):
+    rule = make_rule(
+        "eddy",
+        {"b0": "/in/b0.nii.gz", "b1000": "/in/b1000.nii.gz"},
+        {"b0_out": "/out/b0.nii.gz", "b1000_out": "/out/b1000.nii.gz"},
+        ["eddy --imain={input.b0} \\", "  --out={output.b0_out} --nthr={params.threads}", "eddy --imain={input.b1000} --out={output.b1000_out}"],
+    )
+    parts = cs.find_parts(rule)
+    assert [part["shell"] for part in parts] == [
+        ["eddy --imain={input.b0} \\", "  --out={output.b0_out} --nthr={params.threads}"],
+        ["eddy --imain={input.b1000} --out={output.b1000_out}"],
+    ]
+    assert parts[0]["params"] == {"threads"}
+
+
+@pytest.mark.parametrize(
+    "shell",
+    [
+        ["dwidenoise {input.b0} {output.b0_denoised}"],  # Single command
+        ["dwidenoise {input.b0} {output.b0_denoised}", "dwidenoise {input.b1000} {output.b1000_denoised}", "cat {output}"],  # Whole output
+        ["dwidenoise {input[0]} {output.b0_denoised}", "dwidenoise {input.b1000} {output.b1000_denoised}"],  # Indexed input
+        ["mkdir -p /out/{wildcards.sample}", "dwidenoise {input.b0} {output.b0_denoised}", "dwidenoise {input.b1000} {output.b1000_denoised}"],
+        ["dwidenoise {input.b0} {output.b0_denoised}", "mrcat {output.b0_denoised} {input.b1000} {output.b1000_denoised}"],  # Single part
+    ],
+)
+def test_not_splittable(denoise, shell):
+    denoise.shell = shell
+    assert cs.find_parts(denoise) is None
+
+
+def test_implicit_outputs_are_not_split(denoise):
+    denoise.outputs.append({"noise": "/out/{sample}/noise.nii.gz"})  # Written by a -noise option
+    assert cs.find_parts(denoise) is None
+
+
+def test_run_rule_is_not_split(denoise):
+    denoise.run = "shell('dwidenoise {input.b0} {output.b0_denoised}')"
+    assert cs.find_parts(denoise) is None
+
+
+split_config = {
+    "rules": {
+        "denoise": {
+            "input": {"b0": {"path": "/data/{sample}/b0.nii.gz"}, "b1000": {"path": "/data/{sample}/b1000.nii.gz"}},
+            "output": {
+                "b0_denoised": {"output_name": "b0_denoised.nii.gz", "output_folder": "denoised"},
+                "b1000_denoised": {"output_name": "b1000_denoised.nii.gz", "output_folder": "denoised"},
+            },
+            "shell": ["dwidenoise {input.b0} {output.b0_denoised}", "dwidenoise {input.b1000} {output.b1000_denoised}"],
+        },
+        "degibbs": {
+            "input": {"b0_denoised": None},
+            "output": {"b0_degibbs": {"output_name": "b0_degibbs.nii.gz", "output_folder": "degibbs"}},
+            "shell": ["mrdegibbs {input.b0_denoised} {output.b0_degibbs}"],
+        },
+    }
+}
+
+
+def test_split_into_rules(output_paths):
+    rulemaker = Rulemaker(copy.deepcopy(split_config), cache=False, options={"split_commands": "rules"})
+    assert list(rulemaker.rules) == ["denoise_part1", "denoise_part2", "degibbs"]
+    part = rulemaker.rules["denoise_part2"]
+    assert [list(item) for item in part.inputs] == [["b1000"]]
+    assert [list(item) for item in part.outputs] == [["b1000_denoised"]]
+    assert part.shell == ["dwidenoise {input.b1000} {output.b1000_denoised}"]
+    assert rulemaker.get_rule_graph().parents["degibbs"] == ["denoise_part1"]
+
+
+def test_split_into_concurrent_jobs(output_paths):
+    rulemaker = Rulemaker(copy.deepcopy(split_config), cache=False, options={"split_commands": "concurrent"})
+    denoise = rulemaker.rules["denoise"]
+    assert denoise.threads == 2
+    assert denoise.shell == [
+        "dwidenoise {input.b0} {output.b0_denoised} &",
+        "dwidenoise {input.b1000} {output.b1000_denoised} &",
+        rdf.concurrent_wait_command,
+    ]
+    assert rulemaker.rules["degibbs"].shell == ["mrdegibbs {input.b0_denoised} {output.b0_degibbs}"]
+
+
+def test_concurrent_jobs_in_batches_of_threads():
+    parts = [{"shell": [f"cmd {index}"]} for index in range(3)] + [{"shell": ["a", "b"]}]
+    assert cs.concurrent_shell(parts, 2) == ["cmd 0 &", "cmd 1 &", rdf.concurrent_wait_command, "cmd 2 &", "(", "a", "b", ") &", rdf.concurrent_wait_command]
+
+
+def test_unknown_split_option(output_paths):
+    with pytest.raises(ConfigError):
+        Rulemaker(copy.deepcopy(split_config), cache=False, options={"split_commands": "threads"})
@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+from SnakeMaker.benchmarks import path_templates as bench
+from SnakeMaker.rule_maker import path_template as pt
+
+
+def test_intern_template_shares_equal_templates():
+    template = pt.intern_template("/data/input_data", ["base", "{sample}", "b0.nii.gz"])
+    assert pt.intern_template("/data/input_data", ("base", "{sample}", "b0.nii.gz")) is template
+    assert pt.intern_template("/data/input_data", ("base", "{sample}", "b1000.nii.gz")) is not template
+    assert template == pt.PathTemplate("/data/input_data", ("base", "{sample}", "b0.nii.gz"))
+    assert len({template, pt.PathTemplate("/data/input_data", ("base", "{sample}", "b0.nii.gz"))}) == 1
+
+
+def test_render():
+    template = pt.intern_template("/data//input_data/", ("base", "{sample}", "b0.nii.gz"))
+    assert template.render() == str(template) == "/data/input_data/base/{sample}/b0.nii.gz"
+    assert template.render(shortened=True) == "{output_path}/base/{sample}/b0.nii.gz"
+    assert template.get_wildcards() == {"sample"}
+    assert template.get_wildcards(shortened=True) == {"output_path", "sample"}
+
+
+def test_render_short_segments():
+    template = pt.intern_template("/data", ("sub-01", "b0.nii.gz"), "{input_path}", ("{sample}", "b0.nii.gz"))
+    assert template.render() == "/data/sub-01/b0.nii.gz"
+    assert template.render(shortened=True) == "{input_path}/{sample}/b0.nii.gz"
+    assert template.get_wildcards() == frozenset()
+    assert template.get_wildcards(shortened=True) == {"input_path", "sample"}
+
+
+def test_pickled_templates_are_interned():
+    template = pt.intern_template("/data/input_data", ("base", "{sample}", "b0.bvec"))
+    assert pickle.loads(pickle.dumps({"bvec": template}))["bvec"] is template
+    pt.templates.clear()
+    restored = pickle.loads(pickle.dumps(template))
+    assert restored == template
+    assert pt.intern_template("/data/input_data", ("base", "{sample}", "b0.bvec")) is restored
+
+
+def test_render_paths():
+    template = pt.intern_template("/data/input_data", ("base", "{sample}", "b0.nii.gz"))
+    items = [{"b0": template}, {"mask": {"function": "get_mask"}}, {"atlas": "/opt/atlas.nii.gz"}]
+    assert pt.render_paths(items, shortened=True) == [
+        {"b0": "{output_path}/base/{sample}/b0.nii.gz"},
+        {"mask": {"function": "get_mask"}},
+        {"atlas": "/opt/atlas.nii.gz"},
+    ]
+
+
+@pytest.mark.parametrize("shortened", [False, True])
+def test_template_paths_match_the_legacy_paths(shortened):
+    for filename in bench.files:
+        assert bench.template_path("denoised", filename, shortened) == bench.legacy_path("denoised", filename, shortened)
@@ -0,0 +1,58 @@
+import copy
+
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_rule_groups import create_config
+
+
+def stream(config: dict, rule: str) -> dict:
+    for value in config["rules"][rule]["output"].values():
+        value["stream"] = True
+    return config
+
+
+def test_stream_to_the_single_consumer(output_paths):
+    rulemaker = Rulemaker(stream(create_config(["denoise", "degibbs", "eddy"]), "denoise"), cache=False)
+    assert rulemaker.rules["denoise"].output_flags == {"b0_denoise": "pipe"}
+    assert rulemaker.get_groups() == {"pipe_denoise": ["denoise", "degibbs"]}
+    path = rulemaker.rules["denoise"].outputs[0]["b0_denoise"]
+    with open(rulemaker.get_fragment_path("denoise")) as f:
+        content = f.read()
+    assert f'b0_denoise=pipe("{path}"),' in content
+    assert '\n\tgroup:\n\t\t"pipe_denoise"' in content
+
+
+def test_pipe_replaces_temp(output_paths):
+    rulemaker = Rulemaker(stream(create_config(["denoise", "degibbs", "eddy"]), "denoise"), cache=False, options={"auto_temp": True})
+    assert rulemaker.rules["denoise"].output_flags == {"b0_denoise": "pipe"}
+    assert rulemaker.rules["degibbs"].output_flags == {"b0_degibbs": "temp"}
+
+
+def test_outputs_of_several_consumers_are_not_streamed(output_paths):
+    config = stream(create_config(["denoise", "degibbs", "eddy"]), "denoise")
+    config["rules"]["eddy"]["input"]["b0_denoise"] = None
+    rulemaker = Rulemaker(config, cache=False)
+    assert rulemaker.rules["denoise"].output_flags == dict()
+    assert rulemaker.get_groups() == dict()
+
+
+def test_streamed_targets_are_not_piped(output_paths):
+    config = stream(create_config(["denoise", "degibbs"]), "denoise")
+    denoised = Rulemaker(copy.deepcopy(config), cache=False).rules["denoise"].outputs[0]["b0_denoise"]
+    rulemaker = Rulemaker(config, cache=False, targets=[f"expand('{denoised}', sample=samples)"], options={"prune_rules": False})
+    assert rulemaker.rules["denoise"].output_flags == dict()
+
+
+def test_pipe_merges_the_chain_groups(output_paths):
+    config = stream(create_config(["denoise", "degibbs", "topup", "eddy"]), "degibbs")
+    rulemaker = Rulemaker(config, cache=False, options={"group_chains": True, "group_max_size": 2})
+    assert rulemaker.rules["degibbs"].output_flags == {"b0_degibbs": "pipe"}
+    assert rulemaker.get_groups() == {"chain_denoise": ["denoise", "degibbs", "topup", "eddy"]}
+
+
+def test_outputs_read_together_are_not_streamed(output_paths):
+    config = create_config(["denoise", "degibbs"])
+    config["rules"]["denoise"]["output"]["mask_denoise"] = {"output_name": "mask.nii.gz", "output_folder": "denoise"}
+    config["rules"]["degibbs"]["input"]["mask_denoise"] = None
+    rulemaker = Rulemaker(stream(config, "denoise"), cache=False)
+    assert rulemaker.rules["denoise"].output_flags == dict()  # degibbs would wait for the mask while denoise blocks on the pipe
+    assert rulemaker.get_groups() == dict()
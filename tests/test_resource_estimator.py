@@ -0,0 +1,115 @@
+import copy
+import math
+import os
+
+import pandas as pd
+import pytest
+
+import SnakeMaker.rule_maker.rule_defaults as rdf
+from SnakeMaker.rule_maker import resource_estimator as res
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_rule_cache import rule_config
+
+options = dict(rdf.rule_maker_options, max_threads=8)
+
+
+def write_benchmark(path: str, s: float, max_rss: float, cpu_time: float) -> None:
+    """
+    Writes a Snakemake benchmark file with one measurement.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("s\th:m:s\tmax_rss\tmax_vms\tmax_uss\tmax_pss\tio_in\tio_out\tmean_load\tcpu_time\n")
+        f.write(f"{s}\t0:00:00\t{max_rss}\t0\t0\t0\t0\t0\t0\t{cpu_time}\n")
+
+
+def test_find_benchmarks(tmp_path):
+    write_benchmark(str(tmp_path / "denoise" / "sub-01" / "ses-1.tsv"), 60, 100, 60)
+    write_benchmark(str(tmp_path / "denoise" / "sub-02" / "ses-1.tsv"), 60, 100, 60)
+    (tmp_path / "denoise" / "notes.txt").touch()
+    write_benchmark(str(tmp_path / "report.tsv"), 60, 100, 60)  # Rule which does not run per sample
+    assert res.find_benchmarks(str(tmp_path)) == {
+        "denoise": [
+            ("sub-01/ses-1", str(tmp_path / "denoise" / "sub-01" / "ses-1.tsv")),
+            ("sub-02/ses-1", str(tmp_path / "denoise" / "sub-02" / "ses-1.tsv")),
+        ],
+        "report": [("", str(tmp_path / "report.tsv"))],
+    }
+    assert res.find_benchmarks(str(tmp_path / "missing")) == dict()
+
+
+def test_load_benchmarks(tmp_path):
+    write_benchmark(str(tmp_path / "sub-01.tsv"), 60, 100.5, 120)
+    (tmp_path / "sub-02.tsv").write_text("s\tmax_rss\tcpu_time\nNA\t-\t1\n")
+    data = res.load_benchmarks([("sub-01", str(tmp_path / "sub-01.tsv")), ("sub-02", str(tmp_path / "sub-02.tsv"))])
+    assert list(data["sample"]) == ["sub-01", "sub-02"]
+    assert data["max_rss"][0] == 100.5
+    assert math.isnan(data["s"][1]) and math.isnan(data["max_rss"][1])
+    assert res.load_benchmarks([]).empty
+
+
+def test_estimate_rule():
+    data = pd.DataFrame({"s": [60.0, 120, 180, 240, 300], "max_rss": [100.0, 200, 300, 400, 500], "cpu_time": [120.0, 240, 360, 480, 600]})
+    data["input_size_mb"] = None
+    assert res.estimate_rule(data, options) == {
+        "threads": 2,
+        "mem_mb": math.ceil(data["max_rss"].quantile(0.95) * 1.2),
+        "runtime": math.ceil(data["s"].quantile(0.95) / 60 * 1.2),
+    }
+    assert res.estimate_rule(data, dict(options, max_threads=1))["threads"] == 1
+    assert res.estimate_rule(data.head(2), options) == dict()  # Less than resource_min_samples
+
+
+def test_estimate_rule_scales_with_the_input_size():
+    size = [10.0, 20, 30, 40]
+    data = pd.DataFrame({"s": [60.0, 120, 180, 240], "max_rss": [110.0, 210, 310, 410], "cpu_time": [60.0] * 4, "input_size_mb": size})
+    estimates = res.estimate_rule(data, options)
+    assert estimates["threads"] == 1
+    assert estimates["mem_mb"].startswith("lambda wildcards, input: max(1, int((")
+    memory = eval(estimates["mem_mb"])
+    runtime = eval(estimates["runtime"])
+    for size_mb, max_rss in [(10, 110), (40, 410), (100, 1010)]:
+        input = type("Input", (), {"size_mb": size_mb})
+        assert memory(None, input) == int(max_rss * 1.2) + 1
+    assert runtime(None, type("Input", (), {"size_mb": 40})) == int(4 * 1.2) + 1
+
+
+def test_estimate_rule_without_growth_keeps_the_quantile():
+    data = pd.DataFrame({"s": [60.0, 60, 60], "max_rss": [300.0, 200, 100], "cpu_time": [60.0] * 3, "input_size_mb": [10.0, 20, 30]})
+    assert res.estimate_rule(data, options)["mem_mb"] == math.ceil(data["max_rss"].quantile(0.95) * 1.2)
+
+
+@pytest.fixture
+def benchmarks(output_paths):
+    directory = os.path.join(os.environ["OUTPUT_DIR_PATH"], "benchmarks")
+    for index in range(1, 4):
+        write_benchmark(os.path.join(directory, "denoise", f"sub-0{index}.tsv"), 600, 1000, 2400)
+        write_benchmark(os.path.join(directory, "degibbs", f"sub-0{index}.tsv"), 60, 100, 60)
+    return directory
+
+
+def test_rulemaker_applies_the_estimates(benchmarks):
+    config = copy.deepcopy(rule_config)
+    config["rules"]["degibbs"]["threads"] = 2
+    config["rules"]["degibbs"]["resources"] = {"mem_mb": 500}
+    rulemaker = Rulemaker(config, cache=False, options={"max_threads": 8})
+    denoise, degibbs = rulemaker.rules["denoise"], rulemaker.rules["degibbs"]
+    assert (denoise.threads, denoise.resources) == (4, [{"mem_mb": 1200}, {"runtime": 12}])
+    assert (degibbs.threads, degibbs.resources) == (2, [{"mem_mb": 500}, {"runtime": 2}])  # Configured values win
+    with open(rulemaker.get_fragment_path("denoise")) as f:
+        assert "\n\tthreads:\n\t\t4\n\tresources:\n\t\tmem_mb=1200,\n\t\truntime=12,\n" in f.read()
+
+
+def test_rulemaker_without_estimates(benchmarks):
+    rulemaker = Rulemaker(copy.deepcopy(rule_config), cache=False, options={"estimate_resources": False})
+    assert rulemaker.rules["denoise"].threads is None
+    assert not rulemaker.rules["denoise"].resources
+
+
+def test_changed_benchmarks_invalidate_the_rule_cache(benchmarks):
+    Rulemaker(copy.deepcopy(rule_config))
+    assert Rulemaker(copy.deepcopy(rule_config)).cache_hit
+    write_benchmark(os.path.join(benchmarks, "denoise", "sub-04.tsv"), 6000, 1000, 2400)
+    rulemaker = Rulemaker(copy.deepcopy(rule_config))
+    assert not rulemaker.cache_hit
+    assert rulemaker.rules["denoise"].resources[1]["runtime"] > 12
@@ -0,0 +1,128 @@
+import copy
+import glob
+import os
+
+import pytest
+
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+
+rule_config = {
+    "rules": {
+        "denoise": {
+            "input": {"b0": {"path": "/data/{sample}/b0.nii.gz"}},
+            "output": {"b0_denoised": {"output_name": "b0_denoised.nii.gz", "output_folder": "denoised"}},
+            "shell": ["dwidenoise {input.b0} {output.b0_denoised}"],
+        },
+        "degibbs": {
+            "input": {"b0_denoised": None},
+            "output": {"b0_degibbs": {"output_name": "b0_degibbs.nii.gz", "output_folder": "degibbs"}},
+            "shell": ["mrdegibbs {input.b0_denoised} {output.b0_degibbs}"],
+        },
+    }
+}
+
+
+@pytest.fixture
+def config():
+    return copy.deepcopy(rule_config)
+
+
+def get_cache_entries() -> list:
+    return glob.glob(os.path.join(os.environ["OUTPUT_RULE_MAKER_PATH"], ".rule_cache", "*.pkl"))
+
+
+def read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_cache_hit(output_paths, config):
+    built = Rulemaker(config)
+    assert not built.cache_hit
+    assert len(get_cache_entries()) == 1
+    stamp = os.stat(built.get_rules_file_path()).st_mtime_ns
+    cached = Rulemaker(config)
+    assert cached.cache_hit
+    assert list(cached.rules) == ["denoise", "degibbs"]
+    assert [rule.outputs for rule in cached.rules.values()] == [rule.outputs for rule in built.rules.values()]
+    assert cached.registered_names == built.registered_names
+    assert os.stat(built.get_rules_file_path()).st_mtime_ns == stamp  # Not rewritten
+
+
+def test_cache_disabled(output_paths, config):
+    Rulemaker(config, cache=False)
+    assert not Rulemaker(config, cache=False).cache_hit
+    assert get_cache_entries() == []
+
+
+def test_changed_configuration_invalidates(output_paths, config):
+    Rulemaker(config)
+    config["rules"]["degibbs"]["shell"] = ["mrdegibbs -axes 0,1 {input.b0_denoised} {output.b0_degibbs}"]
+    changed = Rulemaker(config)
+    assert not changed.cache_hit
+    assert "-axes 0,1" in read(changed.get_fragment_path("degibbs"))
+    assert len(get_cache_entries()) == 2
+
+
+def test_changed_rule0_invalidates(output_paths, config):
+    Rulemaker(config)
+    config["rule0"] = [{"base": {"path": None, "function_name": "move_rule0"}}]
+    assert not Rulemaker(config).cache_hit
+
+
+def test_shortened_invalidates(output_paths, config):
+    Rulemaker(config)
+    assert not Rulemaker(config, shortened=True).cache_hit
+
+
+@pytest.mark.parametrize("var", ["INPUT_DIR_PATH", "OUTPUT_DIR_PATH", "OUTPUT_RULE_MAKER_PATH", "SCRATCH_DIR"])
+def test_changed_environment_invalidates(output_paths, config, monkeypatch, var):
+    Rulemaker(config)
+    monkeypatch.setenv(var, str(output_paths / "moved"))
+    assert not Rulemaker(config).cache_hit
+
+
+def test_rewritten_rules_file_invalidates(output_paths, config):
+    built = Rulemaker(config)
+    content = read(built.get_rules_file_path())
+    with open(built.get_rules_file_path(), "w") as f:
+        f.write("# Edited\n")
+    assert not Rulemaker(config).cache_hit
+    assert read(built.get_rules_file_path()) == content
+    assert Rulemaker(config).cache_hit
+
+
+def test_rewritten_fragment_invalidates(output_paths, config):
+    built = Rulemaker(config)
+    fragment = built.get_fragment_path("degibbs")
+    content = read(fragment)
+    with open(fragment, "w") as f:
+        f.write("# Edited\n")
+    assert not Rulemaker(config).cache_hit
+    assert read(fragment) == content
+    assert Rulemaker(config).cache_hit
+
+
+def test_removed_rules_file_invalidates(output_paths, config):
+    built = Rulemaker(config)
+    os.remove(built.get_rules_file_path())
+    assert not Rulemaker(config).cache_hit
+    assert os.path.exists(built.get_rules_file_path())
+
+
+def test_corrupted_entry_is_rebuilt(output_paths, config):
+    Rulemaker(config)
+    for entry in get_cache_entries():
+        with open(entry, "wb") as f:
+            f.write(b"corrupted")
+    assert not Rulemaker(config).cache_hit
+    assert Rulemaker(config).cache_hit
+
+
+def test_only_the_newest_entries_are_kept(output_paths, config, monkeypatch):
+    monkeypatch.setattr("SnakeMaker.rule_maker.rule_defaults.rule_cache_size", 2)
+    for index in range(4):
+        config["rules"]["degibbs"]["shell"] = [f"mrdegibbs -nshifts {index} {{input.b0_denoised}} {{output.b0_degibbs}}"]
+        Rulemaker(config)
+    assert len(get_cache_entries()) == 2
+    assert Rulemaker(config).cache_hit
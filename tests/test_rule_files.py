@@ -0,0 +1,64 @@
+import copy
+import os
+
+import pytest
+
+import SnakeMaker.utils as ut
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_rule_cache import rule_config
+
+
+@pytest.fixture
+def config():
+    return copy.deepcopy(rule_config)
+
+
+def get_stamps(rulemaker: Rulemaker) -> dict:
+    return {os.path.basename(path): os.stat(path).st_mtime_ns for path in rulemaker.get_rules_files()}
+
+
+def test_fragments_and_index(output_paths, config):
+    rulemaker = Rulemaker(config, cache=False)
+    fragments = os.path.join(os.environ["OUTPUT_RULE_MAKER_PATH"], "fragments")
+    assert sorted(os.listdir(fragments)) == ["degibbs.smk", "denoise.smk"]
+    with open(rulemaker.get_rules_file_path()) as f:
+        assert f.read() == 'include: "fragments/denoise.smk"\ninclude: "fragments/degibbs.smk"\n'
+    with open(os.path.join(fragments, "denoise.smk")) as f:
+        content = f.read()
+    assert content.startswith("# Description missing\nrule denoise:\n")
+    assert "dwidenoise {input.b0} {output.b0_denoised}" in content
+
+
+def test_unchanged_rules_are_not_rewritten(output_paths, config):
+    stamps = get_stamps(Rulemaker(config, cache=False))
+    rulemaker = Rulemaker(config, cache=False)
+    assert rulemaker.write_rules() == []
+    assert get_stamps(rulemaker) == stamps
+
+
+def test_edited_rule_touches_its_fragment(output_paths, config):
+    stamps = get_stamps(Rulemaker(config, cache=False))
+    config["rules"]["degibbs"]["shell"] = ["mrdegibbs -axes 0,1 {input.b0_denoised} {output.b0_degibbs}"]
+    rulemaker = Rulemaker(config, cache=False)
+    changed = {name for name, stamp in get_stamps(rulemaker).items() if stamps[name] != stamp}
+    assert changed == {"degibbs.smk"}
+
+
+def test_removed_rule_fragment_is_deleted(output_paths, config):
+    Rulemaker(config, cache=False)
+    del config["rules"]["degibbs"]
+    rulemaker = Rulemaker(config, cache=False)
+    assert os.listdir(os.path.dirname(rulemaker.get_fragment_path("denoise"))) == ["denoise.smk"]
+    with open(rulemaker.get_rules_file_path()) as f:
+        assert f.read() == 'include: "fragments/denoise.smk"\n'
+
+
+def test_write_if_changed(tmp_path):
+    path = str(tmp_path / "rules.smk")
+    assert ut.write_if_changed(path, "rule a:\n")
+    stamp = os.stat(path).st_mtime_ns
+    assert not ut.write_if_changed(path, "rule a:\n")
+    assert os.stat(path).st_mtime_ns == stamp
+    assert ut.write_if_changed(path, "rule b:\n")
+    with open(path) as f:
+        assert f.read() == "rule b:\n"
@@ -0,0 +1,91 @@
+import pytest
+
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import rule_graph as rg
+
+
+@pytest.fixture
+def chain(make_rule):
+    """
+    Rules in the configuration order eddy, denoise, degibbs, qc - the chain denoise -> degibbs -> eddy and qc reading the input.
+    """
+    rules = [
+        make_rule("eddy", {"degibbs": "/out/degibbs/{sample}/b0.nii.gz"}, {"eddy": "/out/eddy/{sample}/b0.nii.gz"}),
+        make_rule("denoise", {"b0": "/in/{sample}/b0.nii.gz"}, {"denoised": "/out//denoise/{sample}/b0.nii.gz"}),
+        make_rule("degibbs", {"denoised": "/out/denoise/{sample}/b0.nii.gz"}, {"degibbs": "/out/degibbs/{sample}/b0.nii.gz"}),
+        make_rule("qc", {"b0": "/in/{sample}/b0.nii.gz"}, {"report": "/out/qc/{sample}/report.html"}),
+    ]
+    return {rule.name: rule for rule in rules}
+
+
+def test_edges_by_normalized_paths(chain):
+    graph = rg.RuleGraph(chain)
+    assert graph.parents == {"eddy": ["degibbs"], "denoise": [], "degibbs": ["denoise"], "qc": []}
+    assert graph.producers["/out/denoise/{sample}/b0.nii.gz"] == "denoise"
+    assert graph.consumers["/out/denoise/{sample}/b0.nii.gz"] == ["degibbs"]
+    assert "/in/{sample}/b0.nii.gz" not in graph.consumers
+    assert graph.edges == [("degibbs", "eddy", "degibbs"), ("denoise", "degibbs", "denoised")]
+
+
+def test_topological_order_keeps_configuration_order_of_ties(chain):
+    assert rg.RuleGraph(chain).topological_order() == ["denoise", "degibbs", "eddy", "qc"]
+
+
+def test_topological_order_of_independent_rules(make_rule):
+    rules = {name: make_rule(name, {"b0": f"/in/{name}.nii.gz"}, {"out": f"/out/{name}.nii.gz"}) for name in ["c", "a", "b"]}
+    assert rg.RuleGraph(rules).topological_order() == ["c", "a", "b"]
+
+
+def test_cycle_detection(chain, make_rule):
+    chain["denoise"] = make_rule("denoise", {"eddy": "/out/eddy/{sample}/b0.nii.gz"}, {"denoised": "/out/denoise/{sample}/b0.nii.gz"})
+    graph = rg.RuleGraph(chain)
+    assert graph.find_cycle() == ["eddy", "denoise", "degibbs", "eddy"]
+    with pytest.raises(ConfigError, match="eddy -> denoise -> degibbs -> eddy"):
+        graph.topological_order()
+
+
+def test_self_cycle(make_rule):
+    rules = {"loop": make_rule("loop", {"b0": "/out/loop.nii.gz"}, {"out": "/out/loop.nii.gz"})}
+    graph = rg.RuleGraph(rules)
+    assert graph.find_cycle() == ["loop", "loop"]
+    with pytest.raises(ConfigError):
+        graph.topological_order()
+
+
+def test_acyclic_graph_has_no_cycle(chain):
+    assert rg.RuleGraph(chain).find_cycle() is None
+
+
+def test_prune_keeps_the_ancestors_of_the_targets(chain):
+    targets = ["expand('/out/degibbs/{sample}/b0.nii.gz', sample=samples)"]
+    graph = rg.RuleGraph(chain)
+    assert graph.match_targets(targets) == ["degibbs"]
+    assert graph.prune(targets) == ["denoise", "degibbs"]
+
+
+def test_prune_matches_lambda_targets(chain):
+    targets = ["lambda wildcards: '/out/eddy/{wildcards.sample}/b0.nii.gz'"]
+    assert rg.RuleGraph(chain).prune(targets) == ["eddy", "denoise", "degibbs"]
+
+
+def test_prune_matches_targets_in_the_output_directory(chain, monkeypatch):
+    for rule in chain.values():
+        rule.outputs = [{key: path.replace("/out", "{output_path}")} for output in rule.outputs for key, path in output.items()]
+    monkeypatch.setenv("OUTPUT_DIR_PATH", "/data/output")
+    targets = ["expand('/data/output/eddy/{sample}/b0.nii.gz', sample=samples)"]
+    assert rg.RuleGraph(chain).prune(targets) == ["eddy"]
+
+
+def test_prune_without_matched_targets_keeps_all_rules(chain):
+    assert rg.RuleGraph(chain).prune(["get_targets(samples)"]) == ["eddy", "denoise", "degibbs", "qc"]
+
+
+def test_chains(chain):
+    assert rg.RuleGraph(chain).chains() == [["denoise", "degibbs", "eddy"]]
+    assert rg.RuleGraph(chain).chains({"denoise", "eddy", "qc"}) == []
+
+
+def test_chains_stop_at_branches(chain, make_rule):
+    chain["mask"] = make_rule("mask", {"denoised": "/out/denoise/{sample}/b0.nii.gz"}, {"mask": "/out/mask/{sample}/mask.nii.gz"})
+    chain["qc"] = make_rule("qc", {"eddy": "/out/eddy/{sample}/b0.nii.gz", "mask": "/out/mask/{sample}/mask.nii.gz"}, {"report": "/out/qc/{sample}/report.html"})
+    assert rg.RuleGraph(chain).chains() == [["degibbs", "eddy"]]
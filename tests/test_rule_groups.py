@@ -0,0 +1,61 @@
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+
+
+def create_config(steps: list) -> dict:
+    """
+    Rule configuration of a linear chain, every step reads the output of the previous one.
+    """
+    rules = dict()
+    previous = None
+    for step in steps:
+        rules[step] = {
+            "input": {previous: None} if previous else {"b0": {"path": "/data/{sample}/b0.nii.gz"}},
+            "output": {f"b0_{step}": {"output_name": f"b0_{step}.nii.gz", "output_folder": step}},
+            "shell": [f"{step} {{input}} {{output}}"],
+        }
+        previous = f"b0_{step}"
+    return {"rules": rules}
+
+
+def make_rules(options: dict = None, steps: list = None) -> Rulemaker:
+    return Rulemaker(create_config(steps or ["denoise", "degibbs", "topup", "eddy"]), cache=False, options=options)
+
+
+def test_grouping_is_off_by_default(output_paths):
+    rulemaker = make_rules()
+    assert rulemaker.get_groups() == dict()
+    assert all(rule.group == "" for rule in rulemaker.rules.values())
+
+
+def test_group_chains(output_paths):
+    rulemaker = make_rules({"group_chains": True})
+    assert rulemaker.get_groups() == {"chain_denoise": ["denoise", "degibbs", "topup", "eddy"]}
+    with open(rulemaker.get_fragment_path("topup")) as f:
+        assert '\n\tgroup:\n\t\t"chain_denoise"' in f.read()
+
+
+def test_group_max_size(output_paths):
+    rulemaker = make_rules({"group_chains": True, "group_max_size": 3}, ["a", "b", "c", "d", "e", "f", "g"])
+    assert rulemaker.get_groups() == {"chain_a": ["a", "b", "c"], "chain_d": ["d", "e", "f"]}  # Single rules are not grouped
+
+
+def test_group_max_runtime(output_paths):
+    rulemaker = make_rules({"group_chains": True, "group_max_runtime": 60})
+    for name, runtime in {"denoise": 30, "degibbs": 20, "topup": 40, "eddy": 10}.items():
+        rulemaker.rules[name].resources = [{"runtime": runtime}]
+    assert rulemaker.assign_groups() == {"chain_denoise": ["denoise", "degibbs"], "chain_topup": ["topup", "eddy"]}
+
+
+def test_groups_only_per_sample_rules(output_paths):
+    config = create_config(["denoise", "degibbs", "topup"])
+    config["rules"]["topup"]["output"] = {"report": {"path": "/data/report.html"}}
+    rulemaker = Rulemaker(config, cache=False, options={"group_chains": True})
+    assert rulemaker.get_groups() == {"chain_denoise": ["denoise", "degibbs"]}
+
+
+def test_groups_of_cached_rules(output_paths):
+    config = create_config(["denoise", "degibbs", "topup", "eddy"])
+    Rulemaker(config, options={"group_chains": True})
+    rulemaker = Rulemaker(config, options={"group_chains": True})
+    assert rulemaker.cache_hit
+    assert rulemaker.get_groups() == {"chain_denoise": ["denoise", "degibbs", "topup", "eddy"]}
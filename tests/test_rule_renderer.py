@@ -0,0 +1,74 @@
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from SnakeMaker.benchmarks import rule_rendering as bench
+from SnakeMaker.rule_maker import rule_renderer as rr
+from SnakeMaker.rule_maker.rule import Rule
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_rules(rulemaker: Rulemaker) -> str:
+    """
+    Reads the rule fragments in the order of the include index.
+    """
+    directory = os.path.dirname(rulemaker.get_rules_file_path())
+    with open(rulemaker.get_rules_file_path()) as f:
+        fragments = re.findall(r'include: "(.+)"', f.read())
+    output = ""
+    for fragment in fragments:
+        with open(os.path.join(directory, fragment)) as f:
+            output += f.read()
+    return output
+
+
+def test_demo_rules_match_the_baseline(output_paths):
+    rulemaker = Rulemaker(os.path.join(root, "config", "demo_rule_config.yaml"), shortened=True, cache=False)
+    with open(os.path.join(root, "data", "output_data", "rules", "rules.smk")) as f:
+        assert read_rules(rulemaker) == f.read()
+
+
+@pytest.mark.parametrize("index", range(8))
+def test_render_rule_matches_the_legacy_rendering(index):
+    rule = bench.create_rule(index)
+    assert rr.render_rule(rule) == bench.legacy_render(rule)
+
+
+def test_render_rule_sections():
+    rule = Rule()
+    rule.name = "report"
+    rule.inputs = [{"table": "./tables//{sample}/"}]
+    rule.params = [{"threshold": 0.5}, {"atlas": "/opt/atlas/../atlas.nii.gz"}]
+    rule.run = [{"shell": "'cat {input.table}'"}, {"print": "'done'"}]
+    assert rr.render_rule(rule) == bench.legacy_render(rule)
+    assert rr.render_rule(rule) == (
+        "# Description missing\n"
+        "rule report:\n"
+        '\tinput:\n\t\ttable="tables/{sample}",'
+        '\n\tparams:\t\t\n\t\tthreshold="0.5",\n\t\tatlas="/opt/atlas/../atlas.nii.gz",'
+        "\n\trun:\n\t\tshell='cat {input.table}'print='done'\n"
+    )
+
+
+@pytest.mark.parametrize("path", ["a/b", "{output_path}//base/b0.nii.gz", "./a/b", "a/./b", "a/b/", "/a/b", "a//b//", "a/../b"])
+def test_normalize_path(path):
+    assert rr.normalize_path(path) == str(Path(path))
+
+
+def test_render_rules_is_lazy():
+    rules = [bench.create_rule(index) for index in range(3)]
+    rendered = rr.render_rules(rules)
+    assert not isinstance(rendered, list)
+    assert "".join(rendered) == "".join(bench.legacy_render(rule) for rule in rules)
+
+
+def test_rendered_text_is_not_kept(output_paths):
+    rulemaker = Rulemaker(os.path.join(root, "config", "demo_rule_config.yaml"), shortened=True)
+    assert all(not hasattr(rule, "rule_string") for rule in rulemaker.rules.values())
+    cached = Rulemaker(os.path.join(root, "config", "demo_rule_config.yaml"), shortened=True)
+    assert cached.cache_hit
+    assert all(not hasattr(rule, "rule_string") for rule in cached.rules.values())
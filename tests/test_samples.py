@@ -0,0 +1,120 @@
+import gzip
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import SnakeMaker.bids_index as bi
+import SnakeMaker.samples as smp
+import SnakeMaker.subject as sb
+import SnakeMaker.utils as ut
+from SnakeMaker.snakemaker import Snakemaker
+
+
+def write_manifest(path: Path, text: str) -> str:
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt") as f:
+            f.write(text)
+    else:
+        path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("name", ["samples.txt", "samples.txt.gz"])
+def test_iter_samples_txt(tmp_path, name):
+    path = write_manifest(tmp_path / name, "sub-01/ses-1\n'sub-01/ses-2/'\n\n  sub-02/ses-1  \nsub-01/ses-1\n")
+    assert list(smp.iter_samples(path)) == ["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"]
+
+
+@pytest.mark.parametrize("name", ["samples.csv", "samples.csv.gz"])
+def test_iter_samples_csv(tmp_path, name):
+    path = write_manifest(tmp_path / name, 'site,samples\nA,/data/sub-01/ses-1\nB,"/data/sub-02/ses-1"\nC\nA,/data/sub-01/ses-1\n')
+    assert list(smp.iter_samples(path)) == ["/data/sub-01/ses-1", "/data/sub-02/ses-1"]
+    assert list(smp.iter_samples(path, level=2)) == ["sub-01/ses-1", "sub-02/ses-1"]
+    assert list(smp.iter_samples(path, column="site")) == ["A", "B", "C"]
+
+
+def test_iter_samples_level_deduplicates_the_shortened_samples(tmp_path):
+    path = write_manifest(tmp_path / "samples.txt", "/site-a/sub-01\n/site-b/sub-01\n")
+    assert list(smp.iter_samples(path, "1")) == ["sub-01"]
+
+
+def test_iter_samples_missing_column(tmp_path):
+    path = write_manifest(tmp_path / "samples.csv", "subject\nsub-01\n")
+    with pytest.raises(KeyError):
+        list(smp.iter_samples(path))
+
+
+def test_iter_samples_unsupported_format(tmp_path):
+    path = write_manifest(tmp_path / "samples.json", "[]")
+    assert not smp.is_manifest(path)
+    with pytest.raises(NotImplementedError):
+        list(smp.iter_samples(path))
+
+
+def test_manifest_format():
+    assert smp.manifest_format("samples.csv.gz") == ".csv"
+    assert smp.manifest_format("/data/samples.txt") == ".txt"
+    assert smp.manifest_format("samples.tsv") is None
+
+
+def test_is_manifest(tmp_path):
+    assert not smp.is_manifest(str(tmp_path / "missing.csv"))
+    assert smp.is_manifest(write_manifest(tmp_path / "samples.csv", "samples\n"))
+
+
+@pytest.mark.parametrize("path", ["/a/b/c/d", "a/b/c/d/", "./a/b/c/d", "/d", "c/d"])
+def test_get_last_directory_matches_path_parts(path):
+    for level in [1, 2, 10]:
+        assert ut.get_last_directory(path, level) == str(Path(*Path(path).parts[-level:]))
+
+
+def test_create_samples_from_manifest(tmp_path):
+    path = write_manifest(tmp_path / "samples.txt", "/data/sub-01/ses-1\n/data/sub-02/ses-1\n")
+    snakemaker = Snakemaker(debug=True)
+    assert snakemaker.create_samples(path) == ["/data/sub-01/ses-1", "/data/sub-02/ses-1"]
+    assert snakemaker.create_samples(path, level=2) == ["sub-01/ses-1", "sub-02/ses-1"]
+
+
+def test_binary_column_round_trip(tmp_path):
+    samples = ["/data/sub-01/ses-1", "/data/sub-02/ses-1", "/data/sub-Zürich03/ses-10", ""]
+    path = str(tmp_path / "manifest" / "samples.npy")
+    smp.save_column(path, samples)
+    column = smp.load_column(path)
+    assert isinstance(column.array, np.memmap)
+    assert len(column) == 4
+    assert list(column) == samples
+    assert column[2] == "/data/sub-Zürich03/ses-10"
+    assert column[1:3] == samples[1:3]
+    assert list(smp.load_column(path, level=2)) == ["sub-01/ses-1", "sub-02/ses-1", "sub-Zürich03/ses-10", ""]
+    assert list(tmp_path.joinpath("manifest").iterdir()) == [tmp_path / "manifest" / "samples.npy"]  # No temporary files left
+
+
+def test_binary_column_of_no_samples(tmp_path):
+    path = str(tmp_path / "samples.npy")
+    smp.save_column(path, [])
+    assert list(smp.load_column(path)) == []
+
+
+def test_export_manifest_round_trip(tmp_path, bids_root):
+    subjects = {subject_id: subject for subject_id, subject, _ in sb.build_subjects(sb.create_session_lookups(bi.scan_bids(bids_root)))}
+    samples = ["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"]
+    directory = str(tmp_path / "manifest")
+    samples_path = smp.export_manifest(directory, samples, subjects)
+    assert list(smp.load_column(samples_path)) == samples
+    table = smp.load_file_table(directory)
+    assert list(table["sample"]) == samples
+    for index, sample in enumerate(samples):
+        subject_id, session_id = sample[len("sub-") :].split("/ses-")
+        for modality, attributes in smp.file_table_modalities.items():
+            for attribute in attributes:
+                assert table[f"{modality}_{attribute}"][index] == subjects[subject_id].get_file(session_id, modality, attribute)
+    assert table["b1000_direction"][0] == "AP"
+
+
+def test_create_samples_from_binary_manifest(tmp_path):
+    path = str(tmp_path / "samples.npy")
+    smp.save_column(path, ["/data/sub-01/ses-1", "/data/sub-02/ses-1"])
+    snakemaker = Snakemaker(debug=True)
+    assert list(snakemaker.create_samples(path)) == ["/data/sub-01/ses-1", "/data/sub-02/ses-1"]
+    assert list(snakemaker.create_samples(path, level=2)) == ["sub-01/ses-1", "sub-02/ses-1"]
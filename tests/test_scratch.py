@@ -0,0 +1,158 @@
+import fcntl
+import os
+import subprocess
+import time
+
+import pytest
+
+from SnakeMaker.rule_maker import scratch as sc
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+
+
+@pytest.fixture
+def stage_script(tmp_path):
+    path = tmp_path / sc.stage_script_name
+    path.write_text(sc.stage_script)
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def scratch_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "scratch"
+    directory.mkdir()
+    monkeypatch.setenv("SCRATCH_DIR", str(directory))
+    return str(directory)
+
+
+def hold_slot(scratch_dir: str, slot: int):
+    lock = open(os.path.join(scratch_dir, f".snakemaker_stage_{slot}.lock"), "w")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def test_stage_in_and_out(stage_script, scratch_dir, tmp_path):
+    source = tmp_path / "shared" / "b0.nii.gz"
+    source.parent.mkdir()
+    source.write_text("b0")
+    staged = os.path.join(scratch_dir, "job", "input", "b0", "b0.nii.gz")
+    subprocess.run([stage_script, "in", scratch_dir, "2", str(source), staged], check=True)
+    with open(staged) as f:
+        assert f.read() == "b0"
+    destination = tmp_path / "shared" / "denoised" / "b0_denoised.nii.gz"
+    subprocess.run([stage_script, "out", scratch_dir, "2", staged, str(destination)], check=True)
+    assert destination.read_text() == "b0"
+    assert os.listdir(destination.parent) == ["b0_denoised.nii.gz"]  # No partial copy left
+
+
+def test_stage_waits_for_a_free_slot(stage_script, scratch_dir, tmp_path):
+    source = tmp_path / "b0.nii.gz"
+    source.write_text("b0")
+    destination = tmp_path / "staged" / "b0.nii.gz"
+    lock = hold_slot(scratch_dir, 1)
+    try:
+        process = subprocess.Popen([stage_script, "in", scratch_dir, "1", str(source), str(destination)])
+        time.sleep(0.5)
+        assert process.poll() is None
+        assert not destination.exists()
+    finally:
+        lock.close()
+    assert process.wait(timeout=10) == 0
+    assert destination.read_text() == "b0"
+
+
+def test_stage_takes_another_slot(stage_script, scratch_dir, tmp_path):
+    source = tmp_path / "b0.nii.gz"
+    source.write_text("b0")
+    lock = hold_slot(scratch_dir, 1)
+    try:
+        subprocess.run([stage_script, "in", scratch_dir, "2", str(source), str(tmp_path / "b0_copy.nii.gz")], check=True, timeout=10)
+    finally:
+        lock.close()
+
+
+def test_stage_shell(make_rule):
+    rule = make_rule("denoise", {"b0": "/in/b0.nii.gz", "mask": "/in/mask.nii.gz"}, {"denoised": "/out/b0.nii.gz"}, ["dwidenoise {input.b0} {output.denoised}"])
+    assert sc.stage_shell(rule, "/scratch", 4, "/rules/scratch_stage.sh") == [
+        'S=$(mktemp -d "/scratch/denoise.XXXXXX")',
+        """trap 'rm -rf "$S"' EXIT""",
+        'in_b0="$S/input/b0/$(basename {input.b0})"',
+        'out_denoised="$S/output/denoised/$(basename {output.denoised})"',
+        'mkdir -p "$S/output/denoised"',
+        '"/rules/scratch_stage.sh" in "/scratch" 4 {input.b0} "$in_b0"',
+        'dwidenoise "$in_b0" "$out_denoised"',
+        '"/rules/scratch_stage.sh" out "/scratch" 4 "$out_denoised" {output.denoised}',
+    ]
+
+
+@pytest.mark.parametrize(
+    "shell, run",
+    [
+        (["dwidenoise {input} {output.denoised}"], ""),
+        (["dwidenoise {input.b0} {output[0]}"], ""),
+        (["dwidenoise {input.b0} /out/b0.nii.gz"], ""),
+        ([], "shell('dwidenoise')"),
+    ],
+)
+def test_rules_which_can_not_be_staged(make_rule, shell, run):
+    rule = make_rule("denoise", {"b0": "/in/b0.nii.gz"}, {"denoised": "/out/b0.nii.gz"}, shell, run)
+    assert sc.stage_shell(rule, "/scratch", 4, "/rules/scratch_stage.sh") is None
+
+
+def test_piped_rules_are_not_staged(make_rule):
+    rule = make_rule("denoise", {"b0": "/in/b0.nii.gz"}, {"denoised": "/out/b0.nii.gz"}, ["dwidenoise {input.b0} {output.denoised}"])
+    rule.output_flags = {"denoised": "pipe"}
+    assert sc.stage_shell(rule, "/scratch", 4, "/rules/scratch_stage.sh") is None
+
+
+def create_config(tmp_path) -> dict:
+    return {
+        "rules": {
+            "denoise": {
+                "input": {"b0": {"path": str(tmp_path / "data" / "{sample}" / "b0.nii.gz")}},
+                "output": {"b0_denoised": {"output_name": "b0_denoised.nii.gz", "output_folder": "denoised"}},
+                "shell": ["tr a-z A-Z < {input.b0} > {output.b0_denoised}"],
+                "scratch": True,
+            },
+        }
+    }
+
+
+def test_rulemaker_stages_scratch_rules(output_paths, scratch_dir, tmp_path):
+    rulemaker = Rulemaker(create_config(tmp_path), cache=False, options={"scratch_slots": 2})
+    rule = rulemaker.rules["denoise"]
+    script_path = os.path.join(os.environ["OUTPUT_RULE_MAKER_PATH"], sc.stage_script_name)
+    assert rule.shell[0] == f'S=$(mktemp -d "{scratch_dir}/denoise.XXXXXX")'
+    assert os.access(script_path, os.X_OK)
+    # Run the staged shell as Snakemake would, with the wildcards and the references filled in
+    (tmp_path / "data" / "sub-01").mkdir(parents=True)
+    (tmp_path / "data" / "sub-01" / "b0.nii.gz").write_text("b0")
+    output = rule.outputs[0]["b0_denoised"].replace("{sample}", "sub-01")
+    shell = "\n".join(rule.shell).replace("{input.b0}", str(tmp_path / "data" / "sub-01" / "b0.nii.gz")).replace("{output.b0_denoised}", output)
+    subprocess.run(["bash", "-c", "set -euo pipefail\n" + shell], check=True, timeout=30)
+    with open(output) as f:
+        assert f.read() == "B0"
+    assert os.listdir(scratch_dir) == [".snakemaker_stage_1.lock"]  # The private directory is removed
+
+
+def test_rulemaker_without_scratch_dir(output_paths, tmp_path):
+    rulemaker = Rulemaker(create_config(tmp_path), cache=False)
+    assert rulemaker.rules["denoise"].shell == ["tr a-z A-Z < {input.b0} > {output.b0_denoised}"]
+    assert not os.path.exists(os.path.join(os.environ["OUTPUT_RULE_MAKER_PATH"], sc.stage_script_name))
+
+
+def test_scratch_dir_invalidates_the_rule_cache(output_paths, tmp_path, monkeypatch):
+    Rulemaker(create_config(tmp_path))
+    monkeypatch.setenv("SCRATCH_DIR", str(tmp_path))
+    rulemaker = Rulemaker(create_config(tmp_path))
+    assert not rulemaker.cache_hit
+    assert rulemaker.rules["denoise"].shell[0].startswith("S=$(mktemp -d")
+
+
+def test_rule_cache_hit_restores_the_stage_script(output_paths, scratch_dir, tmp_path):
+    Rulemaker(create_config(tmp_path))
+    script_path = os.path.join(os.environ["OUTPUT_RULE_MAKER_PATH"], sc.stage_script_name)
+    os.remove(script_path)
+    rulemaker = Rulemaker(create_config(tmp_path))
+    assert rulemaker.cache_hit
+    assert os.access(script_path, os.X_OK)
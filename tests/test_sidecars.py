@@ -0,0 +1,117 @@
+import copy
+import json
+import os
+
+import pytest
+
+import SnakeMaker.sidecars as sc
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.rule_maker import path_template as pt
+from SnakeMaker.rule_maker import rule_utils as rut
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_rule_cache import rule_config
+
+
+def test_get_field():
+    data = {"TotalReadoutTime": 0.05, "SliceTiming": [0.0, 0.5], "Scanner": {"Vendor": "Siemens"}}
+    assert sc.get_field(data, "TotalReadoutTime") == 0.05
+    assert sc.get_field(data, "SliceTiming.1") == 0.5
+    assert sc.get_field(data, "Scanner.Vendor") == "Siemens"
+    for field in ["EchoTime", "SliceTiming.2", "Scanner.Vendor.Name", "TotalReadoutTime.0"]:
+        with pytest.raises(KeyError):
+            sc.get_field(data, field)
+
+
+def test_read_sidecar(tmp_path):
+    path = tmp_path / "b0.json"
+    path.write_text('{"TotalReadoutTime": 0.05}')
+    assert sc.read_sidecar(str(path), [("b0.TotalReadoutTime", "TotalReadoutTime"), ("b0.EchoTime", "EchoTime")]) == (
+        {"b0.TotalReadoutTime": 0.05},
+        {"b0.EchoTime": f"{path}: field EchoTime not found"},
+    )
+    path.write_text("{")
+    values, errors = sc.read_sidecar(str(path), [("b0.TotalReadoutTime", "TotalReadoutTime")])
+    assert values == dict() and list(errors) == ["b0.TotalReadoutTime"]
+
+
+@pytest.fixture
+def sidecar_files(tmp_path, monkeypatch):
+    """
+    b0.json and b1000.json sidecars of the samples sub-01/ses-1 and sub-02/ses-1 in OUTPUT_DIR_PATH/base, sub-02 misses b1000.json.
+    """
+    monkeypatch.setenv("OUTPUT_DIR_PATH", str(tmp_path / "output"))
+    for sample, readout in [("sub-01/ses-1", 0.05), ("sub-02/ses-1", 0.06)]:
+        directory = tmp_path / "output" / "base" / sample
+        directory.mkdir(parents=True)
+        (directory / "b0.json").write_text(json.dumps({"TotalReadoutTime": readout, "PhaseEncodingDirection": "j-"}))
+        if sample == "sub-01/ses-1":
+            (directory / "b1000.json").write_text(json.dumps({"TotalReadoutTime": readout * 2}))
+    return {
+        "b0_json.TotalReadoutTime": {"path": "{output_path}/base/{sample}/b0.json", "field": "TotalReadoutTime"},
+        "b0_json.PhaseEncodingDirection": {"path": "{output_path}/base/{sample}/b0.json", "field": "PhaseEncodingDirection"},
+        "b1000_json.TotalReadoutTime": {"path": "{output_path}/base/{sample}/b1000.json", "field": "TotalReadoutTime"},
+    }
+
+
+@pytest.mark.parametrize("workers", [None, 1])
+def test_extract_sidecars(sidecar_files, monkeypatch, workers):
+    opened = []
+    read_sidecar = sc.read_sidecar
+    monkeypatch.setattr(sc, "read_sidecar", lambda path, fields: opened.append(path) or read_sidecar(path, fields))
+    table, missing = sc.extract_sidecars(sidecar_files, ["sub-01/ses-1", "sub-02/ses-1"], workers)
+    assert table == {
+        "b0_json.TotalReadoutTime": {"sub-01/ses-1": 0.05, "sub-02/ses-1": 0.06},
+        "b0_json.PhaseEncodingDirection": {"sub-01/ses-1": "j-", "sub-02/ses-1": "j-"},
+        "b1000_json.TotalReadoutTime": {"sub-01/ses-1": 0.1},
+    }
+    assert [(key, sample) for key, sample, _ in missing] == [("b1000_json.TotalReadoutTime", "sub-02/ses-1")]
+    assert len(opened) == 4  # Every file is read once for all of its fields
+
+
+def test_create_sidecars(sidecar_files, tmp_path, caplog):
+    output_path = str(tmp_path / "rules" / "sidecars.json")
+    os.makedirs(os.path.dirname(output_path))
+    table = sc.create_sidecars(sidecar_files, ["sub-01/ses-1", "sub-02/ses-1"], output_path)
+    with open(output_path) as f:
+        assert json.load(f) == table
+    assert "Sidecar values missing for 1 samples and fields" in caplog.text
+    stamp = os.stat(output_path).st_mtime_ns
+    sc.create_sidecars(sidecar_files, ["sub-01/ses-1", "sub-02/ses-1"], output_path)
+    assert os.stat(output_path).st_mtime_ns == stamp  # Unchanged table is not rewritten
+
+
+def test_parse_sidecar():
+    template = pt.intern_template("/data/output", ("base", "{sample}", "b0.json"))
+    registered_names = {"b0_json": template}
+    spec = {"file": "b0_json", "field": "TotalReadoutTime"}
+    assert rut.parse_sidecar("readout", spec, registered_names, shortened=True) == (
+        "b0_json.TotalReadoutTime",
+        {"path": "{output_path}/base/{sample}/b0.json", "field": "TotalReadoutTime"},
+    )
+    assert rut.parse_sidecar("readout", spec, registered_names)[1]["path"] == "/data/output/base/{sample}/b0.json"
+    path = "/data/{sample}/b1000.json"
+    assert rut.parse_sidecar("echo", {"file": path, "field": "EchoTime"}) == (f"{path}.EchoTime", {"path": path, "field": "EchoTime"})
+
+
+@pytest.mark.parametrize("spec", [{"file": "b0_json"}, {"field": "TotalReadoutTime"}, "b0_json.TotalReadoutTime"])
+def test_parse_sidecar_of_incomplete_declarations(spec):
+    with pytest.raises(ConfigError):
+        rut.parse_sidecar("readout", spec)
+
+
+def test_rulemaker_sidecar_params(output_paths):
+    config = copy.deepcopy(rule_config)
+    config["rules"]["degibbs"]["params"] = {"readout": {"sidecar": {"file": "/data/{sample}/b0.json", "field": "TotalReadoutTime"}}}
+    rulemaker = Rulemaker(config, cache=False)
+    assert rulemaker.get_sidecars() == {"/data/{sample}/b0.json.TotalReadoutTime": {"path": "/data/{sample}/b0.json", "field": "TotalReadoutTime"}}
+    with open(rulemaker.get_fragment_path("degibbs")) as f:
+        assert "\n\t\treadout=lambda wildcards: sidecars['/data/{sample}/b0.json.TotalReadoutTime'][wildcards.sample]," in f.read()
+    with open(rulemaker.get_rules_file_path()) as f:
+        assert f.read().startswith(f'import json\n\nwith open("{rulemaker.get_sidecars_path()}") as f:\n\tsidecars = json.load(f)\n\ninclude: ')
+
+
+def test_rules_without_sidecars(output_paths):
+    rulemaker = Rulemaker(copy.deepcopy(rule_config), cache=False)
+    assert rulemaker.get_sidecars() == dict()
+    with open(rulemaker.get_rules_file_path()) as f:
+        assert f.read().startswith("include: ")
@@ -0,0 +1,87 @@
+import ast
+import os
+import re
+
+import pytest
+
+import SnakeMaker.smkfile_maker.smkfile_defaults as sdf
+from SnakeMaker.smkfile_maker.smkfile_maker import SmkFileMaker
+
+samples = ["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"]
+
+
+def create_config(samples_var: dict) -> dict:
+    return {
+        "imports": None,
+        "vars": {"samples": samples_var},
+        "include": None,
+        "config_vars": None,
+        "rules": {"all": {"input": "expand('/out/eddy/{sample}/eddy.nii.gz', sample=samples)"}},
+    }
+
+
+def make_smkfile(tmp_path, samples_var: dict, name: str = "Snakemake.smk") -> str:
+    SmkFileMaker(create_config(samples_var), smkfile_path=str(tmp_path), samples=samples, smkfile_name=name)
+    with open(tmp_path / name) as f:
+        return f.read()
+
+
+def test_inlined_samples(tmp_path):
+    content = make_smkfile(tmp_path, {"paths": None, "function": None})
+    assert f"samples = {samples}\n" in content
+    assert "\tinput:\n\t\texpand('/out/eddy/{sample}/eddy.nii.gz', sample=samples)\n" in content
+    assert os.listdir(tmp_path) == ["Snakemake.smk"]
+
+
+@pytest.mark.parametrize("file, samples_path", [(True, "shard_1.samples.txt"), ("lists/samples.txt", "lists/samples.txt")])
+def test_samples_file(tmp_path, file, samples_path):
+    (tmp_path / "lists").mkdir()
+    content = make_smkfile(tmp_path, {"file": file}, "shard_1.smk")
+    path = str(tmp_path / samples_path)
+    with open(path) as f:
+        assert f.read() == "sub-01/ses-1\nsub-01/ses-2\nsub-02/ses-1\n"
+    assert f"samples = SampleFile('{path}')\n" in content
+    assert str(samples) not in content
+    assert "\tinput:\n\t\tlambda wildcards: expand('/out/eddy/{sample}/eddy.nii.gz', sample=samples)\n" in content
+
+
+def test_samples_file_is_rewritten_only_on_change(tmp_path):
+    make_smkfile(tmp_path, {"file": True})
+    path = tmp_path / "Snakemake.samples.txt"
+    stamp = path.stat().st_mtime_ns
+    make_smkfile(tmp_path, {"file": True})
+    assert path.stat().st_mtime_ns == stamp
+
+
+def test_sample_file_loader(tmp_path):
+    path = tmp_path / "samples.txt"
+    path.write_text("sub-01/ses-1\nsub-02/ses-1\n")
+    namespace = dict()
+    exec(sdf.samples_file_loader, namespace)
+    sample_file = namespace["SampleFile"](str(path))
+    assert sample_file.samples is None  # Not read before the first use
+    assert list(sample_file) == ["sub-01/ses-1", "sub-02/ses-1"]
+    assert (len(sample_file), sample_file[1], "sub-01/ses-1" in sample_file) == (2, "sub-02/ses-1", True)
+
+
+@pytest.mark.parametrize("samples_var", [{"paths": None, "function": None}, {"file": True}])
+@pytest.mark.parametrize("mode", ["default", "exact", "shape"])
+def test_sample_constraint(tmp_path, samples_var, mode):
+    config = create_config(samples_var)
+    config["vars"]["wildcard_constraints"] = mode
+    SmkFileMaker(config, smkfile_path=str(tmp_path), samples=samples)
+    with open(tmp_path / "Snakemake.smk") as f:
+        content = f.read()
+    constraint = re.search(r"\n\tsample = (.+)\n", content).group(1)
+    pattern = ast.literal_eval(constraint)  # Inlined literal, also when the samples are read from the file
+    assert all(re.fullmatch(pattern, sample) for sample in samples)
+    assert not any(re.fullmatch(pattern, probe) for probe in ["sub-01", "sub-01/ses-1/dwi", "sub-03/ses-1x"])
+    assert "join" not in constraint
+
+
+def test_sample_constraint_of_samples_defined_in_the_snakefile(tmp_path):
+    config = create_config({"paths": ["sub-01/ses-1"], "function": None})
+    config["vars"]["wildcard_constraints"] = "default"
+    SmkFileMaker(config, smkfile_path=str(tmp_path), samples=samples)
+    with open(tmp_path / "Snakemake.smk") as f:
+        assert f"\n\tsample = {sdf.defaults['wildcard_constraints']['sample']}\n" in f.read()
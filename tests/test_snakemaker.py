@@ -0,0 +1,52 @@
+import os
+
+import SnakeMaker.bids_index as bi
+import SnakeMaker.subject as sb
+from SnakeMaker.snakemaker import Snakemaker
+
+
+def test_get_workers():
+    assert Snakemaker(debug=True).get_workers() == 1
+    assert Snakemaker(debug=True, workers=3).get_workers() == 3
+    assert Snakemaker(debug=True, workers=0).get_workers() == (os.cpu_count() or 1)
+
+
+def test_create_subjects(bids_root):
+    snakemaker = Snakemaker(debug=True)
+    snakemaker.bids_structure = bi.scan_bids(bids_root)
+    assert snakemaker.create_subjects() == ["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"]
+    assert snakemaker.failed_subjects == dict()
+
+
+def test_create_subjects_keeps_failed_subjects(bids_root, monkeypatch):
+    subject = sb.Subject
+
+    def create(subject_id, sessions):
+        if subject_id == "01":
+            raise ValueError("Missing b0")
+        return subject(subject_id, sessions)
+
+    monkeypatch.setattr(sb, "Subject", create)
+    snakemaker = Snakemaker(debug=True)
+    snakemaker.bids_structure = bi.scan_bids(bids_root)
+    assert snakemaker.create_subjects() == ["sub-02/ses-1"]
+    assert snakemaker.failed_subjects == {"01": "ValueError: Missing b0"}
+
+
+def test_partition_samples():
+    snakemaker = Snakemaker(debug=True)
+    snakemaker.samples = ["sub-01/ses-1", "sub-02/ses-1", "sub-01/ses-2", "sub-04/ses-1", "sub-03/ses-1"]
+    assert snakemaker.partition_samples(4) == [[], ["sub-01/ses-1", "sub-01/ses-2", "sub-03/ses-1"], ["sub-04/ses-1"], ["sub-02/ses-1"]]
+    assert snakemaker.partition_samples(1) == [snakemaker.samples]
+    snakemaker.samples = list(reversed(snakemaker.samples))
+    assert [sorted(shard) for shard in snakemaker.partition_samples(4)] == [[], ["sub-01/ses-1", "sub-01/ses-2", "sub-03/ses-1"], ["sub-04/ses-1"], ["sub-02/ses-1"]]
+
+
+def test_create_shells_of_shards(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_SNAKEMAKE_PATH", str(tmp_path))
+    snakemaker = Snakemaker(debug=True, shards=4)
+    snakemaker.samples = ["sub-01/ses-1", "sub-02/ses-1", "sub-04/ses-1"]
+    snakemaker.shard_samples = snakemaker.partition_samples(4)
+    snakemaker.create_shells()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{name}.shard-{shard}.sh" for name in ["dry_run", "run"] for shard in [1, 2, 3]]
+    assert "--snakefile Snakemake.shard-2.smk" in (tmp_path / "run.shard-2.sh").read_text()
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+import SnakeMaker.bids_index as bi
+import SnakeMaker.defaults as df
+import SnakeMaker.subject as sb
+
+
+def test_create_session_lookups(bids_root):
+    lookups = sb.create_session_lookups(bi.scan_bids(bids_root))
+    assert {subject: list(sessions) for subject, sessions in lookups.items()} == {"01": ["1", "2"], "02": ["1"]}
+    lookup = lookups["01"]["2"]
+    dwi = os.path.join(bids_root, "sub-01", "ses-2", "dwi")
+    assert lookup[("b1000", ".nii.gz")] == (os.path.join(dwi, "sub-01_ses-2_acq-b1000_dir-AP_dwi.nii.gz"), "AP")
+    assert lookup[("b0", ".json")] == (os.path.join(dwi, "sub-01_ses-2_acq-b0_dir-PA_dwi.json"), "PA")
+    assert lookup[("anat", ".nii.gz")] == (os.path.join(bids_root, "sub-01", "ses-2", "anat", "sub-01_ses-2_T1w.nii.gz"), "")
+
+
+def test_create_session_lookups_of_dataframe(bids_root):
+    table = bi.scan_bids(bids_root)
+    assert sb.create_session_lookups(bi.to_dataframe(table)) == sb.create_session_lookups(table)
+
+
+def test_create_session_lookups_skips_files_outside_of_sessions(tmp_path):
+    (tmp_path / "sub-01" / "dwi").mkdir(parents=True)
+    (tmp_path / "sub-01" / "dwi" / "sub-01_acq-b0_dwi.nii.gz").touch()
+    assert sb.create_session_lookups(bi.scan_bids(str(tmp_path))) == dict()
+
+
+def test_find_file():
+    lookup = dict()
+    sb.add_to_lookup(lookup, "/b0.nii", "dwi", "b0", ".nii", "PA")
+    sb.add_to_lookup(lookup, "/b0.nii.gz", "dwi", "b0", ".nii.gz", "PA")
+    sb.add_to_lookup(lookup, "/b0_copy.nii.gz", "dwi", "b0", ".nii.gz", "AP")  # The first file of a key is kept
+    assert sb.find_file(lookup, "b0", [".nii.gz", ".nii"]) == "/b0.nii.gz"
+    assert sb.find_file(lookup, "b0", [".nii", ".nii.gz"]) == "/b0.nii"
+    assert sb.find_file(lookup, "dwi", [".nii.gz"]) == "/b0.nii.gz"
+    assert sb.find_file(lookup, "b0", [".bval"]) == ""
+
+
+def test_find_direction():
+    lookup = dict()
+    sb.add_to_lookup(lookup, "/b0.json", "dwi", "b0", ".json", "PA")
+    sb.add_to_lookup(lookup, "/b1000.nii.gz", "dwi", "b1000", ".nii.gz", float("nan"))  # Missing in the DataFrame
+    assert sb.find_direction(lookup, "b0") == "PA"
+    assert sb.find_direction(lookup, "b1000") == ""
+    assert sb.find_direction(lookup, "t2") == ""
+
+
+def test_subject_sessions(bids_root):
+    table = bi.scan_bids(bids_root)
+    subject = sb.Subject("01", sb.create_session_lookups(table)["01"])
+    assert list(subject.sessions) == ["1", "2"]
+    assert subject.get_sessions_number() == 2
+    assert subject.get_file("2", "t1", "nifti") == os.path.join(bids_root, "sub-01", "ses-2", "anat", "sub-01_ses-2_T1w.nii.gz")
+    assert list(sb.Subject("01", bi.to_dataframe(table)).sessions) == ["1", "2"]
+
+
+def test_session_records(bids_root):
+    lookups = sb.create_session_lookups(bi.scan_bids(bids_root))
+    subjects = [sb.Subject(subject_id, sessions) for subject_id, sessions in lookups.items()]
+    dwi = os.path.join(bids_root, "sub-01", "ses-1", "dwi")
+    session = subjects[0].get_session_by_id("1")
+    assert session.b0.to_dict() == {
+        "name": "b0",
+        "datatype": "dwi",
+        "acquisition": "b0",
+        "direction": "PA",
+        "nifti": os.path.join(dwi, "sub-01_ses-1_acq-b0_dir-PA_dwi.nii.gz"),
+        "json": os.path.join(dwi, "sub-01_ses-1_acq-b0_dir-PA_dwi.json"),
+        "bval": "",
+        "bvec": "",
+    }
+    assert (session.b1000["acquisition"], session.b1000["direction"]) == ("b1000", "AP")
+    assert session.b1000["nifti"] == os.path.join(dwi, "sub-01_ses-1_acq-b1000_dir-AP_dwi.nii.gz")
+    # Sessions built later do not overwrite the records of the earlier ones
+    assert subjects[1].get_file("1", "b0", "nifti") == os.path.join(bids_root, "sub-02", "ses-1", "dwi", "sub-02_ses-1_acq-b0_dir-PA_dwi.nii.gz")
+    assert subjects[0].get_file("1", "b0", "nifti") == session.b0.nifti
+
+
+def test_session_records_do_not_change_the_defaults(bids_root):
+    sb.build_subjects(sb.create_session_lookups(bi.scan_bids(bids_root)))
+    assert (df.b0["nifti"], df.b1000["nifti"], df.t1["nifti"]) == ("", "", "")
+    assert df.b1000["acquisition"] == "b1000"
+
+
+@pytest.mark.parametrize("data, attribute", [("b2000", "nifti"), ("session_id", "nifti"), ("b0", "size")])
+def test_get_file_of_unknown_files(bids_root, data, attribute):
+    subject = sb.Subject("01", sb.create_session_lookups(bi.scan_bids(bids_root))["01"])
+    with pytest.raises(KeyError):
+        subject.get_file("1", data, attribute)
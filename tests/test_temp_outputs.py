@@ -0,0 +1,44 @@
+import copy
+
+from SnakeMaker.rule_maker.rulemaker import Rulemaker
+from tests.test_rule_groups import create_config
+
+
+def get_flags(rulemaker: Rulemaker) -> dict:
+    return {name: rule.output_flags for name, rule in rulemaker.rules.items() if rule.output_flags}
+
+
+def test_auto_temp_is_off_by_default(output_paths):
+    assert get_flags(Rulemaker(create_config(["denoise", "degibbs", "eddy"]), cache=False)) == dict()
+
+
+def test_intermediate_outputs_are_temporary(output_paths):
+    rulemaker = Rulemaker(create_config(["denoise", "degibbs", "eddy"]), cache=False, options={"auto_temp": True})
+    assert get_flags(rulemaker) == {"denoise": {"b0_denoise": "temp"}, "degibbs": {"b0_degibbs": "temp"}}  # The final output stays
+    path = rulemaker.rules["denoise"].outputs[0]["b0_denoise"]
+    with open(rulemaker.get_fragment_path("denoise")) as f:
+        assert f'\n\toutput:\n\t\tb0_denoise=temp("{path}"),' in f.read()
+
+
+def test_kept_outputs(output_paths):
+    config = create_config(["denoise", "degibbs", "eddy"])
+    config["rules"]["denoise"]["output"]["b0_denoise"]["keep"] = True
+    rulemaker = Rulemaker(config, cache=False, options={"auto_temp": True})
+    assert get_flags(rulemaker) == {"degibbs": {"b0_degibbs": "temp"}}
+
+
+def test_outputs_referenced_outside_of_the_inputs(output_paths):
+    config = create_config(["denoise", "degibbs", "eddy"])
+    rulemaker = Rulemaker(copy.deepcopy(config), cache=False)
+    denoised = rulemaker.rules["denoise"].outputs[0]["b0_denoise"]
+    config["rules"]["eddy"]["params"] = {"reference": f"lambda wildcards: '{denoised.replace('{sample}', '{wildcards.sample}')}'"}
+    rulemaker = Rulemaker(config, cache=False, options={"auto_temp": True})
+    assert get_flags(rulemaker) == {"degibbs": {"b0_degibbs": "temp"}}
+
+
+def test_outputs_referenced_by_the_targets(output_paths):
+    config = create_config(["denoise", "degibbs", "eddy"])
+    degibbs = Rulemaker(copy.deepcopy(config), cache=False).rules["degibbs"].outputs[0]["b0_degibbs"]
+    targets = [f"expand('{degibbs}', sample=samples)"]
+    rulemaker = Rulemaker(config, cache=False, targets=targets, options={"auto_temp": True, "prune_rules": False})
+    assert get_flags(rulemaker) == {"denoise": {"b0_denoise": "temp"}}
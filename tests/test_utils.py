@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import SnakeMaker.utils as ut
+
+
+@pytest.mark.parametrize("sample, shard", [("sub-01", 1), ("sub-02/ses-1", 3), ("sub-03/ses-2", 1), ("/sub-04/ses-1/", 2), ("sub-BIOPD01/ses-1", 0)])
+def test_get_shard_index_is_crc32_of_the_subject(sample, shard):
+    assert ut.get_shard_index(sample, 4) == shard
+
+
+def test_get_shard_index_keeps_the_sessions_of_a_subject_together():
+    assert {ut.get_shard_index(f"sub-07/ses-{session}", 16) for session in range(1, 20)} == {ut.get_shard_index("sub-07", 16)}
+    assert ut.get_shard_index("sub-07/ses-1", 1) == 0
+
+
+def test_get_shard_index_is_stable_across_processes():
+    # Unlike hash(), crc32 does not depend on PYTHONHASHSEED, so reruns keep the shards
+    code = "import SnakeMaker.utils as ut; print([ut.get_shard_index(f'sub-{i:03d}/ses-1', 7) for i in range(50)])"
+    outputs = {subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env={**os.environ, "PYTHONHASHSEED": seed}).stdout for seed in ["1", "2"]}
+    assert outputs == {str([ut.get_shard_index(f"sub-{i:03d}/ses-1", 7) for i in range(50)]) + "\n"}
+
+
+def test_write_atomic(tmp_path):
+    path = tmp_path / "rules" / "rules.smk"
+    ut.write_atomic(str(path), "rule a:\n")
+    assert path.read_text() == "rule a:\n"
+    ut.write_atomic(str(path), b"rule b:\n")
+    assert path.read_text() == "rule b:\n"
+    assert list(path.parent.iterdir()) == [path]  # No temporary files left
+
+
+def test_write_atomic_keeps_the_mode(tmp_path):
+    path = tmp_path / "run.sh"
+    path.write_text("")
+    os.chmod(path, 0o750)
+    ut.write_atomic(str(path), "#!/bin/bash\n")
+    assert os.stat(path).st_mode & 0o777 == 0o750
+
+
+def test_write_atomic_removes_the_temporary_file_on_failure(tmp_path):
+    path = tmp_path / "rules.smk"
+    path.write_text("rule a:\n")
+    with pytest.raises(TypeError):
+        ut.write_atomic(str(path), ["rule b:\n"])
+    assert list(tmp_path.iterdir()) == [path]
+    assert path.read_text() == "rule a:\n"
+
+
+def test_write_atomic_new_file_mode(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        ut.write_atomic(str(tmp_path / "new.smk"), "")
+        assert os.umask(0o027) == 0o027  # The umask of the process is not changed
+    finally:
+        os.umask(umask)
+    assert os.stat(tmp_path / "new.smk").st_mode & 0o777 == 0o640
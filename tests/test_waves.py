@@ -0,0 +1,107 @@
+import os
+import subprocess
+
+import pytest
+
+import SnakeMaker.rule_maker.rule_defaults as rdf
+import SnakeMaker.waves as wv
+from SnakeMaker.defaults import ConfigError
+from SnakeMaker.snakemaker import Snakemaker
+
+
+def write_io_benchmark(path, io_out: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"s\tmax_rss\tio_out\tcpu_time\n10\t100\t{io_out}\t10\n")
+
+
+def test_count_waves():
+    assert wv.count_waves(20000, 500, 2 * 1024**4, 0.1) == 6
+    assert wv.count_waves(100, 1024, 10 * 1024**3, 0) == 10
+    assert wv.count_waves(100, 1024, 0, 0) == 100  # At least one sample per wave
+    assert wv.count_waves(100, None, 1024**3) == 1
+    assert wv.count_waves(0, 500, 1024**3) == 1
+
+
+def test_sample_footprint_mb(tmp_path):
+    for rule, values in {"denoise": [100, 200, 300], "degibbs": [50, 50, 50]}.items():
+        for index, io_out in enumerate(values, start=1):
+            write_io_benchmark(tmp_path / rule / f"sub-0{index}.tsv", io_out)
+    write_io_benchmark(tmp_path / "report.tsv", 10000)  # Not per sample
+    write_io_benchmark(tmp_path / "eddy" / "sub-04.tsv", 1000)  # Only some samples
+    assert wv.sample_footprint_mb(0.5, str(tmp_path)) == 300  # Totals 150, 250, 350 and 1000
+    assert wv.sample_footprint_mb(1, str(tmp_path)) == 1000
+
+
+def test_sample_footprint_mb_without_benchmarks(tmp_path):
+    assert wv.sample_footprint_mb(0.95, str(tmp_path / "missing")) is None
+
+
+@pytest.fixture
+def fake_snakemake(tmp_path, monkeypatch):
+    """
+    snakemake on PATH recording its arguments into calls.txt, fails the batches listed in FAIL_BATCH.
+    """
+    bin_path = tmp_path / "bin"
+    bin_path.mkdir()
+    script = bin_path / "snakemake"
+    script.write_text(f'#!/bin/bash\necho "$@" >> "{tmp_path}/calls.txt"\n[[ " $FAIL_BATCH " != *" $3 "* ]]\n')
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_path}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path / "calls.txt"
+
+
+def create_script(tmp_path, samples: int, **options) -> tuple:
+    path = str(tmp_path / "run_waves.sh")
+    waves = wv.create_wave_script(path, "Snakemake.smk", [f"sub-{index:02}" for index in range(samples)], dict(rdf.rule_maker_options, **options))
+    return path, waves
+
+
+def test_wave_script_runs_the_batches(output_paths, fake_snakemake, tmp_path):
+    path, waves = create_script(tmp_path, 10, waves=3, wave_footprint_mb=1)
+    assert waves == 3
+    subprocess.run([path], check=True, capture_output=True)
+    assert fake_snakemake.read_text().splitlines() == [
+        f"all --batch all={wave}/3 --cores all --keep-going --snakefile Snakemake.smk" for wave in [1, 2, 3]
+    ]
+
+
+def test_failed_wave_stops_and_resumes(output_paths, fake_snakemake, tmp_path, monkeypatch):
+    path, _ = create_script(tmp_path, 10, waves=3)
+    monkeypatch.setenv("FAIL_BATCH", "all=2/3")
+    result = subprocess.run([path], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert f"Resume with: {path} 2" in result.stderr
+    monkeypatch.delenv("FAIL_BATCH")
+    fake_snakemake.unlink()
+    subprocess.run([path, "2"], check=True, capture_output=True)
+    assert [line.split()[2] for line in fake_snakemake.read_text().splitlines()] == ["all=2/3", "all=3/3"]
+
+
+def test_wave_script_checks_the_free_space(output_paths, fake_snakemake, tmp_path):
+    path, waves = create_script(tmp_path, 2, waves=1, wave_footprint_mb=1024**3)  # 1 PB per sample
+    result = subprocess.run([path], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Wave 1/1 needs" in result.stderr
+    assert not fake_snakemake.exists()
+
+
+def test_auto_waves(output_paths, tmp_path, monkeypatch):
+    monkeypatch.setattr(wv.shutil, "disk_usage", lambda path: type("Usage", (), {"free": 100 * 1024**2}))
+    assert create_script(tmp_path, 50, waves="auto", wave_footprint_mb=10, wave_disk_reserve=0.1)[1] == 6  # 9 samples per wave
+    assert create_script(tmp_path, 50, waves="auto", wave_footprint_mb=0)[1] == 1  # No footprint and no benchmarks
+    assert create_script(tmp_path, 3, waves=10)[1] == 3  # At most one wave per sample
+
+
+@pytest.mark.parametrize("waves", [-1, "all", True, 1.5])
+def test_unknown_waves_option(tmp_path, waves):
+    snakemaker = Snakemaker(debug=True)
+    snakemaker.config = {"rule_maker": {"waves": waves}}
+    with pytest.raises(ConfigError):
+        snakemaker.create_wave_shell(str(tmp_path / "run_waves.sh"), "Snakemake.smk", ["sub-01"])
+
+
+def test_waves_disabled(tmp_path):
+    snakemaker = Snakemaker(debug=True)
+    snakemaker.config = {"rule_maker": {"waves": 0}}
+    assert snakemaker.create_wave_shell(str(tmp_path / "run_waves.sh"), "Snakemake.smk", ["sub-01"]) is None
+    assert not (tmp_path / "run_waves.sh").exists()
@@ -0,0 +1,71 @@
+import itertools
+import random
+import re
+
+import pytest
+
+import SnakeMaker.smkfile_maker.wildcard_constraints as wc
+
+bids_samples = ["sub-BIOPD01/ses-1", "sub-BIOPD01/ses-2", "sub-BIOPD02/ses-1", "sub-CTRL105/ses-1", "sub-CTRL105/ses-2"]
+
+
+def test_factor():
+    assert wc.factor(["sub-01/ses-1", "sub-01/ses-2", "sub-02/ses-1"]) == "sub\\-0(?:1/ses\\-[12]|2/ses\\-1)"
+
+
+@pytest.mark.parametrize(
+    "samples",
+    [
+        ["sub-1", "sub-10", "sub-100"],  # Samples prefixing other samples
+        ["a", "b", "ab", "ba"],
+        ["sub-01/ses-1", "sub-01/ses-1.run"],  # Regex characters
+        ["x"],
+        bids_samples,
+    ],
+)
+def test_exact_pattern_matches_only_the_samples(samples):
+    compiled = re.compile(wc.exact_pattern(samples))
+    assert all(compiled.fullmatch(sample) for sample in samples)
+    assert not any(compiled.fullmatch(probe) for probe in wc.get_probes(samples) | {"", "sub-", "sub-1000", "ab1", "sub-01/ses-1xrun"})
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_exact_pattern_over_enumerated_strings(seed):
+    generator = random.Random(seed)
+    universe = ["".join(letters) for length in range(1, 5) for letters in itertools.product("ab-1", repeat=length)]
+    samples = generator.sample(universe, generator.randint(1, 40))
+    compiled = re.compile(wc.exact_pattern(samples))
+    assert {value for value in universe if compiled.fullmatch(value)} == set(samples)
+
+
+def test_exact_pattern_ignores_order_and_duplicates():
+    assert wc.exact_pattern(bids_samples) == wc.exact_pattern(list(reversed(bids_samples)) + bids_samples)
+
+
+def test_get_probes():
+    assert wc.get_probes(["sub-01/ses-1"]) == {"sub", "sub-01", "sub-01/ses", "sub-01/ses-1-1"}
+
+
+def test_shape_constraint():
+    pattern, mode = wc.create_constraint(bids_samples, "shape")
+    assert (pattern, mode) == ("sub\\-[A-Z0-9]{7}/ses\\-[0-9]{1}", "shape")
+    assert re.fullmatch(pattern, "sub-CTRL106/ses-3")  # Samples added later
+    assert not re.fullmatch(pattern, "sub-CTRL106")
+
+
+def test_shape_falls_back_to_exact():
+    samples = ["sub-01", "sub-02", "sub-03/ses-1"]  # The shape of sub-01 and sub-02 matches sub-03 without its session
+    assert wc.verify(wc.shape_pattern(samples), samples)
+    assert not wc.verify(wc.shape_pattern(samples), samples, wc.get_probes(samples))
+    assert wc.create_constraint(samples, "shape") == (wc.exact_pattern(samples), "exact")
+
+
+def test_shape_of_non_ascii_samples():
+    samples = ["sub-ä1", "sub-ä2", "sub-ö3"]  # Non-ASCII letters are separators
+    pattern, mode = wc.create_constraint(samples, "shape")
+    assert (pattern, mode) == ("(?:sub\\-ä[0-9]{1}|sub\\-ö3)", "shape")
+    assert not re.fullmatch(pattern, "sub-o3")
+
+
+def test_exact_constraint():
+    assert wc.create_constraint(bids_samples) == (wc.exact_pattern(bids_samples), "exact")